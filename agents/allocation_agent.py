@@ -1,6 +1,19 @@
 # agents/allocation_agent.py
 
-from agents.data_loader import load_holdings
+import hashlib
+import json
+import threading
+import time
+
+import numpy as np
+
+from agents.data_loader import load_portfolio, holdings_version, is_holdings_snapshot
+from agents.metrics import counter
+from agents.portfolio import as_portfolio
+from agents.price_agent import get_prices
+from agents.tickers import ASSET_CLASS_MAP, canonical_ticker
+from agents.tracing import traced
+from config import ALLOCATION_CACHE_TTL_SECONDS
 
 # ==============================
 # TARGET ROBO ALLOCATION (B)
@@ -15,41 +28,8 @@ TARGET_ALLOCATION = {
 }
 
 
-# ==============================
-# TICKER → ASSET CLASS MAP
-# Expand anytime
-# ==============================
-
-ASSET_CLASS_MAP = {
-
-    # Cash / HISA ETFs
-    "SAFE.TO": "cash",
-    "CASH.TO": "cash",
-
-    # Bonds
-    "ZAG.TO": "bonds",
-    "VAB.TO": "bonds",
-    "XBB.TO": "bonds",
-
-    # Canada equity
-    "XIU.TO": "canada_equity",
-    "VCN.TO": "canada_equity",
-    "BCE.TO": "canada_equity",
-    "ENB.TO": "canada_equity",
-    "TD.TO": "canada_equity",
-    "BNS.TO": "canada_equity",
-    "FTS.TO": "canada_equity",
-
-    # US equity
-    "VTI": "us_equity",
-    "XUU.TO": "us_equity",
-
-    # Global equity
-    "XAW.TO": "global_equity",
-    "XEQT.TO": "global_equity",
-    "VGRO.TO": "global_equity",
-    "VBAL.TO": "global_equity"
-}
+SLEEVES = ["cash", "bonds", "canada_equity", "us_equity", "global_equity", "unknown"]
+SLEEVE_INDEX = {sleeve: i for i, sleeve in enumerate(SLEEVES)}
 
 
 # ==============================
@@ -61,44 +41,69 @@ def classify_ticker(ticker):
     if isinstance(ticker, dict):
         ticker = ticker.get("ticker")
 
-    return ASSET_CLASS_MAP.get(ticker, "unknown")
+    return ASSET_CLASS_MAP.get(canonical_ticker(ticker), "unknown")
 
 
 # ==============================
 # CALCULATE CURRENT ALLOCATION
-# Equal-weight for now (later: use dollar value)
+# Market-value weights from one batched price snapshot
 # ==============================
 
-def calculate_allocation(holdings):
+def calculate_allocation_detail(holdings, prices=None):
+    """
+    Market-value allocation per sleeve.
 
-    if not holdings:
+    prices is an optional {ticker: price} snapshot; when omitted one batched
+    quote is fetched. Positions without a quote are valued at cost basis.
+    If nothing can be valued, every position gets equal weight.
+
+    Returns total value, then per-sleeve values, weights, drift vs target
+    and dollar gaps (positive = buy to reach target).
+    """
+    tickers, shares, costs = as_portfolio(holdings or []).columns()
+    if not tickers:
         return {}
 
-    allocation = {
-        "cash": 0,
-        "bonds": 0,
-        "canada_equity": 0,
-        "us_equity": 0,
-        "global_equity": 0,
-        "unknown": 0
-    }
+    if prices is None:
+        prices = get_prices(tickers)
 
-    weight = 1 / len(holdings)
+    quotes = np.array(
+        [np.nan if prices.get(t) is None else prices[t] for t in tickers],
+        dtype="float64",
+    )
+    unit_values = np.where(np.isnan(quotes), costs, quotes)
+    market_values = np.nan_to_num(shares * unit_values)
 
-    for item in holdings:
+    sleeve_of = {t: SLEEVE_INDEX[classify_ticker(t)] for t in set(tickers)}
+    sleeve_idx = np.fromiter((sleeve_of[t] for t in tickers), dtype="int64", count=len(tickers))
 
-        # support both formats
-        if isinstance(item, dict):
-            ticker = item.get("ticker")
-            shares = item.get("shares", 1)
-        else:
-            ticker = item
-            shares = 1
+    values = np.bincount(sleeve_idx, weights=market_values, minlength=len(SLEEVES))
+    total_value = float(values.sum())
 
-        asset_class = classify_ticker(ticker)
-        allocation[asset_class] += weight
+    if total_value > 0:
+        weights = values / total_value
+    else:
+        weights = np.bincount(sleeve_idx, minlength=len(SLEEVES)) / len(tickers)
+
+    targets = np.array([TARGET_ALLOCATION.get(sleeve, 0) for sleeve in SLEEVES])
+    gaps = targets * total_value - values
+
+    return {
+        "total_value": total_value,
+        "values": dict(zip(SLEEVES, values.tolist())),
+        "weights": dict(zip(SLEEVES, weights.tolist())),
+        "drift": detect_drift(dict(zip(SLEEVES, weights.tolist()))),
+        "dollar_gaps": dict(zip(SLEEVES, gaps.tolist())),
+        "cost_basis_fallback": sorted({t for t, q in zip(tickers, quotes) if np.isnan(q)}),
+    }
+
+
+def calculate_allocation(holdings, prices=None):
 
-    return allocation
+    if not holdings:
+        return {}
+
+    return calculate_allocation_detail(holdings, prices)["weights"]
 
 
 # ==============================
@@ -139,19 +144,94 @@ def rebalance_suggestions(drift):
     return suggestions
 
 
+# ==============================
+# SHARED ALLOCATION SNAPSHOT
+# One computation per holdings version, reused by rebalance,
+# guardrail, capital deployment and the dashboard.
+# ==============================
+
+WEIGHT_DIGITS = 4
+
+_snapshot_lock = threading.Lock()
+_snapshot_cache = {}
+
+SNAPSHOT_CACHE = counter("portfolio_allocation_cache_total", "Allocation snapshot lookups by result.", ("result",))
+
+
+def _holdings_digest(holdings):
+    payload = json.dumps(as_portfolio(holdings).to_records(), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+@traced("allocation")
+def get_allocation_snapshot(holdings=None):
+    """
+    Current weights, drift and underweights for holdings (default: saved holdings).
+
+    The result is memoized per holdings version for ALLOCATION_CACHE_TTL_SECONDS;
+    every save_holdings() call or on-disk edit invalidates it. Callers must
+    not mutate it.
+    """
+    if holdings is None:
+        holdings = load_portfolio()
+    if not len(holdings):
+        return {}
+
+    # The loader's cached snapshot is identified by its version alone, which
+    # skips hashing large holdings; other lists are keyed by content.
+    if is_holdings_snapshot(holdings):
+        key = (holdings_version(), None)
+    else:
+        key = (holdings_version(), _holdings_digest(holdings))
+    now = time.time()
+
+    with _snapshot_lock:
+        cached = _snapshot_cache.get(key)
+        if cached and cached[0] > now:
+            SNAPSHOT_CACHE.inc(result="hit")
+            return cached[1]
+
+    SNAPSHOT_CACHE.inc(result="miss")
+    detail = calculate_allocation_detail(holdings)
+    weights = {k: round(v, WEIGHT_DIGITS) for k, v in detail["weights"].items()}
+    drift = {k: round(v, WEIGHT_DIGITS) for k, v in detect_drift(weights).items()}
+
+    snapshot = {
+        "total_value": round(detail["total_value"], 2),
+        "values": {k: round(v, 2) for k, v in detail["values"].items()},
+        "weights": weights,
+        "drift": drift,
+        "underweights": {k: abs(v) for k, v in drift.items() if v < 0},
+        "dollar_gaps": {k: round(v, 2) for k, v in detail["dollar_gaps"].items()},
+        "cost_basis_fallback": detail["cost_basis_fallback"],
+    }
+
+    with _snapshot_lock:
+        # Only the latest holdings version is worth keeping.
+        _snapshot_cache.clear()
+        _snapshot_cache[key] = (now + ALLOCATION_CACHE_TTL_SECONDS, snapshot)
+
+    return snapshot
+
+
+def invalidate_allocation():
+    with _snapshot_lock:
+        _snapshot_cache.clear()
+
+
 # ==============================
 # MAIN ENGINE
 # ==============================
 
 def analyze_portfolio_allocation():
 
-    holdings = load_holdings()
+    snapshot = get_allocation_snapshot()
 
-    if not holdings:
+    if not snapshot:
         return "No holdings available."
 
-    current = calculate_allocation(holdings)
-    drift = detect_drift(current)
+    current = snapshot["weights"]
+    drift = snapshot["drift"]
     suggestions = rebalance_suggestions(drift)
 
     report = "\n📊 PORTFOLIO ALLOCATION ANALYSIS\n\n"
@@ -159,12 +239,12 @@ def analyze_portfolio_allocation():
     report += "Current allocation:\n"
 
     for asset, value in current.items():
-        report += f"- {asset}: {round(value*100)}%\n"
+        report += f"- {asset}: {round(value*100, 1)}%\n"
 
     report += "\nDrift vs target:\n"
 
     for asset, value in drift.items():
-        report += f"- {asset}: {round(value*100)}%\n"
+        report += f"- {asset}: {round(value*100, 1)}%\n"
 
     report += "\nRebalance suggestions:\n"
 
@@ -0,0 +1,174 @@
+"""
+Ticker Analysis Bundle
+Runs technical, fundamental and sentiment analysis for a ticker once and
+shares the result between the signal and decision agents.
+
+Inside an analysis_run() scope each ticker is analyzed at most once, even
+when several threads ask for it at the same time. Outside a run every call
+computes a fresh bundle. The run is held in a context variable, so
+concurrent sessions (e.g. Streamlit reruns on other threads) each get their
+own memo; run_parallel hands the caller's run to its workers.
+"""
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from agents.technical_agent import analyze_technical
+from agents.fundamental_agent import analyze_fundamental
+from agents.sentiment_agent import analyze_sentiment, analyze_sentiment_batch
+from agents.tickers import canonical_ticker
+from config import SIGNAL_MAX_WORKERS, SENTIMENT_BATCH_SIZE
+
+
+class _Run:
+    """
+    Memo of one analysis run: ticker -> Future of its bundle, plus
+    sentiment fetched up front by prime_sentiment.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bundles = {}
+        self.sentiment = {}
+
+
+_current_run = contextvars.ContextVar("analysis_run", default=None)
+
+
+def analyze_ticker(ticker):
+    """
+    Compute a fresh analysis bundle (no memoization).
+    """
+    run = _current_run.get()
+    sentiment = None
+    if run is not None:
+        with run.lock:
+            sentiment = run.sentiment.get(canonical_ticker(ticker))
+
+    return {
+        "ticker": ticker,
+        "technical": analyze_technical(ticker),
+        "fundamental": analyze_fundamental(ticker),
+        "sentiment": sentiment if sentiment is not None else analyze_sentiment(ticker),
+    }
+
+
+@contextmanager
+def analysis_run():
+    """
+    Memoize analysis bundles for the duration of one signal run.
+    Nested scopes share the outermost run's cache.
+    """
+    if _current_run.get() is not None:
+        yield
+        return
+
+    token = _current_run.set(_Run())
+    try:
+        yield
+    finally:
+        _current_run.reset(token)
+
+
+def prime_sentiment(tickers):
+    """
+    Fetch sentiment for the run's tickers in batched requests up front.
+    No-op outside an analysis_run() scope or when batching is disabled.
+    """
+    run = _current_run.get()
+    if run is None or SENTIMENT_BATCH_SIZE <= 1:
+        return
+
+    with run.lock:
+        pending = [t for t in tickers if canonical_ticker(t) not in run.sentiment]
+    if not pending:
+        return
+
+    results = analyze_sentiment_batch(pending)
+
+    with run.lock:
+        run.sentiment.update(results)
+
+
+def get_analysis(ticker):
+    """
+    Return the analysis bundle for ticker, reusing the current run's result.
+    """
+    run = _current_run.get()
+    if run is None:
+        return analyze_ticker(ticker)
+
+    with run.lock:
+        future = run.bundles.get(ticker)
+        owner = future is None
+        if owner:
+            future = run.bundles[ticker] = Future()
+
+    if not owner:
+        return future.result()
+
+    try:
+        bundle = analyze_ticker(ticker)
+    except BaseException as exc:
+        # Do not cache failures; the next caller retries.
+        with run.lock:
+            if run.bundles.get(ticker) is future:
+                del run.bundles[ticker]
+        future.set_exception(exc)
+        raise
+
+    future.set_result(bundle)
+    return bundle
+
+
+def prime_signal_items(items):
+    """
+    prime_sentiment for the tickers of ("holding" | "watch", ticker) work
+    items, each canonical ticker once.
+    """
+    prime_sentiment(list(dict.fromkeys(canonical_ticker(ticker) or ticker for _, ticker in items)))
+
+
+def analyze_signal_item(item):
+    """
+    Signal and decision for a ("holding" | "watch", ticker) work item;
+    the unit of work the entry points hand to run_parallel.
+    """
+    # Imported here: both agents build on get_analysis from this module.
+    from agents.decision_agent import generate_decision, generate_watch_decision
+    from agents.signal_agent import generate_signal
+
+    kind, ticker = item
+    result = generate_signal(ticker)
+
+    if kind == "holding":
+        return result, generate_decision(ticker)
+
+    return result, generate_watch_decision(ticker, result)
+
+
+def run_parallel(func, items, max_workers=None):
+    """
+    Apply func to every item on a bounded thread pool.
+    Results are returned in input order; the first exception is re-raised.
+    """
+    items = list(items)
+    workers = SIGNAL_MAX_WORKERS if max_workers is None else max_workers
+    workers = max(1, min(int(workers), len(items)))
+
+    if workers == 1:
+        return [func(item) for item in items]
+
+    # Pool threads do not inherit context variables; pass the run along.
+    run = _current_run.get()
+
+    def call(item):
+        token = _current_run.set(run)
+        try:
+            return func(item)
+        finally:
+            _current_run.reset(token)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="signals") as pool:
+        return list(pool.map(call, items))
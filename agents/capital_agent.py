@@ -1,46 +1,8 @@
 from agents.allocation_agent import classify_ticker
-from agents.price_agent import get_price
-from agents.data_loader import load_holdings
-
-
-def _normalize_ticker(item):
-    ticker = item.get("ticker") if isinstance(item, dict) else item
-    if not ticker:
-        return None
-    return str(ticker).upper().strip()
-
-
-def _canonical_ticker(ticker):
-    ticker = _normalize_ticker(ticker)
-    if not ticker:
-        return None
-
-    if classify_ticker(ticker) != "unknown":
-        return ticker
-
-    # Support bare Canadian symbols: ZAG -> ZAG.TO
-    if "." not in ticker and classify_ticker(f"{ticker}.TO") != "unknown":
-        return f"{ticker}.TO"
-
-    return ticker
-
-
-def _ticker_asset_class(ticker):
-    ticker = _canonical_ticker(ticker)
-    if not ticker:
-        return "unknown"
-
-    asset_class = classify_ticker(ticker)
-    if asset_class != "unknown":
-        return asset_class
-
-    # Support bare Canadian symbols in watchlist/recommendations: ZAG -> ZAG.TO
-    if "." not in ticker:
-        asset_class = classify_ticker(f"{ticker}.TO")
-        if asset_class != "unknown":
-            return asset_class
-
-    return "unknown"
+from agents.price_agent import get_prices
+from agents.data_loader import load_portfolio
+from agents.tickers import canonical_ticker
+from agents.tracing import traced
 
 
 def _watch_action_weight(watch_decision):
@@ -79,28 +41,27 @@ def _score_candidates(underweights, recommendations, watchlist, holdings_decisio
     rec_list = []
     if isinstance(recommendations, dict):
         rec_list = recommendations.get("etfs", []) + recommendations.get("stocks", [])
-    rec_set = {_canonical_ticker(t) for t in rec_list if _canonical_ticker(t)}
-    watch_set = {_canonical_ticker(t) for t in (watchlist or []) if _canonical_ticker(t)}
+    rec_set = {canonical_ticker(t) for t in rec_list if canonical_ticker(t)}
+    watch_set = {canonical_ticker(t) for t in (watchlist or []) if canonical_ticker(t)}
 
     holding_decisions_map = {}
     for ticker, decision in (holdings_decisions or {}).items():
-        holding_decisions_map[_canonical_ticker(ticker)] = decision
+        holding_decisions_map[canonical_ticker(ticker)] = decision
 
     watch_decisions_map = {}
     for ticker, data in (watchlist_results or {}).items():
-        c_ticker = _canonical_ticker(ticker)
+        c_ticker = canonical_ticker(ticker)
         decision = data.get("decision", {}) if isinstance(data, dict) else {}
         watch_decisions_map[c_ticker] = decision.get("decision", "")
 
-    existing_holdings = [_canonical_ticker(h) for h in load_holdings()]
-    existing_holdings = [t for t in existing_holdings if t]
+    existing_holdings = load_portfolio().tickers()
 
     candidates = set(existing_holdings) | rec_set | watch_set | set(holding_decisions_map.keys()) | set(watch_decisions_map.keys())
 
     scored = []
 
     for ticker in candidates:
-        asset_class = _ticker_asset_class(ticker)
+        asset_class = classify_ticker(ticker)
         underweight = underweights.get(asset_class, 0)
         if underweight <= 0:
             continue
@@ -155,9 +116,11 @@ def _build_basket(cash, ranked):
     basket = []
     spent = 0.0
 
+    prices = get_prices([item["ticker"] for item in selected])
+
     for item in selected:
         ticker = item["ticker"]
-        price = get_price(ticker)
+        price = prices.get(ticker)
         unit_price = price if price and price > 0 else 50
         target_cash = cash * (item["score"] / total_score) if total_score > 0 else 0
         shares = int(target_cash / unit_price)
@@ -188,6 +151,7 @@ def _build_basket(cash, ranked):
     return basket
 
 
+@traced("capital")
 def deploy_capital(
     cash,
     rebalance,
@@ -204,7 +168,10 @@ def deploy_capital(
     if not drift:
         return {"action": "WAIT", "reason": "No allocation drift data"}
 
-    underweights = {asset: abs(value) for asset, value in drift.items() if value < 0}
+    # Prefer the shared allocation snapshot's underweights carried by rebalance.
+    underweights = rebalance.get("underweights")
+    if underweights is None:
+        underweights = {asset: abs(value) for asset, value in drift.items() if value < 0}
     if not underweights:
         return {
             "action": "WAIT",
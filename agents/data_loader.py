@@ -1,43 +1,267 @@
-import json
-import os
-from config import HOLDINGS_FILE, WATCHLIST_FILE
+import threading
+import time
+from agents.ledger import EPSILON, TRANSACTION_TYPES, LedgerEngine
+from agents.portfolio import Holding, Portfolio
+from agents.metrics import counter, histogram
+from agents.storage import get_storage
+from agents.tickers import canonical_ticker
+from agents.tracing import span, traced
 
 DATA_PATH = "data"
 
+# Bumped whenever holdings or the ledger changes (save or on-disk edit) so
+# derived caches (e.g. allocation) can invalidate.
+_holdings_version = 0
+
+# Kinds whose changes move positions.
+_POSITION_KINDS = ("holdings", "transactions", "income")
+
+# kind -> (storage signature, parsed snapshot)
+_cache = {}
+_cache_lock = threading.Lock()
+
+# (holdings snapshot, Portfolio of its rows)
+_holdings_portfolio_cache = (None, None)
+
+# ((opening Portfolio, transactions, income), Portfolio of current positions)
+_portfolio_cache = (None, None)
+
+_ledger = LedgerEngine()
+
+STORAGE_READS = counter(
+    "portfolio_storage_reads_total", "Snapshot loads by kind and result (hit, miss).", ("kind", "result")
+)
+STORAGE_READ_SECONDS = histogram("portfolio_storage_read_seconds", "Backend read and parse time.", ("kind",))
+STORAGE_WRITES = counter("portfolio_storage_writes_total", "Writes that invalidated a snapshot.", ("kind",))
+
+
+class FrozenRecord(dict):
+    """
+    Read-only dict used for cached holdings/watchlist rows.
+    Copy with dict(record) before editing.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Loaded records are read-only; copy with dict(record) first.")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+
+def _freeze(items):
+    return tuple(FrozenRecord(item) if isinstance(item, dict) else item for item in items)
+
+
+def _load_cached(kind):
+    """
+    Read kind once and reuse the snapshot until the backend signature
+    (file stat or database revision) changes.
+    """
+    global _holdings_version
+
+    storage = get_storage()
+    signature = storage.signature(kind)
+
+    with _cache_lock:
+        cached = _cache.get(kind)
+        if cached and cached[0] == signature:
+            STORAGE_READS.inc(kind=kind, result="hit")
+            return cached[1]
+
+    STORAGE_READS.inc(kind=kind, result="miss")
+    start = time.perf_counter()
+    with span("read", stage="storage", kind=kind):
+        snapshot = _freeze(storage.read(kind))
+    STORAGE_READ_SECONDS.observe(time.perf_counter() - start, kind=kind)
+
+    with _cache_lock:
+        _cache[kind] = (signature, snapshot)
+        if kind in _POSITION_KINDS:
+            _holdings_version += 1
+
+    return snapshot
+
+
+def _invalidate(kind):
+    """
+    Drop the cached snapshot after a write; the next load re-reads it.
+    """
+    global _holdings_version
+
+    STORAGE_WRITES.inc(kind=kind)
+    with _cache_lock:
+        _cache.pop(kind, None)
+        if kind in _POSITION_KINDS:
+            _holdings_version += 1
+
+
+def holdings_version():
+    return _holdings_version
+
+
+def is_holdings_snapshot(holdings):
+    """
+    True when holdings is the current cached snapshot from load_holdings(),
+    load_holdings_portfolio() or load_portfolio().
+    """
+    with _cache_lock:
+        cached = _cache.get("holdings")
+        rows, rows_portfolio = _holdings_portfolio_cache
+        _, portfolio = _portfolio_cache
+
+    if cached is None:
+        return False
+    if cached[1] is holdings:
+        return True
+    if rows_portfolio is holdings and rows is cached[1]:
+        return True
+    return portfolio is holdings and holdings is load_portfolio()
+
 
 def load_holdings():
-    if not os.path.exists(HOLDINGS_FILE):
-        return []
+    """
+    Holdings as an immutable tuple (dict rows are read-only).
+    """
+    return _load_cached("holdings")
+
+
+def load_holdings_portfolio():
+    """
+    The saved holdings rows as a typed Portfolio, without ledger activity.
+    Use this when editing and re-saving holdings.
+    """
+    global _holdings_portfolio_cache
+
+    holdings = load_holdings()
+
+    with _cache_lock:
+        snapshot, portfolio = _holdings_portfolio_cache
+    if snapshot is holdings:
+        return portfolio
+
+    portfolio = Portfolio.from_records(holdings)
+    with _cache_lock:
+        _holdings_portfolio_cache = (holdings, portfolio)
+    return portfolio
+
+
+def load_positions():
+    """
+    {ticker: Position} with FIFO lots, average cost and realized P/L.
+    """
+    return _ledger.sync(load_holdings_portfolio(), load_transactions(), load_income())
+
+
+def load_portfolio():
+    """
+    Current positions as a typed Portfolio: holdings rows plus ledger
+    buys, sells and DRIPs (shares, average cost, first lot date).
+    Rebuilt only when holdings or the ledger change.
+    """
+    global _portfolio_cache
 
-    with open(HOLDINGS_FILE, "r") as f:
-        data = json.load(f)
+    opening = load_holdings_portfolio()
+    key = (opening, load_transactions(), load_income())
 
-    # Support both legacy {"holdings": [...]} and plain list formats.
-    if isinstance(data, dict):
-        return data.get("holdings", [])
+    with _cache_lock:
+        cached_key, portfolio = _portfolio_cache
+    if cached_key is not None and all(a is b for a, b in zip(cached_key, key)):
+        return portfolio
 
-    return data
+    positions = _ledger.sync(*key)
+    portfolio = Portfolio(
+        position.to_holding()
+        for ticker, position in positions.items()
+        if ticker in opening or position.shares > EPSILON
+    )
+    with _cache_lock:
+        _portfolio_cache = (key, portfolio)
+    return portfolio
 
 
 def load_watchlist():
-    if not os.path.exists(WATCHLIST_FILE):
-        return []
+    """
+    Watchlist as an immutable tuple.
+    """
+    return _load_cached("watchlist")
 
-    with open(WATCHLIST_FILE, "r") as f:
-        data = json.load(f)
 
-    if isinstance(data, dict):
-        return data.get("watchlist", [])
+def load_income():
+    """
+    Income ledger (dividends/distributions) as an immutable tuple.
+    """
+    return _load_cached("income")
 
-    return data
 
+def load_transactions():
+    """
+    Transaction ledger (buy/sell/drip rows) as an immutable tuple.
+    """
+    return _load_cached("transactions")
 
+
+def _to_record(holding):
+    return holding.to_record() if isinstance(holding, Holding) else holding
+
+
+@traced("storage")
 def save_holdings(holdings):
-    # Standardize on plain list to match current holdings.json structure.
-    with open(HOLDINGS_FILE, "w") as f:
-        json.dump(holdings, f, indent=4)
+    """
+    Persist the full holdings list. The SQLite backend only writes the rows
+    that differ from what is stored.
+    """
+    holdings = [_to_record(h) for h in holdings]
+    get_storage().write("holdings", holdings)
+    _invalidate("holdings")
+
+
+def upsert_holding(holding):
+    """
+    Add or replace the position for holding's ticker (a single-row write).
+    """
+    get_storage().upsert("holdings", _to_record(holding))
+    _invalidate("holdings")
+
+
+def remove_holding(ticker):
+    """
+    Remove a position: its holdings rows and its ledger transactions.
+    """
+    storage = get_storage()
+    storage.delete("holdings", ticker)
+    storage.delete("transactions", ticker)
+    _invalidate("holdings")
+    _invalidate("transactions")
+
+
+def record_transaction(ticker, txn_type, shares, price, date=None):
+    """
+    Append one buy/sell/drip row to the ledger (a single-row write).
+    """
+    txn_type = str(txn_type).lower().strip()
+    if txn_type not in TRANSACTION_TYPES:
+        raise ValueError(f"Unknown transaction type '{txn_type}'. Use one of: {', '.join(TRANSACTION_TYPES)}.")
+
+    txn = {
+        "ticker": canonical_ticker(ticker) or "",
+        "type": txn_type,
+        "shares": float(shares),
+        "price": float(price),
+        "date": str(date) if date else None,
+    }
+    get_storage().append("transactions", txn)
+    _invalidate("transactions")
+    return txn
 
 
 def save_watchlist(watchlist):
-    with open(WATCHLIST_FILE, "w") as f:
-        json.dump({"watchlist": watchlist}, f, indent=4)
+    get_storage().write("watchlist", list(watchlist))
+    _invalidate("watchlist")
+
+
+def save_income(income):
+    get_storage().write("income", list(income))
+    _invalidate("income")
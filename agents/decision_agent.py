@@ -1,6 +1,5 @@
-from agents.technical_agent import analyze_technical
-from agents.fundamental_agent import analyze_fundamental
-from agents.sentiment_agent import analyze_sentiment
+from agents.analysis_agent import get_analysis
+from agents.tracing import traced
 
 
 def _parse_sentiment(sentiment):
@@ -12,11 +11,13 @@ def _parse_sentiment(sentiment):
     return "neutral"
 
 
+@traced("decision", ticker=True)
 def generate_decision(ticker):
 
-    technical = analyze_technical(ticker)
-    fundamental = analyze_fundamental(ticker)
-    sentiment = analyze_sentiment(ticker)
+    analysis = get_analysis(ticker)
+    technical = analysis["technical"]
+    fundamental = analysis["fundamental"]
+    sentiment = analysis["sentiment"]
 
     decision = "HOLD"
     reasoning = []
@@ -80,6 +81,7 @@ def generate_decision(ticker):
     }
 
 
+@traced("decision", ticker=True)
 def generate_watch_decision(ticker, signal_data):
     """
     Decision logic ONLY for watchlist tickers.
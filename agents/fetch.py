@@ -0,0 +1,220 @@
+"""
+Resilient Fetch Layer
+Shared guard for calls to external data providers:
+
+- a token bucket per host caps the request rate (bursts allowed),
+- transient failures are retried with jittered exponential backoff,
+- a per-host circuit breaker stops calling a failing host for a while,
+- every call returns a FetchResult, so callers can tell "the provider has
+  no data" (NO_DATA) from "try again later" (UNAVAILABLE).
+"""
+import random
+import threading
+import time
+
+from agents.metrics import counter, histogram
+from config import (
+    FETCH_BREAKER_FAILURES,
+    FETCH_BREAKER_RESET_SECONDS,
+    FETCH_BURST,
+    FETCH_MAX_RETRIES,
+    FETCH_RATE_PER_SECOND,
+)
+
+OK = "ok"
+NO_DATA = "no_data"
+UNAVAILABLE = "unavailable"
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+FETCH_CALLS = counter("portfolio_fetch_calls_total", "Guarded market-data calls by host and outcome.", ("host", "status"))
+FETCH_RETRIES = counter("portfolio_fetch_retries_total", "Market-data attempts retried after an error.", ("host",))
+FETCH_SECONDS = histogram("portfolio_fetch_seconds", "Market-data call latency, retries included.", ("host",))
+
+
+class FetchResult:
+    """
+    Outcome of a guarded call: status, value (when OK) and the last error.
+    """
+
+    __slots__ = ("status", "value", "error")
+
+    def __init__(self, status, value=None, error=None):
+        self.status = status
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.status == OK
+
+    def __repr__(self):
+        detail = f", error={self.error!r}" if self.error else ""
+        return f"FetchResult({self.status}{detail})"
+
+
+# ==============================
+# RATE LIMIT
+# ==============================
+
+class TokenBucket:
+    """
+    Allows rate calls per second on average, with bursts up to capacity.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, sleeping until one is available.
+        """
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# ==============================
+# CIRCUIT BREAKER
+# ==============================
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures. Once reset_seconds
+    have passed, one trial call is let through: success closes it, failure
+    re-opens it.
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def _host_guards(host):
+    with _hosts_lock:
+        guards = _hosts.get(host)
+        if guards is None:
+            guards = (
+                TokenBucket(FETCH_RATE_PER_SECOND, FETCH_BURST),
+                CircuitBreaker(FETCH_BREAKER_FAILURES, FETCH_BREAKER_RESET_SECONDS),
+            )
+            _hosts[host] = guards
+    return guards
+
+
+def breaker_state(host):
+    return _host_guards(host)[1].state
+
+
+def reset_hosts():
+    """
+    Forget rate-limit and breaker state for every host.
+    """
+    with _hosts_lock:
+        _hosts.clear()
+
+
+def _backoff(attempt):
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)
+
+
+def guarded_call(host, func, *args, no_data_errors=(), is_empty=None, retries=None, **kwargs):
+    """
+    Call func(*args, **kwargs) under host's rate limit and circuit breaker.
+
+    Exceptions in no_data_errors, or a value for which is_empty(value) is
+    true, give NO_DATA without counting as a failure. Other exceptions are
+    retried; once retries run out (or the breaker is open) the result is
+    UNAVAILABLE.
+    """
+    start = time.perf_counter()
+    result = _guarded(host, func, args, kwargs, no_data_errors, is_empty, retries)
+    FETCH_SECONDS.observe(time.perf_counter() - start, host=host)
+    FETCH_CALLS.inc(host=host, status=result.status)
+    return result
+
+
+def _guarded(host, func, args, kwargs, no_data_errors, is_empty, retries):
+    bucket, breaker = _host_guards(host)
+    retries = FETCH_MAX_RETRIES if retries is None else retries
+    error = None
+
+    for attempt in range(retries + 1):
+        if not breaker.allow():
+            return FetchResult(UNAVAILABLE, error=error or f"circuit open for {host}")
+
+        bucket.acquire()
+        try:
+            value = func(*args, **kwargs)
+        except no_data_errors as exc:
+            breaker.record_success()
+            return FetchResult(NO_DATA, error=str(exc))
+        except Exception as exc:
+            breaker.record_failure()
+            error = f"{type(exc).__name__}: {exc}"
+            if attempt < retries:
+                FETCH_RETRIES.inc(host=host)
+                time.sleep(_backoff(attempt))
+            continue
+
+        breaker.record_success()
+        if is_empty is not None and is_empty(value):
+            return FetchResult(NO_DATA, value=value)
+        return FetchResult(OK, value=value)
+
+    return FetchResult(UNAVAILABLE, error=error)
@@ -4,6 +4,10 @@ Evaluates company/ETF strength using basic financial logic.
 Designed for conservative–moderate portfolio decisions.
 """
 
+from agents.tracing import traced
+
+
+@traced("fundamental", ticker=True)
 def analyze_fundamental(ticker):
     """
     Returns a simplified fundamental assessment.
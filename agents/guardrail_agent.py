@@ -1,28 +1,21 @@
-from agents.allocation_agent import calculate_allocation, detect_drift, classify_ticker
+from agents.allocation_agent import get_allocation_snapshot, classify_ticker
+from agents.tickers import canonical_ticker
+from agents.tracing import traced
 
 
 # Core preference set from your stated target strategy.
 CORE_TARGET_TICKERS = {"SAFE.TO", "VCN.TO", "XBB.TO", "ENB.TO", "TD.TO"}
 
 
-def _normalize_ticker(ticker):
-    if not ticker:
-        return None
-    ticker = str(ticker).upper().strip()
-    if "." not in ticker and classify_ticker(f"{ticker}.TO") != "unknown":
-        return f"{ticker}.TO"
-    return ticker
-
-
 def _asset_class(ticker):
-    ticker = _normalize_ticker(ticker)
+    ticker = canonical_ticker(ticker)
     if not ticker:
         return "unknown"
     return classify_ticker(ticker)
 
 
 def _score_ticker(ticker, drift, mode="strict"):
-    ticker = _normalize_ticker(ticker)
+    ticker = canonical_ticker(ticker)
     asset = _asset_class(ticker)
 
     if asset == "unknown":
@@ -59,6 +52,7 @@ def _score_ticker(ticker, drift, mode="strict"):
     return round(score, 3), None
 
 
+@traced("guardrails")
 def apply_target_guardrails(recommendations, holdings, mode="strict"):
     """
     Strict guardrail filter and re-ranker for recommendation candidates.
@@ -70,24 +64,22 @@ def apply_target_guardrails(recommendations, holdings, mode="strict"):
     if mode not in {"strict", "balanced", "off"}:
         mode = "strict"
 
+    snapshot = get_allocation_snapshot(holdings) if holdings else {}
+    current = snapshot.get("weights", {})
+    drift = snapshot.get("drift", {})
+
     if mode == "off":
         out = dict(recommendations)
         out["guardrail"] = {
             "mode": "off",
-            "current_allocation": calculate_allocation(holdings) if holdings else {},
-            "drift": detect_drift(calculate_allocation(holdings)) if holdings else {},
+            "current_allocation": current,
+            "drift": drift,
             "ranked": [],
             "dropped": [],
             "note": "Guardrail disabled",
         }
         return out
 
-    if not holdings:
-        current = {}
-    else:
-        current = calculate_allocation(holdings)
-    drift = detect_drift(current) if current else {}
-
     etfs = recommendations.get("etfs", []) or []
     stocks = recommendations.get("stocks", []) or []
 
@@ -96,7 +88,7 @@ def apply_target_guardrails(recommendations, holdings, mode="strict"):
     seen = set()
 
     for raw in etfs + stocks:
-        ticker = _normalize_ticker(raw)
+        ticker = canonical_ticker(raw)
         if not ticker or ticker in seen:
             continue
         seen.add(ticker)
@@ -0,0 +1,275 @@
+"""
+Local OHLCV History Store
+Keeps daily bars on disk (one compressed .npz per ticker) so agents only
+download the bars missing since the last stored date.
+
+Bars are fetched through agents.market_data and stored as the provider
+returns them (dividend-adjusted at fetch time); adjustments published after
+a bar was stored are not back-filled. Providers other than the default keep
+their bars in a separate subdirectory.
+"""
+import os
+import re
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from agents.fetch import FetchResult, NO_DATA, OK, UNAVAILABLE
+from agents.market_data import COLUMNS, fetch_histories, fetch_history, get_provider
+from agents.tracing import traced
+from config import HISTORY_DIR, HISTORY_REFRESH_SECONDS
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _ticker_lock(ticker):
+    with _locks_guard:
+        lock = _locks.get(ticker)
+        if lock is None:
+            lock = _locks[ticker] = threading.Lock()
+        return lock
+
+
+def _store_dir():
+    return os.path.join(HISTORY_DIR, get_provider().cache_namespace)
+
+
+def _store_path(ticker):
+    safe = re.sub(r"[^A-Z0-9._-]", "_", ticker)
+    return os.path.join(_store_dir(), f"{safe}.npz")
+
+
+def _empty_frame():
+    frame = pd.DataFrame(columns=COLUMNS, dtype=float)
+    frame.index = pd.DatetimeIndex([], name="Date")
+    return frame
+
+
+def period_start(period, today=None):
+    """
+    Translate a yfinance-style period ("5d", "3mo", "1y", "ytd", "max")
+    into the first calendar date it covers. Returns None for "max".
+    """
+    today = today or date.today()
+    period = str(period or "6mo").lower().strip()
+
+    if period == "max":
+        return None
+    if period == "ytd":
+        return date(today.year, 1, 1)
+
+    units = (("mo", "months"), ("wk", "weeks"), ("d", "days"), ("y", "years"))
+    for suffix, unit in units:
+        if period.endswith(suffix) and period[: -len(suffix)].isdigit():
+            count = int(period[: -len(suffix)])
+            return (pd.Timestamp(today) - pd.DateOffset(**{unit: count})).date()
+
+    raise ValueError(f"Unsupported history period: {period}")
+
+
+# ==============================
+# DISK FORMAT
+# ==============================
+
+def _read(ticker):
+    path = _store_path(ticker)
+    if not os.path.exists(path):
+        return None, {}
+
+    with np.load(path) as stored:
+        index = pd.DatetimeIndex(stored["dates"].astype("datetime64[ns]"), name="Date")
+        frame = pd.DataFrame({col: stored[col] for col in COLUMNS}, index=index)
+        covered_from = stored["covered_from"][0]
+        meta = {
+            "covered_from": None if np.isnat(covered_from) else pd.Timestamp(covered_from).date(),
+            "fetched_at": float(stored["fetched_at"][0]),
+        }
+    return frame, meta
+
+
+def _write(ticker, frame, meta):
+    path = _store_path(ticker)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    covered_from = meta.get("covered_from")
+    arrays = {col: frame[col].to_numpy(dtype="float64") for col in COLUMNS}
+    arrays["dates"] = frame.index.to_numpy().astype("datetime64[D]")
+    arrays["covered_from"] = np.array(
+        [np.datetime64(covered_from, "D") if covered_from else np.datetime64("NaT", "D")]
+    )
+    arrays["fetched_at"] = np.array([meta.get("fetched_at", 0.0)], dtype="float64")
+
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+# ==============================
+# FETCH + MERGE
+# ==============================
+
+def _merge(stored, fresh):
+    if stored is None or stored.empty:
+        return fresh
+    if fresh.empty:
+        return stored
+
+    merged = pd.concat([stored, fresh])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    return merged.sort_index()
+
+
+def _refresh(ticker, stored, meta, start, today):
+    """
+    Bring stored bars up to date; returns (frame, fetch status).
+    """
+    now = time.time()
+
+    if stored is None:
+        result = fetch_history(ticker, start)
+        if not result.ok:
+            return _empty_frame(), result.status
+        _write(ticker, result.value, {"covered_from": start, "fetched_at": now})
+        return result.value, OK
+
+    frame = stored
+    status = OK
+    changed = False
+    covered_from = meta.get("covered_from")
+    fetched_at = meta.get("fetched_at", 0.0)
+
+    # Back-fill older bars when a longer period is requested.
+    if covered_from is not None and (start is None or start < covered_from):
+        older = fetch_history(ticker, start, end=covered_from)
+        if older.status == UNAVAILABLE:
+            status = UNAVAILABLE
+        else:
+            frame = _merge(frame, older.value)
+            covered_from = start
+            fetched_at = now
+            changed = True
+
+    # Re-fetch from the last stored bar so a partial intraday bar is replaced.
+    # When the provider is unavailable the stored bars are served as-is.
+    if now - fetched_at > HISTORY_REFRESH_SECONDS:
+        last_date = frame.index[-1].date() if not frame.empty else (start or today)
+        fresh = fetch_history(ticker, last_date)
+        if fresh.status == UNAVAILABLE:
+            status = UNAVAILABLE
+        else:
+            frame = _merge(frame, fresh.value)
+            fetched_at = now
+            changed = True
+
+    if changed:
+        _write(ticker, frame, {"covered_from": covered_from, "fetched_at": fetched_at})
+
+    return frame, status
+
+
+@traced("history", ticker=True)
+def get_history_result(ticker, period="6mo"):
+    """
+    Like get_history, as a FetchResult: OK with bars (stored bars are served
+    when a refresh fails), NO_DATA when the provider has none, UNAVAILABLE
+    when no bars are available and the fetch failed. The value is always a
+    (possibly empty) frame.
+    """
+    ticker = str(ticker or "").upper().strip()
+    if not ticker:
+        return FetchResult(NO_DATA, value=_empty_frame())
+
+    today = date.today()
+    start = period_start(period, today)
+
+    with _ticker_lock(ticker):
+        stored, meta = _read(ticker)
+        frame, status = _refresh(ticker, stored, meta, start, today)
+
+    if not frame.empty and start is not None:
+        frame = frame.loc[frame.index >= pd.Timestamp(start)]
+
+    if frame.empty:
+        return FetchResult(NO_DATA if status == OK else status, value=frame.copy())
+    return FetchResult(OK, value=frame.copy())
+
+
+def get_history(ticker, period="6mo"):
+    """
+    Return daily OHLCV bars for ticker covering period, indexed by date.
+    Only bars newer than the stored data are downloaded.
+    """
+    return get_history_result(ticker, period).value
+
+
+def _bulk_refresh(tickers, start, today):
+    """
+    Refresh cold and stale tickers with one bulk fetch per start date.
+    Returns {ticker: bars} for the tickers it brought up to date; the rest
+    (fresh, needing a back-fill, or left out of the bulk response) are for
+    the per-ticker path.
+    """
+    now = time.time()
+    groups = {}
+    for ticker in tickers:
+        with _ticker_lock(ticker):
+            stored, meta = _read(ticker)
+        if stored is None:
+            groups.setdefault(start, []).append(ticker)
+            continue
+        covered_from = meta.get("covered_from")
+        if covered_from is not None and (start is None or start < covered_from):
+            continue
+        if now - meta.get("fetched_at", 0.0) > HISTORY_REFRESH_SECONDS:
+            last_date = stored.index[-1].date() if not stored.empty else (start or today)
+            groups.setdefault(last_date, []).append(ticker)
+
+    refreshed = {}
+    for group_start, group in groups.items():
+        if len(group) < 2:
+            continue
+        for ticker, result in fetch_histories(group, group_start).items():
+            if not result.ok:
+                continue
+            with _ticker_lock(ticker):
+                stored, meta = _read(ticker)
+                if stored is None:
+                    meta = {"covered_from": group_start}
+                frame = _merge(stored, result.value)
+                _write(ticker, frame, {"covered_from": meta.get("covered_from"), "fetched_at": now})
+            refreshed[ticker] = frame
+    return refreshed
+
+
+def get_close_matrix(tickers, period="6mo"):
+    """
+    Date-aligned closes (rows: dates, columns: tickers); NaN where a
+    ticker has no bar. Tickers without history are left out.
+
+    Cold and stale tickers are fetched in bulk; anything the bulk request
+    did not cover goes through get_history one ticker at a time.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    keys = {ticker: str(ticker or "").upper().strip() for ticker in tickers}
+    today = date.today()
+    start = period_start(period, today)
+    refreshed = _bulk_refresh([key for key in dict.fromkeys(keys.values()) if key], start, today)
+
+    closes = {}
+    for ticker in tickers:
+        hist = refreshed.get(keys[ticker])
+        if hist is None:
+            hist = get_history(ticker, period=period)
+        elif start is not None:
+            hist = hist.loc[hist.index >= pd.Timestamp(start)]
+        if not hist.empty:
+            closes[ticker] = hist["Close"]
+
+    if not closes:
+        return pd.DataFrame()
+    return pd.concat(closes, axis=1).sort_index()
@@ -0,0 +1,258 @@
+"""
+Bulk Holdings Import / Export
+Broker CSV exports are parsed in chunks, validated and canonicalized
+column-wise, then saved through the data loader in one write (so an
+import is all-or-nothing; only the raw text is bounded by the chunk
+size). Holdings export to Parquet when pyarrow is installed, otherwise
+to a NumPy .npz of column arrays.
+
+Each imported row becomes one lot; several rows per ticker are allowed.
+"""
+import io
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from agents.data_loader import load_holdings, load_holdings_portfolio, save_holdings
+from agents.tickers import canonical_tickers
+from config import IMPORT_CHUNK_ROWS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: falls back to .npz
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = ["ticker", "shares", "buy_price", "buy_date"]
+
+# Normalized header -> field. Headers are lower-cased with non-alphanumerics
+# removed. When several columns map to one field, the alias listed first
+# wins, whatever the column order in the file.
+COLUMN_ALIASES = {
+    "ticker": "ticker",
+    "symbol": "ticker",
+    "securitysymbol": "ticker",
+    "shares": "shares",
+    "quantity": "shares",
+    "qty": "shares",
+    "units": "shares",
+    "averagecost": "buy_price",
+    "avgcost": "buy_price",
+    "costpershare": "buy_price",
+    "buyprice": "buy_price",
+    "averageprice": "buy_price",
+    "avgprice": "buy_price",
+    "bookcost": "book_value",
+    "bookvalue": "book_value",
+    "bookvaluecad": "book_value",
+    "totalcost": "book_value",
+    # Usually the current market price: only used when no cost column exists.
+    "price": "price",
+    "tradedate": "buy_date",
+    "buydate": "buy_date",
+    "transactiondate": "buy_date",
+    "settlementdate": "buy_date",
+    "date": "buy_date",
+}
+
+_ALIAS_RANK = {alias: rank for rank, alias in enumerate(COLUMN_ALIASES)}
+
+TICKER_PATTERN = r"^[A-Z0-9][A-Z0-9.\-]{0,14}$"
+
+
+def _normalize_header(name):
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def _column_map(columns):
+    """
+    {column: field}, one column per field, chosen by alias priority.
+    """
+    best = {}
+    for column in columns:
+        alias = _normalize_header(column)
+        field = COLUMN_ALIASES.get(alias)
+        if field and (field not in best or _ALIAS_RANK[alias] < best[field][0]):
+            best[field] = (_ALIAS_RANK[alias], column)
+    return {column: field for field, (_, column) in best.items()}
+
+
+def _numeric(series):
+    # Broker exports often format numbers as "$1,234.50".
+    if not pd.api.types.is_numeric_dtype(series):
+        series = series.astype(str).str.replace(r"[$,\s]", "", regex=True)
+    return pd.to_numeric(series, errors="coerce")
+
+
+def _clean_chunk(chunk, mapping):
+    """
+    Validate one chunk column-wise; returns (valid frame, rejected count).
+    """
+    chunk = chunk.rename(columns=mapping)
+    n = len(chunk)
+
+    tickers = canonical_tickers(chunk["ticker"]) if "ticker" in chunk else pd.Series([""] * n)
+    shares = _numeric(chunk["shares"]) if "shares" in chunk else pd.Series(np.nan, index=chunk.index)
+
+    if "buy_price" in chunk:
+        price = _numeric(chunk["buy_price"])
+    elif "book_value" in chunk:
+        price = _numeric(chunk["book_value"]) / shares
+    elif "price" in chunk:
+        price = _numeric(chunk["price"])
+    else:
+        price = pd.Series(0.0, index=chunk.index)
+
+    if "buy_date" in chunk:
+        dates = pd.to_datetime(chunk["buy_date"], errors="coerce", format="mixed").dt.strftime("%Y-%m-%d")
+    else:
+        dates = pd.Series(None, index=chunk.index, dtype=object)
+
+    valid = (
+        tickers.str.match(TICKER_PATTERN)
+        & np.isfinite(shares)
+        & (shares > 0)
+        & np.isfinite(price)
+        & (price >= 0)
+    )
+
+    frame = pd.DataFrame(
+        {
+            "ticker": tickers[valid].to_numpy(),
+            "shares": shares[valid].to_numpy(dtype="float64"),
+            "buy_price": price[valid].round(6).to_numpy(dtype="float64"),
+            "buy_date": dates[valid].to_numpy(dtype=object),
+        }
+    )
+    return frame, int(n - valid.sum())
+
+
+def _records(frame):
+    shares = frame["shares"].to_numpy()
+    whole = np.equal(np.mod(shares, 1), 0)
+    dates = frame["buy_date"].to_numpy(dtype=object)
+
+    return [
+        {
+            "ticker": ticker,
+            "shares": int(s) if w else float(s),
+            "buy_price": float(p),
+            "buy_date": d if isinstance(d, str) else None,
+        }
+        for ticker, s, w, p, d in zip(frame["ticker"].to_numpy(), shares, whole, frame["buy_price"].to_numpy(), dates)
+    ]
+
+
+# ==============================
+# IMPORT
+# ==============================
+
+def import_holdings_csv(source, replace=False, chunksize=None):
+    """
+    Import a broker CSV (path or file-like) into holdings.
+
+    Recognized columns: symbol/ticker, quantity/shares, an average cost or
+    a total book value (a plain "Price" column is only used when neither
+    exists), and an optional trade/settlement date. Rows with a
+    bad ticker, non-positive quantity or invalid price are skipped.
+
+    replace=True swaps out the current holdings; otherwise the rows are
+    appended as new lots. Everything is saved in one write.
+
+    Returns {"imported", "rejected", "tickers"}.
+    """
+    chunksize = chunksize or IMPORT_CHUNK_ROWS
+    frames = []
+    rejected = 0
+    mapping = None
+
+    reader = pd.read_csv(source, chunksize=chunksize, dtype=str, skipinitialspace=True)
+    for chunk in reader:
+        if mapping is None:
+            mapping = _column_map(chunk.columns)
+            fields = set(mapping.values())
+            if "ticker" not in fields or "shares" not in fields:
+                raise ValueError(
+                    "CSV needs a symbol/ticker and a quantity/shares column; "
+                    f"found: {', '.join(map(str, chunk.columns))}"
+                )
+        frame, bad = _clean_chunk(chunk, mapping)
+        frames.append(frame)
+        rejected += bad
+
+    imported = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=EXPORT_COLUMNS)
+    records = _records(imported)
+
+    existing = [] if replace else list(load_holdings())
+    save_holdings(existing + records)
+
+    return {
+        "imported": len(records),
+        "rejected": rejected,
+        "tickers": sorted(set(imported["ticker"])),
+    }
+
+
+# ==============================
+# EXPORT
+# ==============================
+
+def holdings_frame():
+    """
+    Saved holdings rows as a typed DataFrame (legacy rows have 1 share, cost 0).
+    """
+    portfolio = load_holdings_portfolio()
+    tickers, shares, prices = portfolio.columns()
+    return pd.DataFrame(
+        {
+            "ticker": pd.Series(tickers, dtype=object),
+            "shares": shares,
+            "buy_price": prices,
+            "buy_date": pd.Series([h.buy_date.isoformat() if h.buy_date else None for h in portfolio], dtype=object),
+        }
+    )
+
+
+def export_holdings(destination, format=None):
+    """
+    Write holdings in a columnar format to a path or binary file-like.
+
+    format is "parquet" (needs pyarrow) or "npz"; by default it follows the
+    file extension, else parquet when pyarrow is available. Returns the
+    format used.
+    """
+    if format is None:
+        ext = os.path.splitext(destination)[1].lower() if isinstance(destination, str) else ""
+        format = {".parquet": "parquet", ".npz": "npz"}.get(ext, "parquet" if pq else "npz")
+
+    frame = holdings_frame()
+
+    if format == "parquet":
+        if pq is None:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow); use format='npz'.")
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        pq.write_table(table, destination)
+    elif format == "npz":
+        np.savez_compressed(
+            destination,
+            ticker=frame["ticker"].to_numpy(dtype=str),
+            shares=frame["shares"].to_numpy(),
+            buy_price=frame["buy_price"].to_numpy(),
+            buy_date=frame["buy_date"].fillna("").to_numpy(dtype=str),
+        )
+    else:
+        raise ValueError(f"Unknown export format '{format}'. Use 'parquet' or 'npz'.")
+
+    return format
+
+
+def export_holdings_bytes(format=None):
+    """
+    (bytes, format) for download buttons.
+    """
+    buffer = io.BytesIO()
+    format = export_holdings(buffer, format=format)
+    return buffer.getvalue(), format
@@ -0,0 +1,259 @@
+"""
+Lot Ledger
+Per-ticker FIFO lots, average cost and realized P/L built from:
+
+- the holdings rows (each one is the opening lot for its ticker),
+- the transaction ledger (buy / sell / drip),
+- DRIP entries in the income ledger (income rows with reinvested shares).
+
+Transactions and income are applied as one stream ordered by date, then
+transactions before income, then recorded order; undated rows count as
+the most recent. The engine keeps its state between calls and only
+applies rows appended since the last sync. It rebuilds when earlier rows
+change (checked against a digest of every applied row) or a new row sorts
+before one already applied, so the result always equals a full rebuild.
+"""
+import hashlib
+import json
+import threading
+from collections import deque
+from datetime import date
+
+from agents.portfolio import Holding, _to_date, _to_float
+from agents.tickers import canonical_ticker
+
+TRANSACTION_TYPES = ("buy", "sell", "drip")
+DRIP_TYPES = ("drip", "reinvested", "reinvestment")
+
+# Shares below this are treated as zero (float noise from partial sells).
+EPSILON = 1e-9
+
+
+class Position:
+    """
+    Open lots for one ticker plus running totals.
+    """
+
+    __slots__ = ("ticker", "lots", "shares", "cost", "realized_pnl", "income", "legacy")
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.lots = deque()  # [shares, price, date], oldest first
+        self.shares = 0.0
+        self.cost = 0.0
+        self.realized_pnl = 0.0
+        self.income = 0.0
+        self.legacy = False
+
+    @property
+    def avg_cost(self):
+        return self.cost / self.shares if self.shares > EPSILON else 0.0
+
+    @property
+    def first_date(self):
+        return self.lots[0][2] if self.lots else None
+
+    def buy(self, shares, price, when=None):
+        if shares <= 0:
+            return
+        self.lots.append([shares, price, when])
+        self.shares += shares
+        self.cost += shares * price
+
+    def sell(self, shares, price):
+        """
+        Close shares FIFO; realized P/L is proceeds minus the lots' cost.
+        Selling more than is held closes what exists.
+        """
+        remaining = min(shares, self.shares)
+        while remaining > EPSILON and self.lots:
+            lot = self.lots[0]
+            used = min(lot[0], remaining)
+            self.realized_pnl += used * (price - lot[1])
+            self.cost -= used * lot[1]
+            self.shares -= used
+            lot[0] -= used
+            remaining -= used
+            if lot[0] <= EPSILON:
+                self.lots.popleft()
+
+        if self.shares <= EPSILON:
+            self.shares = 0.0
+            self.cost = 0.0
+
+    def to_holding(self):
+        return Holding(
+            self.ticker,
+            shares=self.shares,
+            buy_price=self.avg_cost,
+            buy_date=self.first_date,
+            legacy=self.legacy,
+        )
+
+    def __repr__(self):
+        return (
+            f"Position({self.ticker!r}, shares={self.shares}, avg_cost={self.avg_cost:.4f}, "
+            f"realized_pnl={self.realized_pnl:.2f}, lots={len(self.lots)})"
+        )
+
+
+def _row_key(item):
+    return json.dumps(item, sort_keys=True, default=str)
+
+
+def _digest(rows):
+    """
+    Running digest over rows' keys; .update it with more rows to extend.
+    """
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(_row_key(row).encode("utf-8"))
+        digest.update(b"\n")
+    return digest
+
+
+def _event_key(row, rank, index):
+    # (date, stream, position): a total order that is stable across syncs.
+    return (_to_date(row.get("date")) or date.max, rank, index)
+
+
+def _drip_shares(entry):
+    """
+    Reinvested (shares, price) for an income row, or None for cash income.
+    """
+    kind = str(entry.get("type", "")).lower().strip()
+    shares = _to_float(entry.get("shares"))
+    price = _to_float(entry.get("price"))
+    amount = _to_float(entry.get("amount"))
+
+    if kind not in DRIP_TYPES and shares <= 0:
+        return None
+    if shares <= 0 and price > 0:
+        shares = amount / price
+    if shares <= 0:
+        return None
+    if price <= 0:
+        price = amount / shares
+    return shares, price
+
+
+class LedgerEngine:
+    """
+    Incremental positions over (holdings, transactions, income) snapshots.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holdings = None
+        self._positions = {}
+        # (rows seen per stream, digest of each stream's applied rows, event
+        # key of the last applied row)
+        self._cursor = None
+
+    def _position(self, ticker):
+        position = self._positions.get(ticker)
+        if position is None:
+            position = self._positions[ticker] = Position(ticker)
+        return position
+
+    def _rebuild(self, holdings):
+        self._positions = {}
+        self._cursor = None
+        self._holdings = holdings
+
+        for holding in holdings:
+            position = self._position(holding.ticker)
+            if holding.legacy:
+                position.legacy = True
+                continue
+            position.buy(holding.shares, holding.buy_price, holding.buy_date)
+
+    def _apply_transaction(self, txn):
+        ticker = canonical_ticker(txn)
+        kind = str(txn.get("type", "buy")).lower().strip()
+        if not ticker or kind not in TRANSACTION_TYPES:
+            return
+
+        shares = _to_float(txn.get("shares"))
+        price = _to_float(txn.get("price"))
+        position = self._position(ticker)
+
+        if kind == "sell":
+            position.sell(shares, price)
+        else:
+            position.buy(shares, price, _to_date(txn.get("date")))
+            position.legacy = False
+
+    def _apply_income(self, entry):
+        ticker = canonical_ticker(entry)
+        if not ticker:
+            return
+
+        position = self._position(ticker)
+        drip = _drip_shares(entry)
+        if drip is None:
+            position.income += _to_float(entry.get("amount"))
+        else:
+            position.buy(drip[0], drip[1], _to_date(entry.get("date")))
+
+    def _catch_up(self, transactions, income):
+        """
+        Apply rows added since the last sync in event order. Returns False,
+        without applying anything, when applied rows were edited or removed
+        or a new row sorts before the last applied one.
+        """
+        streams = (
+            (transactions, self._apply_transaction),
+            (income, self._apply_income),
+        )
+        empty = _digest(()).digest()
+        counts, digests, position = self._cursor or ((0, 0), (empty, empty), None)
+
+        pending = []
+        applied = []
+        for rank, (rows, apply) in enumerate(streams):
+            count = counts[rank]
+            if count > len(rows):
+                return False
+            digest = _digest(rows[:count])
+            if digest.digest() != digests[rank]:
+                return False
+            for index in range(count, len(rows)):
+                row = rows[index]
+                digest.update(_row_key(row).encode("utf-8"))
+                digest.update(b"\n")
+                if isinstance(row, dict):
+                    pending.append((_event_key(row, rank, index), apply, row))
+            applied.append(digest.digest())
+
+        pending.sort(key=lambda event: event[0])
+        if pending and position is not None and pending[0][0] < position:
+            return False
+
+        for _, apply, row in pending:
+            apply(row)
+
+        self._cursor = (
+            tuple(len(rows) for rows, _ in streams),
+            tuple(applied),
+            pending[-1][0] if pending else position,
+        )
+        return True
+
+    def sync(self, holdings, transactions=(), income=()):
+        """
+        Bring positions up to date and return {ticker: Position}.
+
+        holdings is a Portfolio of opening lots. New ledger rows are applied
+        incrementally; a changed holdings snapshot, edited/removed ledger
+        rows or a backdated new row trigger a rebuild.
+        """
+        with self._lock:
+            if holdings is not self._holdings:
+                self._rebuild(holdings)
+
+            if not self._catch_up(transactions, income):
+                self._rebuild(holdings)
+                self._catch_up(transactions, income)
+
+            return dict(self._positions)
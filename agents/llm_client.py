@@ -0,0 +1,208 @@
+"""
+Shared LLM Client
+Process-wide OpenAI clients reused across agents so HTTP connections stay
+alive between calls. A semaphore caps in-flight requests; rate limits,
+connection errors, timeouts and 5xx responses are retried with jittered
+exponential backoff.
+
+Point OPENAI_BASE_URL at any OpenAI-compatible server (e.g. the stand-in
+in agents.llm_standin) to run against it instead of the real API.
+PORTFOLIO_LLM_MODE=record saves responses and =replay serves them from
+disk (see agents.llm_replay).
+"""
+import asyncio
+import random
+import threading
+import time
+import weakref
+
+from openai import APIConnectionError, AsyncOpenAI, InternalServerError, OpenAI, RateLimitError
+
+from agents.llm_replay import record_response, replay_response
+from agents.metrics import counter, histogram
+from agents.tracing import traced
+from config import (
+    assert_openai_api_key,
+    LLM_BASE_URL,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_MODE,
+    LLM_REPLAY_LATENCY_MS,
+    LLM_TIMEOUT_SECONDS,
+)
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+# Transient failures worth another attempt (APITimeoutError is an
+# APIConnectionError; InternalServerError covers every 5xx status).
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+LLM_REQUESTS = counter("portfolio_llm_requests_total", "Chat completions by model and LLM mode.", ("model", "mode"))
+LLM_SECONDS = histogram("portfolio_llm_seconds", "Chat completion latency, retries included.", ("model",))
+LLM_TOKENS = counter("portfolio_llm_tokens_total", "Tokens reported in usage, by model and type.", ("model", "type"))
+LLM_RATE_LIMITED = counter("portfolio_llm_rate_limited_total", "Rate-limit (429) responses received.", ("model",))
+
+_lock = threading.Lock()
+_client = None
+_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+# Async clients and semaphores are bound to the event loop that uses them.
+_async_state = weakref.WeakKeyDictionary()
+_replay_state = weakref.WeakKeyDictionary()
+
+
+def _client_options():
+    options = {
+        "api_key": assert_openai_api_key(),
+        "timeout": LLM_TIMEOUT_SECONDS,
+        # Retries are handled here so the semaphore is released while waiting.
+        "max_retries": 0,
+    }
+    if LLM_BASE_URL:
+        options["base_url"] = LLM_BASE_URL
+    return options
+
+
+def get_client():
+    """
+    Return the shared synchronous client, creating it on first use.
+    """
+    global _client
+
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = OpenAI(**_client_options())
+    return _client
+
+
+def get_async_client():
+    """
+    Return the async client for the running event loop.
+    """
+    return _loop_state()[0]
+
+
+def _loop_state():
+    loop = asyncio.get_running_loop()
+    with _lock:
+        state = _async_state.get(loop)
+        if state is None:
+            state = (AsyncOpenAI(**_client_options()), asyncio.Semaphore(LLM_MAX_CONCURRENCY))
+            _async_state[loop] = state
+    return state
+
+
+def _replay_semaphore():
+    # Replay needs no client, only the per-loop concurrency limit.
+    loop = asyncio.get_running_loop()
+    with _lock:
+        semaphore = _replay_state.get(loop)
+        if semaphore is None:
+            semaphore = _replay_state[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return semaphore
+
+
+def reset_clients():
+    """
+    Drop shared clients (e.g. after the API key or base URL changes).
+    """
+    global _client
+
+    with _lock:
+        client, _client = _client, None
+        _async_state.clear()
+        _replay_state.clear()
+
+    if client is not None:
+        client.close()
+
+
+def _observe(model, response, start):
+    LLM_REQUESTS.inc(model=model, mode=LLM_MODE)
+    LLM_SECONDS.observe(time.perf_counter() - start, model=model)
+
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, type="prompt")
+        LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, type="completion")
+
+
+def _retry_delay(exc, attempt):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        retry_after = None
+
+    if retry_after is not None and retry_after >= 0:
+        return min(retry_after, BACKOFF_MAX_SECONDS)
+
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)
+
+
+@traced("llm")
+def chat_completion(messages, model, **kwargs):
+    """
+    Create a chat completion on the shared client.
+    """
+    start = time.perf_counter()
+    if LLM_MODE == "replay":
+        with _semaphore:
+            time.sleep(LLM_REPLAY_LATENCY_MS / 1000.0)
+            response = replay_response(model, messages, kwargs)
+        _observe(model, response, start)
+        return response
+
+    client = get_client()
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            with _semaphore:
+                response = client.chat.completions.create(model=model, messages=messages, **kwargs)
+            break
+        except RETRYABLE_ERRORS as exc:
+            if isinstance(exc, RateLimitError):
+                LLM_RATE_LIMITED.inc(model=model)
+            if attempt >= LLM_MAX_RETRIES:
+                raise
+            time.sleep(_retry_delay(exc, attempt))
+
+    _observe(model, response, start)
+    if LLM_MODE == "record":
+        record_response(model, messages, kwargs, response)
+    return response
+
+
+async def achat_completion(messages, model, **kwargs):
+    """
+    Async variant of chat_completion sharing the same limits.
+    """
+    start = time.perf_counter()
+    if LLM_MODE == "replay":
+        async with _replay_semaphore():
+            await asyncio.sleep(LLM_REPLAY_LATENCY_MS / 1000.0)
+            response = replay_response(model, messages, kwargs)
+        _observe(model, response, start)
+        return response
+
+    client, semaphore = _loop_state()
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                response = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+            break
+        except RETRYABLE_ERRORS as exc:
+            if isinstance(exc, RateLimitError):
+                LLM_RATE_LIMITED.inc(model=model)
+            if attempt >= LLM_MAX_RETRIES:
+                raise
+            await asyncio.sleep(_retry_delay(exc, attempt))
+
+    _observe(model, response, start)
+    if LLM_MODE == "record":
+        record_response(model, messages, kwargs, response)
+    return response
@@ -0,0 +1,184 @@
+"""
+LLM Record / Replay
+Chat completions keyed by a hash of the request (model, messages, options).
+In record mode live responses are saved to LLM_RECORDINGS_FILE; in replay
+mode they are served from it, so LLM agents run without network access,
+an API key or spend.
+
+Requests that were never recorded raise ReplayMissError, or get a
+synthetic stand-in answer when PORTFOLIO_LLM_REPLAY_SYNTHETIC=1.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from openai.types.chat import ChatCompletion
+
+from config import LLM_RECORDINGS_FILE, LLM_REPLAY_SYNTHETIC
+
+_local = threading.local()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    request_key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    request TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class ReplayMissError(LookupError):
+    """
+    Raised in replay mode for a request with no recorded response.
+    """
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(LLM_RECORDINGS_FILE), exist_ok=True)
+        conn = sqlite3.connect(LLM_RECORDINGS_FILE, timeout=5.0)
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _request(model, messages, options):
+    return {"model": model, "messages": list(messages), **options}
+
+
+def request_key(model, messages, options=None):
+    """
+    Stable hash of a chat completion request.
+    """
+    request = _request(model, messages, options or {})
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def record_response(model, messages, options, response):
+    """
+    Save a live response (a ChatCompletion or its dict) for later replay.
+    """
+    payload = response.model_dump(mode="json") if hasattr(response, "model_dump") else response
+    request = _request(model, messages, options)
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO recordings (request_key, model, request, response, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                request_key(model, messages, options),
+                model,
+                json.dumps(request, default=str),
+                json.dumps(payload),
+                time.time(),
+            ),
+        )
+
+
+def recorded_response(model, messages, options):
+    """
+    Recorded response payload for a request, or None.
+    """
+    row = _connection().execute(
+        "SELECT response FROM recordings WHERE request_key = ?",
+        (request_key(model, messages, options),),
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def replay_response(model, messages, options):
+    """
+    ChatCompletion for a request from the recordings (or a synthetic one).
+    """
+    payload = recorded_response(model, messages, options)
+    if payload is None:
+        if not LLM_REPLAY_SYNTHETIC:
+            raise ReplayMissError(
+                f"No recorded LLM response for this {model} request. Run once with "
+                "PORTFOLIO_LLM_MODE=record, or set PORTFOLIO_LLM_REPLAY_SYNTHETIC=1."
+            )
+        payload = synthetic_response(model, messages, options)
+    return ChatCompletion.model_validate(payload)
+
+
+# ==============================
+# SYNTHETIC ANSWERS
+# Deterministic stand-ins shaped like the agents' expected output, so the
+# pipeline can run end to end without any recordings.
+# ==============================
+
+_MOODS = ("Bullish", "Neutral", "Bearish")
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _mood(ticker):
+    return _MOODS[int(hashlib.sha256(ticker.encode("utf-8")).hexdigest(), 16) % len(_MOODS)]
+
+
+def _synthetic_content(prompt, options):
+    if (options.get("response_format") or {}).get("type") == "json_object":
+        tickers = re.findall(r"^\s*-\s*(\S+)\s*$", prompt, re.MULTILINE)
+        results = [
+            {"ticker": t, "sentiment": _mood(t), "confidence": "Medium", "reasoning": "Stand-in answer."}
+            for t in tickers
+        ]
+        return json.dumps({"results": results})
+
+    match = re.search(r"stock/ETF:\s*(\S+)", prompt)
+    if match:
+        ticker = match.group(1)
+        return f"Sentiment: {_mood(ticker)}\nConfidence: Medium\nReasoning: Stand-in answer."
+
+    if "2. Stocks to Add" in prompt:
+        return (
+            "1. ETFs to Add\n- VCN.TO — stand-in answer\n\n"
+            "2. Stocks to Add\n- ENB.TO — stand-in answer\n\n"
+            "3. Allocation Suggestion\n| Ticker | Weight |\n| VCN.TO | 60% |\n| ENB.TO | 40% |\n\n"
+            "4. Reasoning\n- Stand-in answer.\n\n"
+            "5. Risk Considerations\n- Stand-in answer.\n\n"
+            "Summary:\nStand-in answer."
+        )
+
+    return "Stand-in answer."
+
+
+def synthetic_response(model, messages, options=None):
+    """
+    ChatCompletion payload with a deterministic stand-in answer and
+    estimated token usage.
+    """
+    options = options or {}
+    prompt = "\n".join(str(m.get("content", "")) for m in messages if isinstance(m, dict))
+    content = _synthetic_content(prompt, options)
+    prompt_tokens = _estimate_tokens(prompt)
+    completion_tokens = _estimate_tokens(content)
+
+    return {
+        "id": f"chatcmpl-standin-{request_key(model, messages, options)[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
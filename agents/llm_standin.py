@@ -0,0 +1,116 @@
+"""
+Local LLM Stand-in
+Minimal OpenAI-compatible server for load tests: POST /v1/chat/completions
+returns the recorded response for the request when there is one (see
+agents.llm_replay), otherwise a synthetic answer with estimated token
+usage. Latency and rate-limit (429) responses can be injected.
+
+Run it and point the app at it:
+
+    python -m agents.llm_standin --port 8011 --latency-ms 300
+    OPENAI_BASE_URL=http://127.0.0.1:8011/v1 python main.py
+
+The OpenAI client still needs an OPENAI_API_KEY value; the stand-in
+ignores it.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agents.llm_replay import recorded_response, synthetic_response
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, error_rate=0.0, seed=0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def should_fail(self):
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send(200, {"object": "list", "data": [{"id": "standin", "object": "model"}]})
+        else:
+            self._send(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": "Not found"}})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            options = json.loads(self.rfile.read(length) or b"{}")
+            model = options.pop("model")
+            messages = options.pop("messages")
+        except (ValueError, KeyError):
+            self._send(400, {"error": {"message": "Expected a chat completion request"}})
+            return
+
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        if self.server.should_fail():
+            self._send(
+                429,
+                {"error": {"message": "Injected rate limit", "type": "rate_limit_exceeded"}},
+                headers={"retry-after": "1"},
+            )
+            return
+
+        payload = recorded_response(model, messages, options)
+        if payload is None:
+            payload = synthetic_response(model, messages, options)
+        self._send(200, payload)
+
+    def log_message(self, format, *args):
+        # Keep load tests quiet.
+        pass
+
+
+def serve(host="127.0.0.1", port=8011, latency=0.0, error_rate=0.0, seed=0):
+    """
+    Run the stand-in until interrupted.
+    """
+    server = StandinServer((host, port), latency=latency, error_rate=error_rate, seed=seed)
+    print(f"LLM stand-in listening on http://{host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible LLM stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.latency_ms / 1000.0, args.error_rate, args.seed)
@@ -0,0 +1,465 @@
+"""
+Market Data Access
+Agents get quotes and daily bars from the active provider through this
+module. Every provider call is guarded by the shared fetch layer (rate
+limit, retries, circuit breaker) and returned as a FetchResult; a ticker
+the provider has no data for (e.g. delisted) gives NO_DATA.
+
+Providers (PORTFOLIO_MARKET_DATA):
+- yfinance: live Yahoo Finance data (default)
+- replay: bars recorded as CSV files under PORTFOLIO_REPLAY_DIR, with
+  optional injected latency and failures, for offline runs and benchmarks
+"""
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import yfinance as yf
+
+from agents.fetch import FetchResult, guarded_call, NO_DATA, OK
+from agents.tracing import traced
+from config import (
+    MARKET_DATA_PROVIDER,
+    REPLAY_ALIGN,
+    REPLAY_DIR,
+    REPLAY_FAILURE_RATE,
+    REPLAY_LATENCY_MS,
+    REPLAY_SEED,
+)
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class NoMarketData(LookupError):
+    """
+    Raised by a provider that has no data for a ticker.
+    """
+
+
+def _yfinance_no_data_errors():
+    # Names differ across yfinance versions; use whichever exist.
+    from yfinance import exceptions
+
+    names = ("YFTickerMissingError", "YFPricesMissingError", "YFTzMissingError", "YFInvalidPeriodError")
+    return tuple(getattr(exceptions, name) for name in names if hasattr(exceptions, name))
+
+
+try:
+    NO_DATA_ERRORS = _yfinance_no_data_errors()
+except ImportError:
+    NO_DATA_ERRORS = ()
+
+
+def empty_history():
+    return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+
+
+# ==============================
+# PROVIDERS
+# A provider has a name (its fetch-layer host), a cache namespace (history
+# store subdirectory; "" for the default store), the exceptions that mean
+# "no data", and three calls that raise on failure:
+#   latest_closes(symbols) -> {symbol: last close}; missing symbols left out
+#   history(ticker, start=None, end=None) -> daily OHLCV frame, end exclusive
+#   histories(tickers, start=None, end=None) -> {ticker: daily OHLCV frame}
+#       from one request; tickers without bars left out
+# A provider whose bulk quote call can drop a symbol without saying why
+# also has last_close(ticker), which raises a "no data" error or the real
+# cause; fetch_quotes probes each missing symbol through it.
+# ==============================
+
+_raising_lock = threading.Lock()
+_raising_depth = 0
+_saved_hide_exceptions = None
+
+
+@contextmanager
+def _yfinance_raising():
+    """
+    Make yfinance raise instead of logging and returning an empty frame for
+    the duration of one provider call, so throttling and network errors are
+    not mistaken for "no data". Yields extra Ticker.history arguments.
+
+    yfinance >= 1.0 only honours its debug.hide_exceptions switch (its
+    timezone lookup ignores raise_errors), so it is turned off while any
+    provider call runs and restored after the last one, as yfinance's own
+    download() does for its network switch. Older versions take
+    raise_errors per call.
+    """
+    global _raising_depth, _saved_hide_exceptions
+
+    config = getattr(yf, "config", None)
+    debug = getattr(config, "debug", None) if config is not None else None
+    if debug is None or not hasattr(debug, "hide_exceptions"):
+        yield {"raise_errors": True}
+        return
+
+    with _raising_lock:
+        if _raising_depth == 0:
+            _saved_hide_exceptions = debug.hide_exceptions
+            debug.hide_exceptions = False
+        _raising_depth += 1
+    try:
+        yield {}
+    finally:
+        with _raising_lock:
+            _raising_depth -= 1
+            if _raising_depth == 0:
+                debug.hide_exceptions = _saved_hide_exceptions
+
+
+class YFinanceProvider:
+    name = "yahoo"
+    cache_namespace = ""
+    no_data_errors = NO_DATA_ERRORS + (NoMarketData,)
+
+    def latest_closes(self, symbols):
+        data = yf.download(
+            symbols,
+            period="1d",
+            auto_adjust=True,
+            group_by="column",
+            progress=False,
+            threads=True,
+        )
+
+        latest = {}
+        if data is not None and not data.empty and "Close" in data:
+            closes = data["Close"]
+
+            # Single-ticker downloads may come back as a plain Series.
+            if getattr(closes, "ndim", 1) == 1:
+                closes = closes.to_frame(name=symbols[0])
+
+            for ticker in symbols:
+                series = closes[ticker].dropna() if ticker in closes.columns else ()
+                if len(series):
+                    latest[ticker] = float(series.iloc[-1])
+
+        return latest
+
+    def last_close(self, ticker):
+        # download() never raises: a throttled or failed symbol comes back as
+        # empty as a delisted one. Asking for it on its own surfaces the cause.
+        with _yfinance_raising() as options:
+            hist = yf.Ticker(ticker).history(period="5d", auto_adjust=True, **options)
+        closes = hist["Close"].dropna() if "Close" in hist else ()
+        if not len(closes):
+            raise NoMarketData(f"No recent close for {ticker}")
+        return float(closes.iloc[-1])
+
+    def history(self, ticker, start=None, end=None):
+        stock = yf.Ticker(ticker)
+        with _yfinance_raising() as options:
+            if start is None:
+                return stock.history(period="max", **options)
+            return stock.history(
+                start=start.isoformat(), end=end.isoformat() if end else None, **options
+            )
+
+    def histories(self, tickers, start=None, end=None):
+        window = {"period": "max"} if start is None else {
+            "start": start.isoformat(), "end": end.isoformat() if end else None
+        }
+        data = yf.download(
+            tickers,
+            auto_adjust=True,
+            group_by="ticker",
+            progress=False,
+            threads=True,
+            **window,
+        )
+
+        frames = {}
+        if data is None or data.empty:
+            return frames
+
+        # Like latest_closes, a throttled symbol comes back empty rather than
+        # raising; callers fetch anything left out one ticker at a time.
+        multi = isinstance(data.columns, pd.MultiIndex)
+        for ticker in tickers:
+            if multi:
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                frame = data[ticker]
+            elif len(tickers) == 1:
+                frame = data
+            else:
+                continue
+            frame = frame.dropna(how="all")
+            if not frame.empty:
+                frames[ticker] = frame
+        return frames
+
+
+def replay_path(directory, ticker):
+    safe = re.sub(r"[^A-Z0-9._-]", "_", str(ticker).upper())
+    return os.path.join(directory, f"{safe}.csv")
+
+
+class ReplayProvider:
+    """
+    Serves bars recorded as <TICKER>.csv files (Date plus the OHLCV
+    columns) in directory; tickers without a file have no data.
+
+    Every call sleeps latency seconds and fails with ConnectionError with
+    probability failure_rate (seeded), so the fetch layer's retries and
+    breaker can be exercised offline. With align=True, bars are shifted by
+    whole weeks so the last recorded bar falls in the current week.
+    """
+
+    name = "replay"
+    cache_namespace = "replay"
+    no_data_errors = (NoMarketData,)
+
+    def __init__(self, directory=None, latency=None, failure_rate=None, seed=None, align=None):
+        self.directory = directory or REPLAY_DIR
+        self.latency = REPLAY_LATENCY_MS / 1000.0 if latency is None else float(latency)
+        self.failure_rate = REPLAY_FAILURE_RATE if failure_rate is None else float(failure_rate)
+        self.align = REPLAY_ALIGN if align is None else bool(align)
+        self._random = random.Random(REPLAY_SEED if seed is None else seed)
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _call(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.failure_rate:
+            raise ConnectionError("injected replay failure")
+
+    def _bars(self, ticker):
+        with self._lock:
+            frame = self._frames.get(ticker)
+        if frame is not None:
+            return frame
+
+        path = replay_path(self.directory, ticker)
+        if not os.path.exists(path):
+            raise NoMarketData(f"No recorded bars for {ticker}")
+
+        frame = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+        frame = frame.reindex(columns=COLUMNS).astype("float64").sort_index()
+        if self.align and not frame.empty:
+            weeks = (pd.Timestamp.today().normalize() - frame.index[-1]).days // 7
+            frame.index = frame.index + pd.Timedelta(weeks=max(weeks, 0))
+
+        with self._lock:
+            self._frames[ticker] = frame
+        return frame
+
+    def latest_closes(self, symbols):
+        self._call()
+        latest = {}
+        for ticker in symbols:
+            try:
+                closes = self._bars(ticker)["Close"].dropna()
+            except NoMarketData:
+                continue
+            if len(closes):
+                latest[ticker] = float(closes.iloc[-1])
+        return latest
+
+    def history(self, ticker, start=None, end=None):
+        self._call()
+        bars = self._bars(ticker)
+        if start is not None:
+            bars = bars.loc[bars.index >= pd.Timestamp(start)]
+        if end is not None:
+            bars = bars.loc[bars.index < pd.Timestamp(end)]
+        return bars
+
+    def histories(self, tickers, start=None, end=None):
+        self._call()
+        frames = {}
+        for ticker in tickers:
+            try:
+                bars = self._bars(ticker)
+            except NoMarketData:
+                continue
+            if start is not None:
+                bars = bars.loc[bars.index >= pd.Timestamp(start)]
+            if end is not None:
+                bars = bars.loc[bars.index < pd.Timestamp(end)]
+            if not bars.empty:
+                frames[ticker] = bars
+        return frames
+
+
+PROVIDERS = {"yfinance": YFinanceProvider, "replay": ReplayProvider}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """
+    Process-wide provider chosen by PORTFOLIO_MARKET_DATA (yfinance or replay).
+    """
+    global _provider
+
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                provider = PROVIDERS.get(MARKET_DATA_PROVIDER)
+                if provider is None:
+                    raise ValueError(
+                        f"Unknown PORTFOLIO_MARKET_DATA '{MARKET_DATA_PROVIDER}'. "
+                        f"Use one of: {', '.join(PROVIDERS)}."
+                    )
+                _provider = provider()
+    return _provider
+
+
+def set_provider(provider):
+    """
+    Swap the active provider (e.g. a ReplayProvider on another directory).
+    Cached quotes from the previous provider are kept until they expire.
+    """
+    global _provider
+
+    with _provider_lock:
+        _provider = provider
+
+
+# ==============================
+# GUARDED CALLS
+# ==============================
+
+def _is_empty(frame):
+    return frame is None or len(frame) == 0
+
+
+def _daily_bars(hist):
+    index = hist.index
+    if index.tz is not None:
+        # Daily bars are keyed by calendar date; drop the exchange timezone.
+        index = index.tz_localize(None)
+    frame = hist.reindex(columns=COLUMNS).astype("float64")
+    frame.index = pd.DatetimeIndex(index.normalize(), name="Date")
+    return frame
+
+
+@traced("fetch")
+def fetch_quotes(symbols):
+    """
+    Latest close per symbol from one bulk request. Symbols the bulk request
+    left out are probed one at a time when the provider supports it, each
+    as its own guarded call, so every probe takes a rate-limit token and a
+    failing probe only affects its own symbol.
+
+    Returns {symbol: FetchResult}; an OK result's value is the price.
+    """
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+
+    provider = get_provider()
+    result = guarded_call(
+        provider.name,
+        provider.latest_closes,
+        symbols,
+        no_data_errors=provider.no_data_errors,
+    )
+    if result.status == NO_DATA:
+        return {ticker: FetchResult(NO_DATA) for ticker in symbols}
+    if not result.ok:
+        return {ticker: FetchResult(result.status, error=result.error) for ticker in symbols}
+
+    probe = getattr(provider, "last_close", None)
+    quotes = {}
+    for ticker in symbols:
+        price = result.value.get(ticker)
+        if price is not None:
+            quotes[ticker] = FetchResult(OK, value=round(price, 2))
+        elif probe is None:
+            quotes[ticker] = FetchResult(NO_DATA)
+        else:
+            probed = guarded_call(provider.name, probe, ticker, no_data_errors=provider.no_data_errors)
+            if probed.ok:
+                probed.value = round(probed.value, 2)
+            quotes[ticker] = probed
+    return quotes
+
+
+@traced("fetch", ticker=True)
+def fetch_history(ticker, start=None, end=None):
+    """
+    Daily OHLCV bars from start (None = all) to end as a FetchResult whose
+    value is a tz-naive, date-indexed frame (empty for NO_DATA).
+    """
+    provider = get_provider()
+    result = guarded_call(
+        provider.name,
+        provider.history,
+        ticker,
+        start,
+        end,
+        no_data_errors=provider.no_data_errors,
+        is_empty=_is_empty,
+    )
+    if not result.ok:
+        if result.status == NO_DATA:
+            result.value = empty_history()
+        return result
+
+    result.value = _daily_bars(result.value)
+    return result
+
+
+@traced("fetch")
+def fetch_histories(tickers, start=None, end=None):
+    """
+    Daily OHLCV bars for several tickers from one bulk request, as
+    {ticker: FetchResult} shaped like fetch_history's. Tickers the request
+    left out are NO_DATA; fetch them with fetch_history to learn why.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+
+    provider = get_provider()
+    result = guarded_call(
+        provider.name,
+        provider.histories,
+        tickers,
+        start,
+        end,
+        no_data_errors=provider.no_data_errors,
+    )
+    if not result.ok:
+        return {
+            ticker: FetchResult(result.status, value=empty_history(), error=result.error)
+            for ticker in tickers
+        }
+
+    histories = {}
+    for ticker in tickers:
+        hist = result.value.get(ticker)
+        if _is_empty(hist):
+            histories[ticker] = FetchResult(NO_DATA, value=empty_history())
+        else:
+            histories[ticker] = FetchResult(OK, value=_daily_bars(hist))
+    return histories
+
+
+def record_replay(tickers, directory=None, start=None):
+    """
+    Save each ticker's bars from the active provider as replay fixtures.
+    Returns {ticker: fetch status}.
+    """
+    directory = directory or REPLAY_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    statuses = {}
+    for ticker in dict.fromkeys(str(t).upper().strip() for t in tickers if t):
+        result = fetch_history(ticker, start)
+        if result.ok:
+            result.value.to_csv(replay_path(directory, ticker), index_label="Date")
+        statuses[ticker] = result.status
+    return statuses
@@ -0,0 +1,64 @@
+"""
+Market Hours
+Regular TSX/NYSE session (both 9:30-16:00 Eastern, Monday-Friday) used to
+decide how long a quote can be reused.
+
+Exchange holidays are not modeled: on a holiday the market looks open and
+quotes simply refresh on the short TTL.
+"""
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from config import QUOTE_TTL_SECONDS
+
+EASTERN = ZoneInfo("America/New_York")
+SESSION_OPEN = time(9, 30)
+SESSION_CLOSE = time(16, 0)
+
+# Closing prices settle a few minutes after the bell; keep refreshing briefly.
+CLOSE_SETTLE = timedelta(minutes=20)
+
+
+def _eastern(now=None):
+    if now is None:
+        return datetime.now(EASTERN)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=EASTERN)
+    return now.astimezone(EASTERN)
+
+
+def is_market_open(now=None):
+    """
+    True during the regular session (plus the short close settle window).
+    """
+    now = _eastern(now)
+    if now.weekday() >= 5:
+        return False
+
+    opens = now.replace(hour=SESSION_OPEN.hour, minute=SESSION_OPEN.minute, second=0, microsecond=0)
+    closes = now.replace(hour=SESSION_CLOSE.hour, minute=SESSION_CLOSE.minute, second=0, microsecond=0)
+    return opens <= now < closes + CLOSE_SETTLE
+
+
+def next_open(now=None):
+    """
+    Start of the next regular session after now.
+    """
+    now = _eastern(now)
+    candidate = now.replace(hour=SESSION_OPEN.hour, minute=SESSION_OPEN.minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def quote_ttl(now=None):
+    """
+    Seconds a quote fetched now stays valid: QUOTE_TTL_SECONDS while the
+    market is open, otherwise until the next open.
+    """
+    now = _eastern(now)
+    if is_market_open(now):
+        return QUOTE_TTL_SECONDS
+    return max(QUOTE_TTL_SECONDS, (next_open(now) - now).total_seconds())
@@ -0,0 +1,270 @@
+"""
+Metrics
+In-process registry of counters, gauges and histograms (cache hit rates,
+fetch and LLM latency, token usage). Metrics are rendered in Prometheus
+text format, served on a local HTTP port when PORTFOLIO_METRICS_PORT is
+set, and shown in the dashboard's Diagnostics tab.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_HOST, METRICS_PORT
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        """
+        [(label dict, value)] for every label combination seen so far.
+        """
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labels, key)), value) for key, value in items]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    Set directly, or computed at collection time when func is given.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), func=None):
+        super().__init__(name, help_text, labels)
+        self.func = func
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self.func is not None:
+            return [({}, self.func())]
+        return super().samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last slot: above every bucket), sum.
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+        return [(dict(zip(self.labels, key)), value) for key, value in items]
+
+    def quantile(self, q, **labels):
+        """
+        Estimate of quantile q (0-1) from the buckets (upper bound of the
+        bucket it falls in), or None before any observation.
+        """
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            counts = list(state[0]) if state else None
+        if not counts or not sum(counts):
+            return None
+
+        target = q * sum(counts)
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+
+def _register(cls, name, help_text, labels=(), **options):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, help_text, labels, **options)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+    return metric
+
+
+def counter(name, help_text, labels=()):
+    return _register(Counter, name, help_text, labels)
+
+
+def gauge(name, help_text, labels=(), func=None):
+    return _register(Gauge, name, help_text, labels, func=func)
+
+
+def histogram(name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, help_text, labels, buckets=buckets)
+
+
+def all_metrics():
+    with _registry_lock:
+        return sorted(_registry.values(), key=lambda metric: metric.name)
+
+
+def metric_total(name, **labels):
+    """
+    Sum of a counter or gauge (or observation count of a histogram) over
+    the samples matching labels; 0 when nothing matches.
+    """
+    with _registry_lock:
+        metric = _registry.get(name)
+    if metric is None:
+        return 0
+
+    total = 0
+    for sample_labels, value in metric.samples():
+        if all(sample_labels.get(key) == str(wanted) for key, wanted in labels.items()):
+            total += sum(value[0]) if metric.kind == "histogram" else value
+    return total
+
+
+def reset_metrics():
+    """
+    Zero every metric (registrations are kept).
+    """
+    for metric in all_metrics():
+        metric.reset()
+
+
+# ==============================
+# PROMETHEUS EXPOSITION
+# ==============================
+
+def _escape(value, quotes=True):
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quotes else value
+
+
+def _labels_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """
+    All metrics in Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for metric in all_metrics():
+        lines.append(f"# HELP {metric.name} {_escape(metric.help, quotes=False)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+
+        for labels, value in metric.samples():
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_labels_text(labels)} {_number(value)}")
+                continue
+
+            counts, total = value
+            running = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), counts):
+                running += count
+                bucket_labels = dict(labels, le=_number(bound))
+                lines.append(f"{metric.name}_bucket{_labels_text(bucket_labels)} {running}")
+            lines.append(f"{metric.name}_sum{_labels_text(labels)} {_number(total)}")
+            lines.append(f"{metric.name}_count{_labels_text(labels)} {running}")
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host=None):
+    """
+    Serve /metrics on a background thread (once per process).
+    Returns the server, or None when the port is 0 (disabled).
+    """
+    global _server
+
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+
+    with _server_lock:
+        if _server is None:
+            server = ThreadingHTTPServer((host or METRICS_HOST, port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+            _server = server
+    return _server
@@ -0,0 +1,148 @@
+"""
+Portfolio Records
+Typed, normalized holdings produced once by the data loader.
+
+Holding rows use __slots__ and Portfolio keeps a ticker -> index map plus
+lazily built NumPy columns, so consumers never re-handle the legacy
+"dict or bare string" format or re-normalize tickers.
+"""
+from datetime import date
+
+import numpy as np
+
+from agents.tickers import canonical_ticker
+
+
+def _to_float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_date(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+class Holding:
+    """
+    One position: canonical ticker, float shares and cost basis, parsed date.
+    legacy=True marks rows loaded from the old bare-ticker format.
+    """
+
+    __slots__ = ("ticker", "shares", "buy_price", "buy_date", "legacy")
+
+    def __init__(self, ticker, shares=1.0, buy_price=0.0, buy_date=None, legacy=False):
+        self.ticker = ticker
+        self.shares = shares
+        self.buy_price = buy_price
+        self.buy_date = buy_date
+        self.legacy = legacy
+
+    @classmethod
+    def from_record(cls, item):
+        """
+        Build from a holdings.json row (dict or bare ticker); None if empty.
+        """
+        ticker = canonical_ticker(item)
+        if not ticker:
+            return None
+
+        if not isinstance(item, dict):
+            return cls(ticker, legacy=True)
+
+        return cls(
+            ticker,
+            shares=_to_float(item.get("shares", 0)),
+            buy_price=_to_float(item.get("buy_price", 0)),
+            buy_date=_to_date(item.get("buy_date")),
+        )
+
+    @property
+    def cost_basis(self):
+        return self.shares * self.buy_price
+
+    def to_record(self):
+        # Whole share counts stay ints so holdings.json keeps its format.
+        shares = int(self.shares) if float(self.shares).is_integer() else self.shares
+        return {
+            "ticker": self.ticker,
+            "shares": shares,
+            "buy_price": self.buy_price,
+            "buy_date": self.buy_date.isoformat() if self.buy_date else None,
+        }
+
+    def __repr__(self):
+        return (
+            f"Holding({self.ticker!r}, shares={self.shares}, "
+            f"buy_price={self.buy_price}, buy_date={self.buy_date})"
+        )
+
+
+class Portfolio:
+    """
+    Ordered, read-only collection of Holding rows with O(1) ticker lookup.
+    """
+
+    __slots__ = ("_holdings", "_index", "_columns")
+
+    def __init__(self, holdings=()):
+        self._holdings = tuple(holdings)
+        self._index = {}
+        for i, holding in enumerate(self._holdings):
+            self._index.setdefault(holding.ticker, i)
+        self._columns = None
+
+    @classmethod
+    def from_records(cls, records):
+        holdings = (Holding.from_record(item) for item in records or [])
+        return cls(h for h in holdings if h is not None)
+
+    def __len__(self):
+        return len(self._holdings)
+
+    def __iter__(self):
+        return iter(self._holdings)
+
+    def __getitem__(self, i):
+        return self._holdings[i]
+
+    def __contains__(self, ticker):
+        return canonical_ticker(ticker) in self._index
+
+    def get(self, ticker):
+        i = self._index.get(canonical_ticker(ticker))
+        return None if i is None else self._holdings[i]
+
+    def tickers(self):
+        return [h.ticker for h in self._holdings]
+
+    def columns(self):
+        """
+        (tickers, shares array, buy_price array), built once and cached.
+        """
+        if self._columns is None:
+            n = len(self._holdings)
+            self._columns = (
+                self.tickers(),
+                np.fromiter((h.shares for h in self._holdings), dtype="float64", count=n),
+                np.fromiter((h.buy_price for h in self._holdings), dtype="float64", count=n),
+            )
+        return self._columns
+
+    def to_records(self):
+        return [h.to_record() for h in self._holdings]
+
+
+def as_portfolio(holdings):
+    """
+    Accept a Portfolio or raw holdings rows and return a Portfolio.
+    """
+    if isinstance(holdings, Portfolio):
+        return holdings
+    return Portfolio.from_records(holdings)
@@ -1,10 +1,12 @@
-from agents.data_loader import load_holdings
-from agents.price_agent import get_price
+from agents.data_loader import load_portfolio, load_positions
+from agents.price_agent import get_prices
+from agents.tracing import traced
 
 
+@traced("summary")
 def portfolio_summary():
 
-    holdings = load_holdings()
+    holdings = load_portfolio()
 
     if not holdings:
         return "No holdings found."
@@ -14,14 +16,17 @@ def portfolio_summary():
     total_value = 0
     total_cost = 0
 
+    prices = get_prices(holdings.tickers())
+    positions = load_positions()
+
     for item in holdings:
 
-        ticker = item["ticker"]
-        shares = item.get("shares", 0)
-        buy_price = item.get("buy_price", 0)
-        buy_date = item.get("buy_date", "N/A")
+        ticker = item.ticker
+        shares = item.shares
+        buy_price = item.buy_price
+        buy_date = item.buy_date or "N/A"
 
-        current_price = get_price(ticker)
+        current_price = prices.get(ticker)
 
         if current_price is None:
             current_price_text = "N/A"
@@ -30,23 +35,31 @@ def portfolio_summary():
             position_value = current_price * shares
             cost_value = buy_price * shares
 
-            pnl_pct = ((current_price - buy_price) / buy_price) * 100
-
             total_value += position_value
             total_cost += cost_value
 
             current_price_text = f"{current_price} CAD"
-            pnl_text = f"{round(pnl_pct,2)}%"
+            if buy_price > 0:
+                pnl_pct = ((current_price - buy_price) / buy_price) * 100
+                pnl_text = f"{round(pnl_pct,2)}%"
+            else:
+                pnl_text = "N/A"
 
         output += f"""
 {ticker}
-- Shares: {shares}
-- Buy price: {buy_price} CAD
+- Shares: {shares:g}
+- Buy price: {round(buy_price, 4):g} CAD
 - Current price: {current_price_text}
 - P/L: {pnl_text}
 - Buy date: {buy_date}
 """
 
+        position = positions.get(ticker)
+        if position is not None and len(position.lots) > 1:
+            output += f"- Lots: {len(position.lots)} (FIFO, avg cost shown)\n"
+        if position is not None and position.realized_pnl:
+            output += f"- Realized P/L: {round(position.realized_pnl, 2)} CAD\n"
+
     if total_cost > 0:
         portfolio_return = ((total_value - total_cost) / total_cost) * 100
         output += f"\nTotal Return: {round(portfolio_return,2)}%\n"
@@ -1,22 +1,158 @@
-import yfinance as yf
+import threading
+import time
 
-def get_price(ticker):
-    try:
-        data = yf.Ticker(ticker)
-        hist = data.history(period="1d")
+from agents.fetch import FetchResult, NO_DATA, OK, UNAVAILABLE
+from agents.history_store import get_history_result
+from agents.market_data import fetch_quotes
+from agents.market_hours import quote_ttl
+from agents.metrics import counter, gauge
+from agents.tracing import traced
+from config import QUOTE_TTL_SECONDS
 
-        if hist.empty:
-            return None
 
-        return round(hist["Close"].iloc[-1], 2)
-    except Exception:
-        return None
+def _normalize_tickers(tickers):
+    seen = []
+    for ticker in tickers or []:
+        ticker = str(ticker or "").upper().strip()
+        if ticker and ticker not in seen:
+            seen.append(ticker)
+    return seen
+
+
+def _download_prices(symbols):
+    """
+    Fetch the latest close for many tickers in one bulk download.
+
+    Returns {ticker: FetchResult}.
+    """
+    return fetch_quotes(symbols)
+
+
+# ==============================
+# QUOTE CACHE
+# Quotes live for QUOTE_TTL_SECONDS during market hours and until the next
+# open otherwise. Expired quotes can be served stale while one background
+# refresh fetches them again. A failed refresh (UNAVAILABLE) never replaces a
+# cached quote.
+# ==============================
+
+_quotes = {}  # ticker -> (price, expires_at)
+_quotes_lock = threading.Lock()
+_refreshing = set()
+
+QUOTE_CACHE = counter("portfolio_quote_cache_total", "Quote lookups by cache result (hit, stale, miss).", ("result",))
+QUOTE_REFRESHES = counter("portfolio_quote_refreshes_total", "Background refreshes of stale quotes.")
+gauge("portfolio_quote_cache_entries", "Quotes held in the in-process cache.", func=lambda: len(_quotes))
+
+
+def _store_quotes(results, now=None):
+    now = time.time() if now is None else now
+    ttl = quote_ttl()
+    with _quotes_lock:
+        for ticker, result in results.items():
+            if result.status == OK:
+                _quotes[ticker] = (result.value, now + ttl)
+            elif result.status == NO_DATA:
+                # A missing quote is retried soon, even when the market is closed.
+                _quotes[ticker] = (None, now + QUOTE_TTL_SECONDS)
+
+
+def _cached_result(cached):
+    price = cached[0]
+    return FetchResult(OK, value=price) if price is not None else FetchResult(NO_DATA)
+
+
+def _refresh_in_background(symbols):
+    with _quotes_lock:
+        symbols = [t for t in symbols if t not in _refreshing]
+        _refreshing.update(symbols)
+    if not symbols:
+        return
+
+    def run():
+        try:
+            _store_quotes(_download_prices(symbols))
+        finally:
+            with _quotes_lock:
+                _refreshing.difference_update(symbols)
+
+    QUOTE_REFRESHES.inc()
+    threading.Thread(target=run, name="quote-refresh", daemon=True).start()
+
+
+@traced("quotes")
+def get_price_results(tickers, stale_ok=False):
+    """
+    Like get_prices, as {ticker: FetchResult}. When the provider is
+    unavailable, a previously cached quote is returned (OK) if there is one.
+    """
+    symbols = _normalize_tickers(tickers)
+    results = {}
+    missing = []
+    stale = []
+    now = time.time()
+
+    with _quotes_lock:
+        for ticker in symbols:
+            cached = _quotes.get(ticker)
+            if cached is None:
+                missing.append(ticker)
+            elif cached[1] > now:
+                results[ticker] = _cached_result(cached)
+            elif stale_ok:
+                results[ticker] = _cached_result(cached)
+                stale.append(ticker)
+            else:
+                missing.append(ticker)
+
+    hits = len(results) - len(stale)
+    if hits:
+        QUOTE_CACHE.inc(hits, result="hit")
+    if stale:
+        QUOTE_CACHE.inc(len(stale), result="stale")
+    if missing:
+        QUOTE_CACHE.inc(len(missing), result="miss")
+        fresh = _download_prices(missing)
+        _store_quotes(fresh)
+        with _quotes_lock:
+            for ticker in missing:
+                result = fresh.get(ticker) or FetchResult(UNAVAILABLE)
+                cached = _quotes.get(ticker)
+                if result.status == UNAVAILABLE and cached is not None:
+                    result = _cached_result(cached)
+                results[ticker] = result
+
+    if stale:
+        _refresh_in_background(stale)
+
+    return {ticker: results[ticker] for ticker in symbols}
+
+
+def get_prices(tickers, stale_ok=False):
+    """
+    Latest close for many tickers; uncached ones are fetched in one bulk download.
+
+    Returns {ticker: price}; tickers with no quote map to None.
+    With stale_ok=True, expired quotes are returned at once and refreshed
+    in the background (stale-while-revalidate).
+    """
+    results = get_price_results(tickers, stale_ok=stale_ok)
+    return {ticker: result.value for ticker, result in results.items()}
+
+
+def clear_quote_cache():
+    with _quotes_lock:
+        _quotes.clear()
+
+
+def get_price(ticker, stale_ok=False):
+    ticker = str(ticker or "").upper().strip()
+    return get_prices([ticker], stale_ok=stale_ok).get(ticker)
 
 
 def is_delisted(ticker):
-    try:
-        data = yf.Ticker(ticker)
-        hist = data.history(period="6mo")
-        return hist.empty
-    except:
-        return True
\ No newline at end of file
+    """
+    True only when the provider reports no data for ticker; an outage is
+    not treated as a delisting.
+    """
+    return get_history_result(ticker, period="6mo").status == NO_DATA
@@ -1,54 +1,30 @@
-from agents.data_loader import load_holdings
-from agents.allocation_agent import classify_ticker, TARGET_ALLOCATION
+from agents.data_loader import load_portfolio
+from agents.allocation_agent import get_allocation_snapshot, TARGET_ALLOCATION
+from agents.tracing import traced
 
 
 # Use one canonical target allocation shared across agents.
 TARGET = TARGET_ALLOCATION
 
 
+@traced("rebalance")
 def analyze_rebalance():
 
-    holdings = load_holdings()
+    holdings = load_portfolio()
 
     if not holdings:
         return "No holdings data."
 
     # -------------------------
-    # 1) Calculate current allocation
+    # 1) Current allocation + drift (shared snapshot)
     # -------------------------
-    allocation = {
-        "cash": 0,
-        "bonds": 0,
-        "canada_equity": 0,
-        "us_equity": 0,
-        "global_equity": 0,
-        "unknown": 0
-    }
-
-    total_positions = len(holdings)
-
-    for h in holdings:
-        ticker = h.get("ticker") if isinstance(h, dict) else h
-        asset_class = classify_ticker(ticker)
-
-        if asset_class in allocation:
-            allocation[asset_class] += 1
-        else:
-            allocation["unknown"] += 1
-
-    for k in allocation:
-        allocation[k] = round(allocation[k] / total_positions, 2)
-
-    # -------------------------
-    # 2) Drift vs target
-    # -------------------------
-    drift = {}
+    snapshot = get_allocation_snapshot(holdings)
 
-    for k in TARGET:
-        drift[k] = round(allocation.get(k, 0) - TARGET[k], 2)
+    allocation = snapshot["weights"]
+    drift = snapshot["drift"]
 
     # -------------------------
-    # 3) Build actions
+    # 2) Build actions
     # -------------------------
     actions = []
 
@@ -64,10 +40,13 @@ def analyze_rebalance():
         actions.append("Classify unknown tickers to improve rebalance accuracy")
 
     # -------------------------
-    # 4) Return output
+    # 3) Return output
     # -------------------------
     return {
         "allocation": allocation,
         "drift": drift,
-        "actions": actions
+        "actions": actions,
+        "underweights": snapshot["underweights"],
+        "total_value": snapshot["total_value"],
+        "dollar_gaps": {k: v for k, v in snapshot["dollar_gaps"].items() if k in TARGET},
     }
@@ -1,11 +1,18 @@
-from openai import OpenAI
 import re
-from config import assert_openai_api_key
+from agents.llm_client import chat_completion
+from agents.metrics import counter
+from agents.tracing import traced
 
+RECOMMENDATIONS = counter(
+    "portfolio_recommendations_total",
+    "Recommendation reports by format: structured (has the stocks section) or unstructured (missing it).",
+    ("format",),
+)
+RECOMMENDED_TICKERS = counter("portfolio_recommended_tickers_total", "Tickers extracted from reports.", ("kind",))
 
-def recommend_portfolio(current_holdings, profile, capital_level):
-    client = OpenAI(api_key=assert_openai_api_key())
 
+@traced("recommendation")
+def recommend_portfolio(current_holdings, profile, capital_level):
     prompt = f"""
 You are a portfolio strategist.
 
@@ -46,7 +53,7 @@ Portfolio preference note:
 - For Canadian dividend stocks, prioritize ENB.TO and TD.TO
 """
 
-    response = client.chat.completions.create(
+    response = chat_completion(
         model="gpt-4.1-mini",
         messages=[{"role": "user", "content": prompt}]
     )
@@ -69,6 +76,10 @@ Portfolio preference note:
     else:
         stocks = []
 
+    RECOMMENDATIONS.inc(format="structured" if "2. Stocks to Add" in report_text else "unstructured")
+    RECOMMENDED_TICKERS.inc(len(set(etfs)), kind="etf")
+    RECOMMENDED_TICKERS.inc(len(set(stocks)), kind="stock")
+
     return {
         "etfs": list(set(etfs)),
         "stocks": list(set(stocks)),
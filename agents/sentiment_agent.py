@@ -1,17 +1,18 @@
 # agents/sentiment_agent.py
 
-from openai import OpenAI
-from config import assert_openai_api_key
+import hashlib
+import json
 
+from agents.llm_client import chat_completion
+from agents.metrics import counter
+from agents.sentiment_cache import get_cached_sentiment, store_sentiment
+from agents.tickers import canonical_ticker
+from agents.tracing import traced
+from config import SENTIMENT_CACHE_ENABLED, SENTIMENT_BATCH_SIZE
 
-def analyze_sentiment(ticker):
-    """
-    AI sentiment analysis using news & market tone.
-    Returns simple human-readable interpretation.
-    """
-    client = OpenAI(api_key=assert_openai_api_key())
+SENTIMENT_MODEL = "gpt-4.1-mini"
 
-    prompt = f"""
+SENTIMENT_PROMPT = """
     You are a financial sentiment analyst.
 
     Analyze overall market sentiment for stock/ETF: {ticker}
@@ -29,9 +30,218 @@ def analyze_sentiment(ticker):
     Reasoning: short explanation
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
+BATCH_SENTIMENT_PROMPT = """
+    You are a financial sentiment analyst.
+
+    Analyze overall market sentiment for each stock/ETF below:
+    {tickers}
+
+    Consider:
+    - investor tone
+    - news direction
+    - social/media buzz
+    - macro environment
+
+    Return ONLY a JSON object of this shape, with one item per ticker:
+
+    {{"results": [{{"ticker": "XIU.TO", "sentiment": "Bullish", "confidence": "Medium", "reasoning": "short explanation"}}]}}
+
+    sentiment must be one of: Bullish, Neutral, Bearish
+    confidence must be one of: Low, Medium, High
+    """
+
+SENTIMENT_CACHE = counter(
+    "portfolio_sentiment_cache_total",
+    "Sentiment cache lookups by mode (single, batch) and result (hit, miss).",
+    ("mode", "result"),
+)
+SENTIMENT_REQUESTS = counter("portfolio_sentiment_requests_total", "Sentiment LLM requests by mode.", ("mode",))
+SENTIMENT_FALLBACKS = counter(
+    "portfolio_sentiment_fallbacks_total", "Tickers a batch answer missed, retried one by one."
+)
+
+SENTIMENT_VALUES = {"bullish": "Bullish", "neutral": "Neutral", "bearish": "Bearish"}
+CONFIDENCE_VALUES = {"low": "Low", "medium": "Medium", "high": "High"}
+
+
+def _prompt_version(template):
+    return hashlib.sha256(f"{SENTIMENT_MODEL}\n{template}".encode("utf-8")).hexdigest()[:16]
+
+
+# Cache entries are only reused while the prompt and model stay the same.
+PROMPT_VERSION = _prompt_version(SENTIMENT_PROMPT)
+BATCH_PROMPT_VERSION = _prompt_version(BATCH_SENTIMENT_PROMPT)
+
+
+def parse_sentiment(sentiment):
+    """
+    Split a sentiment answer into (mood, confidence, reasoning).
+    """
+    text = str(sentiment).strip()
+    if not text:
+        return "N/A", "N/A", ""
+
+    mood = "N/A"
+    confidence = "N/A"
+    reasoning = ""
+
+    for line in text.splitlines():
+        clean = line.strip()
+        lower = clean.lower()
+        if lower.startswith("sentiment:"):
+            mood = clean.split(":", 1)[1].strip()
+        elif lower.startswith("confidence:"):
+            confidence = clean.split(":", 1)[1].strip()
+        elif lower.startswith("reasoning:"):
+            reasoning = clean.split(":", 1)[1].strip()
+
+    if mood == "N/A" and "\n" not in text:
+        mood = text
+
+    return mood, confidence, reasoning
+
+
+def format_sentiment(mood, confidence, reasoning):
+    """
+    Render a structured sentiment result in the single-ticker text format.
+    """
+    return f"Sentiment: {mood}\nConfidence: {confidence}\nReasoning: {reasoning}"
+
+
+@traced("sentiment", ticker=True)
+def analyze_sentiment(ticker, use_cache=True, refresh=False):
+    """
+    AI sentiment analysis using news & market tone.
+    Returns simple human-readable interpretation.
+
+    Responses are cached per canonical ticker and trading date. Pass use_cache=False
+    to bypass the cache entirely, or refresh=True to ask the model again
+    and overwrite the cached answer.
+    """
+    cache_key = canonical_ticker(ticker) or ""
+    use_cache = use_cache and SENTIMENT_CACHE_ENABLED
+
+    if use_cache and not refresh:
+        cached = get_cached_sentiment(cache_key, PROMPT_VERSION)
+        SENTIMENT_CACHE.inc(mode="single", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+
+    SENTIMENT_REQUESTS.inc(mode="single")
+    prompt = SENTIMENT_PROMPT.format(ticker=cache_key or ticker)
+
+    response = chat_completion(
+        model=SENTIMENT_MODEL,
         messages=[{"role": "user", "content": prompt}]
     )
 
-    return response.choices[0].message.content
+    content = response.choices[0].message.content
+
+    if use_cache and content:
+        store_sentiment(cache_key, PROMPT_VERSION, content)
+
+    return content
+
+
+# ==============================
+# BATCH MODE
+# ==============================
+
+def _validate_batch_item(item, expected):
+    """
+    Return (ticker, text) for a schema-valid batch item, else None.
+    """
+    if not isinstance(item, dict):
+        return None
+
+    ticker = canonical_ticker(item.get("ticker"))
+    mood = SENTIMENT_VALUES.get(str(item.get("sentiment", "")).lower().strip())
+    confidence = CONFIDENCE_VALUES.get(str(item.get("confidence", "")).lower().strip())
+    reasoning = item.get("reasoning")
+
+    if ticker not in expected or not mood or not confidence:
+        return None
+    if not isinstance(reasoning, str) or not reasoning.strip():
+        return None
+
+    return ticker, format_sentiment(mood, confidence, reasoning.strip())
+
+
+def _ask_batch(tickers):
+    SENTIMENT_REQUESTS.inc(mode="batch")
+    prompt = BATCH_SENTIMENT_PROMPT.format(tickers="\n    ".join(f"- {t}" for t in tickers))
+
+    response = chat_completion(
+        model=SENTIMENT_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        response_format={"type": "json_object"},
+    )
+
+    try:
+        payload = json.loads(response.choices[0].message.content or "")
+    except ValueError:
+        return {}
+
+    items = payload.get("results", []) if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return {}
+
+    expected = set(tickers)
+    results = {}
+    for item in items:
+        valid = _validate_batch_item(item, expected)
+        if valid:
+            results.setdefault(valid[0], valid[1])
+    return results
+
+
+@traced("sentiment")
+def analyze_sentiment_batch(tickers, batch_size=None, use_cache=True, refresh=False):
+    """
+    Sentiment for many tickers using one structured request per batch.
+
+    Returns {canonical ticker: text} in the same text format as
+    analyze_sentiment.
+    Tickers missing from, or invalid in, a batch answer fall back to a
+    single-ticker call.
+    """
+    batch_size = SENTIMENT_BATCH_SIZE if batch_size is None else batch_size
+    use_cache = use_cache and SENTIMENT_CACHE_ENABLED
+
+    keys = [canonical_ticker(t) for t in tickers or []]
+    keys = [key for key in dict.fromkeys(keys) if key]
+
+    results = {}
+    pending = []
+    for key in keys:
+        cached = None
+        if use_cache and not refresh:
+            cached = get_cached_sentiment(key, BATCH_PROMPT_VERSION) or get_cached_sentiment(
+                key, PROMPT_VERSION
+            )
+            SENTIMENT_CACHE.inc(mode="batch", result="miss" if cached is None else "hit")
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending.append(key)
+
+    if batch_size > 1:
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            try:
+                answers = _ask_batch(chunk)
+            except Exception:
+                answers = {}
+
+            for key, text in answers.items():
+                results[key] = text
+                if use_cache:
+                    store_sentiment(key, BATCH_PROMPT_VERSION, text)
+
+    for key in pending:
+        if key not in results:
+            if batch_size > 1:
+                SENTIMENT_FALLBACKS.inc()
+            results[key] = analyze_sentiment(key, use_cache=use_cache, refresh=refresh)
+
+    return results
@@ -0,0 +1,131 @@
+"""
+Sentiment Cache
+SQLite-backed store of LLM sentiment responses keyed by
+(canonical ticker, trading date, prompt version), with TTL expiry and LRU
+eviction, so ZAG and ZAG.TO share one entry.
+
+Cache errors never break analysis; they are treated as misses.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+from agents.tickers import canonical_ticker
+from config import (
+    SENTIMENT_CACHE_FILE,
+    SENTIMENT_CACHE_MAX_ENTRIES,
+    SENTIMENT_CACHE_TTL_SECONDS,
+)
+
+_local = threading.local()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment (
+    ticker TEXT NOT NULL,
+    trade_date TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (ticker, trade_date, prompt_version)
+);
+CREATE INDEX IF NOT EXISTS idx_sentiment_last_access ON sentiment (last_access);
+"""
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(SENTIMENT_CACHE_FILE), exist_ok=True)
+        conn = sqlite3.connect(SENTIMENT_CACHE_FILE, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def trading_date(today=None):
+    """
+    Trading date used as the cache key: weekends roll back to Friday.
+    """
+    today = today or date.today()
+    if today.weekday() >= 5:
+        today -= timedelta(days=today.weekday() - 4)
+    return today.isoformat()
+
+
+def get_cached_sentiment(ticker, prompt_version, trade_date=None, ttl=None):
+    ticker = canonical_ticker(ticker)
+    trade_date = trade_date or trading_date()
+    ttl = SENTIMENT_CACHE_TTL_SECONDS if ttl is None else ttl
+    now = time.time()
+
+    try:
+        conn = _connection()
+        row = conn.execute(
+            "SELECT response, created_at FROM sentiment "
+            "WHERE ticker = ? AND trade_date = ? AND prompt_version = ?",
+            (ticker, trade_date, prompt_version),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        response, created_at = row
+        if now - created_at > ttl:
+            return None
+
+        with conn:
+            conn.execute(
+                "UPDATE sentiment SET last_access = ? "
+                "WHERE ticker = ? AND trade_date = ? AND prompt_version = ?",
+                (now, ticker, trade_date, prompt_version),
+            )
+        return response
+    except (sqlite3.Error, OSError):
+        return None
+
+
+def store_sentiment(ticker, prompt_version, response, trade_date=None, max_entries=None):
+    ticker = canonical_ticker(ticker)
+    trade_date = trade_date or trading_date()
+    max_entries = SENTIMENT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    now = time.time()
+
+    try:
+        conn = _connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sentiment "
+                "(ticker, trade_date, prompt_version, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, trade_date, prompt_version, response, now, now),
+            )
+
+            # Evict least recently used rows beyond the size bound.
+            (count,) = conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()
+            if count > max_entries:
+                conn.execute(
+                    "DELETE FROM sentiment WHERE rowid IN ("
+                    "SELECT rowid FROM sentiment ORDER BY last_access ASC LIMIT ?)",
+                    (count - max_entries,),
+                )
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def clear_sentiment_cache(ticker=None):
+    """
+    Drop cached responses for one ticker, or everything when ticker is None.
+    """
+    try:
+        conn = _connection()
+        with conn:
+            if ticker is None:
+                conn.execute("DELETE FROM sentiment")
+            else:
+                conn.execute("DELETE FROM sentiment WHERE ticker = ?", (canonical_ticker(ticker),))
+    except (sqlite3.Error, OSError):
+        pass
@@ -1,19 +1,10 @@
-from agents.technical_agent import analyze_technical
-from agents.fundamental_agent import analyze_fundamental
-from agents.sentiment_agent import analyze_sentiment
+from agents.analysis_agent import get_analysis
+from agents.tickers import canonical_ticker
+from agents.tracing import traced
 
 
 def normalize_ticker(ticker):
-    canadian_symbols = [
-        "XIU", "ZAG", "XAW", "SAFE", "XRE", "VGG",
-        "VCN", "XBB", "VAB", "VGRO", "VBAL",
-        "BCE", "ENB", "TD", "BNS", "FTS",
-    ]
-
-    if ticker in canadian_symbols and ".TO" not in ticker:
-        return ticker + ".TO"
-
-    return ticker
+    return canonical_ticker(ticker) or ticker
 
 
 def _extract_sentiment_signal(sentiment):
@@ -25,13 +16,15 @@ def _extract_sentiment_signal(sentiment):
     return "neutral"
 
 
+@traced("signal", ticker=True)
 def generate_signal(ticker):
 
     ticker = normalize_ticker(ticker)
 
-    technical = analyze_technical(ticker)
-    fundamental = analyze_fundamental(ticker)
-    sentiment = analyze_sentiment(ticker)
+    analysis = get_analysis(ticker)
+    technical = analysis["technical"]
+    fundamental = analysis["fundamental"]
+    sentiment = analysis["sentiment"]
 
     score = 0
 
@@ -0,0 +1,686 @@
+"""
+Portfolio Storage
+Backends behind data_loader's load_*/save_* functions.
+
+- JsonStorage: the original data/*.json files, replaced atomically, with
+  single edits appended to a journal that is compacted periodically.
+- SqliteStorage: one SQLite file with indexed tables; saves are diffed
+  against stored rows so editing one holding is one indexed write. On
+  first open it imports the existing JSON files once, and warns later if
+  a JSON file is edited after that import (the database no longer reads it).
+
+Rows are keyed by canonical ticker (ZAG and ZAG.TO are the same holding).
+
+Each backend exposes a cheap signature(kind) so the loader can tell when
+its cached snapshot is stale. Kinds are "holdings", "watchlist", "income"
+and "transactions" (the lot ledger).
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: thread lock only
+    fcntl = None
+
+from agents.tickers import canonical_ticker
+from config import (
+    HOLDINGS_FILE,
+    INCOME_FILE,
+    JOURNAL_COMPACT_EVERY,
+    PORTFOLIO_DB_FILE,
+    STORAGE_BACKEND,
+    TRANSACTIONS_FILE,
+    WATCHLIST_FILE,
+)
+
+KINDS = ("holdings", "watchlist", "income", "transactions")
+
+# Kinds whose table has a UNIQUE ticker column; writes keep the first row per key.
+_UNIQUE_KINDS = {"watchlist"}
+
+
+def _holding_key(item):
+    return canonical_ticker(item) or ""
+
+
+def _watch_key(item):
+    return _holding_key(item)
+
+
+def _income_key(item):
+    if not isinstance(item, dict):
+        return str(item)
+    return json.dumps(item, sort_keys=True, default=str)
+
+
+_KEY_FUNCS = {
+    "holdings": _holding_key,
+    "watchlist": _watch_key,
+    "income": _income_key,
+    "transactions": _income_key,
+}
+
+
+# ==============================
+# JSON FILES
+# Snapshots are replaced atomically (temp file + fsync + rename); single
+# edits append one line to <file>.journal, which is folded back into the
+# snapshot every JOURNAL_COMPACT_EVERY entries.
+# ==============================
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path, payload):
+    """
+    Write payload to path so readers only ever see the old or new file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        # mkstemp creates 0600 files; keep the permissions of the file being replaced.
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(path)
+
+
+@contextmanager
+def _file_lock(path, thread_lock):
+    """
+    Serialize writers across threads and (where fcntl exists) processes.
+    """
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _apply(kind, items, entry):
+    """
+    Replay one journal entry. Ops are idempotent by key, so replaying a
+    journal over a snapshot that already contains it is harmless.
+    """
+    key_of = _KEY_FUNCS[kind]
+    op = entry.get("op")
+
+    if op == "remove":
+        # Removal is by ticker for every kind (matches SqliteStorage.delete).
+        key = _holding_key(entry.get("key"))
+        return [item for item in items if _holding_key(item) != key]
+
+    if op == "append":
+        items.append(entry.get("item"))
+        return items
+
+    if op in ("add", "edit"):
+        item = entry.get("item")
+        # Keyed from the item, so entries written before canonical keys still match.
+        key = key_of(item)
+        for i, existing in enumerate(items):
+            if key_of(existing) == key:
+                items[i] = item
+                return items
+        items.append(item)
+
+    return items
+
+
+class JsonStorage:
+    """
+    Plain JSON files with crash-safe snapshots and an append-only edit journal.
+    """
+
+    name = "json"
+
+    def __init__(self, paths=None, compact_every=None):
+        self.paths = paths or {
+            "holdings": HOLDINGS_FILE,
+            "watchlist": WATCHLIST_FILE,
+            "income": INCOME_FILE,
+            "transactions": TRANSACTIONS_FILE,
+        }
+        self.compact_every = JOURNAL_COMPACT_EVERY if compact_every is None else compact_every
+        self._lock = threading.RLock()
+        # kind -> (journal inode, line count); seeded from the file once.
+        self._journal_lines = {}
+
+    def _journal_path(self, kind):
+        return f"{self.paths[kind]}.journal"
+
+    def signature(self, kind):
+        signature = []
+        for path in (self.paths[kind], self._journal_path(kind)):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+                continue
+            signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        return tuple(signature)
+
+    def _read_snapshot(self, kind):
+        path = self.paths[kind]
+        if not os.path.exists(path):
+            return []
+
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        # Support both legacy {"holdings": [...]} and plain list formats.
+        if isinstance(data, dict):
+            data = data.get(kind, [])
+        return list(data or [])
+
+    def _read_journal(self, kind):
+        path = self._journal_path(kind)
+        if not os.path.exists(path):
+            return []
+
+        entries = []
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A torn last line from a crash mid-append is dropped.
+                    continue
+        return [e for e in entries if isinstance(e, dict)]
+
+    def read(self, kind):
+        items = self._read_snapshot(kind)
+        for entry in self._read_journal(kind):
+            items = _apply(kind, items, entry)
+        return items
+
+    def _write_snapshot(self, kind, items):
+        # holdings.json is a plain list; watchlist/income keep their wrapper.
+        payload = list(items) if kind == "holdings" else {kind: list(items)}
+        atomic_write_json(self.paths[kind], payload)
+
+        # Snapshot first, then drop the journal: a crash in between only
+        # replays entries the snapshot already reflects.
+        journal = self._journal_path(kind)
+        if os.path.exists(journal):
+            os.remove(journal)
+        self._journal_lines.pop(kind, None)
+
+    def write(self, kind, items):
+        with _file_lock(self.paths[kind], self._lock):
+            self._write_snapshot(kind, items)
+
+    def compact(self, kind):
+        """
+        Fold the journal into a fresh snapshot.
+        """
+        with _file_lock(self.paths[kind], self._lock):
+            self._write_snapshot(kind, self.read(kind))
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    @staticmethod
+    def _count_lines(path):
+        with open(path, "rb") as f:
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 16), b""))
+
+    def _append(self, kind, entry):
+        with _file_lock(self.paths[kind], self._lock):
+            path = self._journal_path(kind)
+            with open(path, "ab") as f:
+                # Terminate a torn line left by a crash so this entry stays parseable.
+                if f.tell() and not self._ends_with_newline(path):
+                    f.write(b"\n")
+                f.write((json.dumps(entry, default=str) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                inode = os.fstat(f.fileno()).st_ino
+
+            # Count appends in memory; re-count only when the journal is a
+            # new file (e.g. another process compacted it).
+            cached = self._journal_lines.get(kind)
+            lines = cached[1] + 1 if cached and cached[0] == inode else self._count_lines(path)
+            self._journal_lines[kind] = (inode, lines)
+
+            if self.compact_every and lines >= self.compact_every:
+                self._write_snapshot(kind, self.read(kind))
+
+    def upsert(self, kind, item):
+        # "edit" replaces the row with the same key or appends it, so no read is needed.
+        self._append(kind, {"op": "edit", "key": _KEY_FUNCS[kind](item), "item": item})
+
+    def delete(self, kind, key):
+        self._append(kind, {"op": "remove", "key": _holding_key(key)})
+
+    def append(self, kind, item):
+        """
+        Add one row without matching existing keys (ledger entries).
+        """
+        self._append(kind, {"op": "append", "key": _KEY_FUNCS[kind](item), "item": item})
+
+
+# ==============================
+# SQLITE
+# ==============================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS holdings (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    shares NUMERIC,
+    buy_price NUMERIC,
+    buy_date TEXT,
+    legacy INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_holdings_ticker ON holdings (ticker);
+CREATE INDEX IF NOT EXISTS idx_holdings_buy_date ON holdings (buy_date);
+
+CREATE TABLE IF NOT EXISTS watchlist (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS income (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    amount NUMERIC NOT NULL,
+    type TEXT,
+    date TEXT,
+    shares NUMERIC,
+    price NUMERIC
+);
+CREATE INDEX IF NOT EXISTS idx_income_ticker ON income (ticker);
+CREATE INDEX IF NOT EXISTS idx_income_date ON income (date);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    type TEXT NOT NULL,
+    shares NUMERIC NOT NULL,
+    price NUMERIC NOT NULL,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_ticker ON transactions (ticker);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_COLUMNS = {
+    "holdings": ("ticker", "shares", "buy_price", "buy_date", "legacy"),
+    "watchlist": ("ticker",),
+    "income": ("ticker", "amount", "type", "date", "shares", "price"),
+    "transactions": ("ticker", "type", "shares", "price", "date"),
+}
+
+# Optional income fields (DRIP entries) left out of rows when unset.
+_OPTIONAL = {"shares", "price"}
+
+
+def _to_row(kind, item):
+    if kind == "holdings":
+        if not isinstance(item, dict):
+            return (_holding_key(item), None, None, None, 1)
+        return (
+            _holding_key(item),
+            item.get("shares", 0),
+            item.get("buy_price", 0),
+            item.get("buy_date"),
+            0,
+        )
+    if kind == "watchlist":
+        return (_watch_key(item),)
+    if kind == "transactions":
+        return (
+            _holding_key(item),
+            str(item.get("type", "buy")).lower().strip(),
+            item.get("shares", 0),
+            item.get("price", 0),
+            item.get("date"),
+        )
+    return (
+        _holding_key(item),
+        item.get("amount", 0),
+        item.get("type"),
+        item.get("date"),
+        item.get("shares"),
+        item.get("price"),
+    )
+
+
+def _from_row(kind, row):
+    if kind == "holdings":
+        ticker, shares, buy_price, buy_date, legacy = row
+        if legacy:
+            return ticker
+        return {"ticker": ticker, "shares": shares, "buy_price": buy_price, "buy_date": buy_date}
+    if kind == "watchlist":
+        return row[0]
+    record = dict(zip(_COLUMNS[kind], row))
+    if kind == "income":
+        for field in _OPTIONAL:
+            if record[field] is None:
+                del record[field]
+    return record
+
+
+class SqliteStorage:
+    """
+    SQLite tables with ticker/date indexes. Rows keep insertion order (id).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=PORTFOLIO_DB_FILE, seed=None):
+        self.path = path
+        self.seed = seed or JsonStorage()
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._checked_json = False
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            with self._init_lock:
+                self._migrate(conn)
+                if not self._checked_json:
+                    self._checked_json = True
+                    self._warn_stale_json(conn)
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn):
+        """
+        One-time import of each JSON file into its (new) table, and a
+        one-time rewrite of tickers stored before keys were canonical.
+        """
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            migrated = {
+                row[0] for row in conn.execute("SELECT key FROM meta WHERE key LIKE 'migrated:%'")
+            }
+
+            for kind in KINDS:
+                if f"migrated:{kind}" in migrated:
+                    continue
+                rows = [_to_row(kind, item) for item in self.seed.read(kind)]
+                rows = [row for row in rows if row[0]]
+                if kind == "watchlist":
+                    rows = list(dict.fromkeys(rows))
+                self._insert(conn, kind, rows)
+                self._bump(conn, kind)
+                conn.execute("INSERT INTO meta (key, value) VALUES (?, 1)", (f"migrated:{kind}",))
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    (f"imported_at:{kind}", time.time_ns()),
+                )
+
+            if "migrated:canonical" not in migrated:
+                self._canonicalize(conn)
+                conn.execute("INSERT INTO meta (key, value) VALUES ('migrated:canonical', 1)")
+
+    def _canonicalize(self, conn):
+        for kind in KINDS:
+            rows = conn.execute(f"SELECT id, ticker FROM {kind} ORDER BY id").fetchall()
+            seen = set()
+            changed = False
+            for row_id, ticker in rows:
+                canonical = _holding_key(ticker)
+                if kind == "watchlist" and canonical in seen:
+                    # ZAG and ZAG.TO were both listed; keep the first.
+                    conn.execute("DELETE FROM watchlist WHERE id = ?", (row_id,))
+                    changed = True
+                    continue
+                seen.add(canonical)
+                if canonical != ticker:
+                    if kind == "watchlist":
+                        conn.execute("DELETE FROM watchlist WHERE ticker = ? AND id != ?", (canonical, row_id))
+                    conn.execute(f"UPDATE {kind} SET ticker = ? WHERE id = ?", (canonical, row_id))
+                    changed = True
+            if changed:
+                self._bump(conn, kind)
+
+    def _warn_stale_json(self, conn):
+        """
+        Warn when a JSON file changed after it was imported: the database
+        is the source of truth from then on, so those edits are not read.
+        """
+        paths = getattr(self.seed, "paths", {})
+        for kind in KINDS:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (f"imported_at:{kind}",)).fetchone()
+            path = paths.get(kind)
+            if row is None or not path:
+                continue
+            try:
+                modified = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if modified > row[0]:
+                warnings.warn(
+                    f"{path} was edited after it was imported into {self.path}; the sqlite "
+                    "storage backend ignores it. Set PORTFOLIO_STORAGE=json to use the "
+                    "JSON files, or delete the database to re-import them.",
+                    stacklevel=2,
+                )
+
+    @staticmethod
+    def _insert(conn, kind, rows):
+        columns = _COLUMNS[kind]
+        conn.executemany(
+            f"INSERT INTO {kind} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            rows,
+        )
+
+    @staticmethod
+    def _bump(conn, kind):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1",
+            (f"rev:{kind}",),
+        )
+
+    def _stored(self, conn, kind):
+        columns = _COLUMNS[kind]
+        return conn.execute(
+            f"SELECT id, {', '.join(columns)} FROM {kind} ORDER BY id"
+        ).fetchall()
+
+    def signature(self, kind):
+        row = self._connection().execute(
+            "SELECT value FROM meta WHERE key = ?", (f"rev:{kind}",)
+        ).fetchone()
+        return (self.path, row[0] if row else 0)
+
+    def read(self, kind):
+        return [_from_row(kind, row[1:]) for row in self._stored(self._connection(), kind)]
+
+    def write(self, kind, items):
+        """
+        Replace the stored list with items, touching only rows that changed.
+
+        Rows are matched by key in order; unchanged rows are left alone, so
+        appending, editing or removing one row is one indexed write. Inserting
+        a row before existing ones, or reordering, rewrites the table.
+        """
+        key_of = _KEY_FUNCS[kind]
+        wanted = [(key_of(item), _to_row(kind, item)) for item in items]
+        wanted = [(key, row) for key, row in wanted if row[0]]
+        if kind in _UNIQUE_KINDS:
+            seen = set()
+            wanted = [(key, row) for key, row in wanted if not (key in seen or seen.add(key))]
+
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            stored = self._stored(conn, kind)
+
+            # Match the n-th occurrence of each key so duplicates survive.
+            available = {}
+            for row in stored:
+                available.setdefault(key_of(_from_row(kind, row[1:])), []).append(row)
+
+            matched = []
+            inserts = []
+            updates = []
+            reordered = False
+            for key, row in wanted:
+                candidates = available.get(key)
+                if candidates:
+                    existing = candidates.pop(0)
+                    if inserts or (matched and existing[0] < matched[-1]):
+                        # New ids go at the end, so a row inserted before
+                        # an existing one moves order like a reorder does.
+                        reordered = True
+                    matched.append(existing[0])
+                    if tuple(existing[1:]) != row:
+                        updates.append(row + (existing[0],))
+                else:
+                    inserts.append(row)
+
+            deletes = [(row[0],) for rows in available.values() for row in rows]
+
+            # Ids are the list order; a reordered list is rewritten in full.
+            if reordered:
+                conn.execute(f"DELETE FROM {kind}")
+                self._insert(conn, kind, [row for _, row in wanted])
+            else:
+                columns = _COLUMNS[kind]
+                if deletes:
+                    conn.executemany(f"DELETE FROM {kind} WHERE id = ?", deletes)
+                if updates:
+                    conn.executemany(
+                        f"UPDATE {kind} SET {', '.join(c + ' = ?' for c in columns)} WHERE id = ?",
+                        updates,
+                    )
+                if inserts:
+                    self._insert(conn, kind, inserts)
+
+            if deletes or updates or inserts or reordered:
+                self._bump(conn, kind)
+
+    def upsert(self, kind, item):
+        """
+        Update the first row with item's key, or append it.
+        """
+        row = _to_row(kind, item)
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = conn.execute(
+                f"SELECT id FROM {kind} WHERE ticker = ? ORDER BY id LIMIT 1", (row[0],)
+            ).fetchone()
+            if existing:
+                columns = _COLUMNS[kind]
+                conn.execute(
+                    f"UPDATE {kind} SET {', '.join(c + ' = ?' for c in columns)} WHERE id = ?",
+                    row + (existing[0],),
+                )
+            else:
+                self._insert(conn, kind, [row])
+            self._bump(conn, kind)
+
+    def append(self, kind, item):
+        """
+        Insert one row (ledger entries); a single indexed write.
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._insert(conn, kind, [_to_row(kind, item)])
+            self._bump(conn, kind)
+
+    def delete(self, kind, key):
+        """
+        Remove every row for ticker key.
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(f"DELETE FROM {kind} WHERE ticker = ?", (_holding_key(key),))
+            if cursor.rowcount:
+                self._bump(conn, kind)
+
+
+# ==============================
+# BACKEND SELECTION
+# ==============================
+
+BACKENDS = {"json": JsonStorage, "sqlite": SqliteStorage}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """
+    Process-wide backend chosen by PORTFOLIO_STORAGE (json or sqlite).
+    """
+    global _storage
+
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                backend = BACKENDS.get(STORAGE_BACKEND)
+                if backend is None:
+                    raise ValueError(
+                        f"Unknown PORTFOLIO_STORAGE '{STORAGE_BACKEND}'. "
+                        f"Use one of: {', '.join(BACKENDS)}."
+                    )
+                _storage = backend()
+    return _storage
+
+
+def set_storage(storage):
+    """
+    Swap the active backend (e.g. a JsonStorage or SqliteStorage on another path).
+    """
+    global _storage
+
+    with _storage_lock:
+        _storage = storage
@@ -1,14 +1,33 @@
-import yfinance as yf
-from ta.momentum import RSIIndicator
-from ta.trend import MACD
+import warnings
 
+import numpy as np
+import pandas as pd
 
+from agents.fetch import UNAVAILABLE
+from agents.history_store import get_close_matrix, get_history_result
+from agents.indicator_engine import (
+    get_indicators,
+    MACD_FAST,
+    MACD_SIGNAL,
+    MACD_SLOW,
+    RSI_WINDOW,
+)
+from agents.metrics import counter
+from agents.tracing import traced
+
+TECHNICAL = counter("portfolio_technical_total", "Technical analyses by history fetch status.", ("status",))
+
+
+@traced("technical", ticker=True)
 def analyze_technical(ticker, tone="conservative"):
 
-    stock = yf.Ticker(ticker)
-    hist = stock.history(period="6mo")
+    result = get_history_result(ticker, period="6mo")
+    hist = result.value
+    TECHNICAL.inc(status=result.status)
 
     if hist.empty:
+        # A provider outage is not the same as a ticker without data.
+        unavailable = result.status == UNAVAILABLE
         return {
             "ticker": ticker,
             "trend": "unknown",
@@ -17,19 +36,21 @@ def analyze_technical(ticker, tone="conservative"):
             "macd": None,
             "macd_signal": None,
             "signal": "neutral",
-            "entry_timing": "no data",
-            "summary": f"No technical data available for {ticker}"
+            "entry_timing": "data unavailable" if unavailable else "no data",
+            "summary": (
+                f"Technical data for {ticker} is temporarily unavailable"
+                if unavailable
+                else f"No technical data available for {ticker}"
+            ),
         }
 
     close_prices = hist["Close"]
 
-    # RSI
-    rsi = float(RSIIndicator(close=close_prices).rsi().iloc[-1])
-
-    # MACD
-    macd = MACD(close=close_prices)
-    macd_value = float(macd.macd().iloc[-1])
-    macd_signal = float(macd.macd_signal().iloc[-1])
+    # RSI / MACD from the incremental engine (O(1) per new bar)
+    indicators = get_indicators(ticker, close_prices)
+    rsi = indicators["rsi"]
+    macd_value = indicators["macd"]
+    macd_signal = indicators["macd_signal"]
 
     # Trend detection
     current_price = float(close_prices.iloc[-1])
@@ -102,3 +123,131 @@ def analyze_technical(ticker, tone="conservative"):
         "signal": normalized_signal,
         "summary": summary,
     }
+
+
+# ==============================
+# BATCH (CROSS-TICKER) ANALYSIS
+# Same rules as analyze_technical, evaluated for every ticker at once.
+# ==============================
+
+def _batch_indicators(closes):
+    """
+    RSI, MACD and signal for each row of a tickers x days matrix.
+
+    The recurrences step through days with NumPy ops across all tickers.
+    A NaN day is skipped for that ticker, so each row matches the ticker's
+    own series (leading NaNs = not listed yet).
+    """
+    rows, days = closes.shape
+    a = 1.0 / RSI_WINDOW
+    fast = 2.0 / (MACD_FAST + 1)
+    slow = 2.0 / (MACD_SLOW + 1)
+    sig = 2.0 / (MACD_SIGNAL + 1)
+
+    n = np.zeros(rows, dtype="int64")
+    signal_n = np.zeros(rows, dtype="int64")
+    last = np.full(rows, np.nan)
+    avg_up = np.zeros(rows)
+    avg_down = np.zeros(rows)
+    ema_fast = np.zeros(rows)
+    ema_slow = np.zeros(rows)
+    ema_signal = np.zeros(rows)
+
+    for t in range(days):
+        x = closes[:, t]
+        valid = ~np.isnan(x)
+        first = valid & (n == 0)
+        step = valid & (n > 0)
+
+        change = np.where(step, x - last, 0.0)
+        avg_up = np.where(step, (1 - a) * avg_up + a * np.maximum(change, 0.0), avg_up)
+        avg_down = np.where(step, (1 - a) * avg_down + a * np.maximum(-change, 0.0), avg_down)
+        ema_fast = np.where(first, x, np.where(step, (1 - fast) * ema_fast + fast * x, ema_fast))
+        ema_slow = np.where(first, x, np.where(step, (1 - slow) * ema_slow + slow * x, ema_slow))
+
+        n += valid
+        last = np.where(valid, x, last)
+
+        macd_ready = valid & (n >= MACD_SLOW)
+        macd_now = ema_fast - ema_slow
+        ema_signal = np.where(
+            macd_ready & (signal_n == 0),
+            macd_now,
+            np.where(macd_ready, (1 - sig) * ema_signal + sig * macd_now, ema_signal),
+        )
+        signal_n += macd_ready
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+    rsi = np.where(n >= RSI_WINDOW, rsi, np.nan)
+    macd = np.where(n >= MACD_SLOW, ema_fast - ema_slow, np.nan)
+    macd_signal = np.where(signal_n >= MACD_SIGNAL, ema_signal, np.nan)
+
+    return last, rsi, macd, macd_signal
+
+
+def analyze_technical_matrix(closes, tickers=None):
+    """
+    Technical screen for many tickers in one vectorized pass.
+
+    closes is a date-aligned DataFrame (rows: dates, columns: tickers) or a
+    tickers x days array with tickers given separately. Returns a DataFrame
+    indexed by ticker with close, period mean, rsi, macd, macd_signal and
+    categorical trend, momentum, entry_timing and signal columns.
+    """
+    if isinstance(closes, pd.DataFrame):
+        tickers = list(closes.columns)
+        matrix = closes.to_numpy(dtype="float64").T
+    else:
+        matrix = np.asarray(closes, dtype="float64")
+        tickers = list(tickers) if tickers is not None else list(range(len(matrix)))
+
+    if matrix.ndim != 2 or matrix.shape[0] != len(tickers):
+        raise ValueError("closes must be tickers x days, with one ticker per row.")
+
+    last, rsi, macd, macd_signal = _batch_indicators(matrix)
+    with warnings.catch_warnings():
+        # All-NaN rows (no history) have no mean; they are marked "unknown".
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(matrix, axis=1) if matrix.shape[1] else last
+    has_data = ~np.isnan(last)
+
+    rising = has_data & (last > mean)
+    falling = has_data & (last < mean)
+    strong = rsi > 65
+    weak = rsi < 40
+
+    trend = np.select([~has_data, rising, falling], ["unknown", "rising", "falling"], "sideways")
+    momentum = np.select([~has_data, strong, weak], ["unknown", "strong", "weak"], "neutral")
+    entry_timing = np.select(
+        [~has_data, rising & strong, falling],
+        ["no data", "acceptable for gradual entry", "better to wait"],
+        "monitor for better timing",
+    )
+    signal = np.select([rising & strong, falling & weak], ["bullish", "bearish"], "neutral")
+
+    return pd.DataFrame(
+        {
+            "close": last,
+            "mean": mean,
+            "rsi": np.round(rsi, 2),
+            "macd": np.round(macd, 2),
+            "macd_signal": np.round(macd_signal, 2),
+            "trend": pd.Categorical(trend, categories=["rising", "falling", "sideways", "unknown"]),
+            "momentum": pd.Categorical(momentum, categories=["strong", "neutral", "weak", "unknown"]),
+            "entry_timing": pd.Categorical(entry_timing),
+            "signal": pd.Categorical(signal, categories=["bullish", "neutral", "bearish"]),
+        },
+        index=pd.Index(tickers, name="ticker"),
+    )
+
+
+@traced("technical")
+def analyze_technical_batch(tickers, period="6mo"):
+    """
+    analyze_technical_matrix over stored history for tickers.
+    Tickers without history come back with trend "unknown".
+    """
+    tickers = list(dict.fromkeys(tickers))
+    closes = get_close_matrix(tickers, period=period)
+    return analyze_technical_matrix(closes.reindex(columns=tickers))
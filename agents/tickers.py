@@ -0,0 +1,79 @@
+"""
+Ticker Reference Data
+Asset-class map and the single canonical ticker form used across agents.
+"""
+
+# ==============================
+# TICKER → ASSET CLASS MAP
+# Expand anytime
+# ==============================
+
+ASSET_CLASS_MAP = {
+
+    # Cash / HISA ETFs
+    "SAFE.TO": "cash",
+    "CASH.TO": "cash",
+
+    # Bonds
+    "ZAG.TO": "bonds",
+    "VAB.TO": "bonds",
+    "XBB.TO": "bonds",
+
+    # Canada equity
+    "XIU.TO": "canada_equity",
+    "VCN.TO": "canada_equity",
+    "BCE.TO": "canada_equity",
+    "ENB.TO": "canada_equity",
+    "TD.TO": "canada_equity",
+    "BNS.TO": "canada_equity",
+    "FTS.TO": "canada_equity",
+
+    # US equity
+    "VTI": "us_equity",
+    "XUU.TO": "us_equity",
+
+    # Global equity
+    "XAW.TO": "global_equity",
+    "XEQT.TO": "global_equity",
+    "VGRO.TO": "global_equity",
+    "VBAL.TO": "global_equity"
+}
+
+
+# Canadian listings that also appear without the ".TO" suffix.
+EXTRA_CANADIAN_SYMBOLS = {"XRE", "VGG", "ZRE", "MRU"}
+
+CANADIAN_SYMBOLS = frozenset(
+    {ticker[:-3] for ticker in ASSET_CLASS_MAP if ticker.endswith(".TO")}
+    | EXTRA_CANADIAN_SYMBOLS
+)
+
+
+def canonical_ticker(ticker):
+    """
+    Canonical form of a ticker (or holding dict): upper-case, trimmed, and
+    bare Canadian symbols suffixed with ".TO" (ZAG -> ZAG.TO).
+    Returns None for empty values.
+    """
+    if isinstance(ticker, dict):
+        ticker = ticker.get("ticker")
+    if not ticker:
+        return None
+
+    ticker = str(ticker).upper().strip()
+    if not ticker:
+        return None
+
+    if "." not in ticker and ticker in CANADIAN_SYMBOLS:
+        return f"{ticker}.TO"
+
+    return ticker
+
+
+def canonical_tickers(tickers):
+    """
+    Vectorized canonical_ticker for a pandas Series; empty values become "".
+    """
+    tickers = tickers.fillna("").astype(str).str.upper().str.strip()
+    bare_canadian = ~tickers.str.contains(".", regex=False) & tickers.isin(CANADIAN_SYMBOLS)
+    return tickers.where(~bare_canadian, tickers + ".TO")
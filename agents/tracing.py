@@ -0,0 +1,235 @@
+"""
+Tracing
+Lightweight spans around agent calls, tagged with a stage (history, fetch,
+indicators, sentiment, llm, storage, ...) and attributes such as the
+ticker. Spans can be exported as Chrome trace JSON (chrome://tracing,
+Perfetto, speedscope) and summarized per stage.
+
+Tracing is off unless PORTFOLIO_TRACE=1 (or enable_tracing()); a disabled
+span or traced call costs one flag check.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from config import TRACE_ENABLED
+
+# Oldest spans are dropped beyond this, so long-lived processes stay bounded.
+MAX_EVENTS = 200_000
+
+_enabled = TRACE_ENABLED
+_events = deque(maxlen=MAX_EVENTS)
+_local = threading.local()
+_origin_ns = time.perf_counter_ns()
+
+
+def enable_tracing(enabled=True):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def tracing_enabled():
+    return _enabled
+
+
+def reset_trace():
+    """
+    Drop recorded spans.
+    """
+    _events.clear()
+
+
+class _Span:
+    __slots__ = ("name", "stage", "attrs", "start", "child_ns", "outer")
+
+    def __init__(self, name, stage, attrs):
+        self.name = name
+        self.stage = stage
+        self.attrs = attrs
+        self.child_ns = 0
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        # Only the outermost span of a stage counts toward its total time.
+        self.outer = all(parent.stage != self.stage for parent in stack)
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter_ns() - self.start
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1].child_ns += duration
+
+        attrs = self.attrs
+        if exc_type is not None:
+            attrs = dict(attrs or {}, error=exc_type.__name__)
+        # (name, stage, start, duration, self time, outer, thread, attrs)
+        _events.append(
+            (
+                self.name,
+                self.stage,
+                self.start - _origin_ns,
+                duration,
+                duration - self.child_ns,
+                self.outer,
+                threading.get_ident(),
+                attrs,
+            )
+        )
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, stage=None, **attrs):
+    """
+    Context manager timing a block:
+
+        with span("load_portfolio", stage="storage"):
+            ...
+    """
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name, stage or name, attrs or None)
+
+
+def traced(stage, name=None, ticker=False):
+    """
+    Decorator recording a span per call. With ticker=True the first
+    positional argument is recorded as the ticker attribute.
+    """
+
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            attrs = {"ticker": str(args[0])} if ticker and args else None
+            with _Span(label, stage, attrs):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+# ==============================
+# EXPORT
+# ==============================
+
+def chrome_trace():
+    """
+    Recorded spans in Chrome trace event format.
+    """
+    pid = os.getpid()
+    events = []
+    thread_ids = {}
+
+    for name, stage, start, duration, _, _, thread, attrs in list(_events):
+        tid = thread_ids.setdefault(thread, len(thread_ids) + 1)
+        events.append(
+            {
+                "name": name,
+                "cat": stage,
+                "ph": "X",
+                "ts": start / 1000.0,
+                "dur": duration / 1000.0,
+                "pid": pid,
+                "tid": tid,
+                "args": attrs or {},
+            }
+        )
+
+    names = {t.ident: t.name for t in threading.enumerate()}
+    for thread, tid in thread_ids.items():
+        events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": names.get(thread, f"thread-{tid}")},
+            }
+        )
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(path):
+    """
+    Write the Chrome trace JSON to path and return the path.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(), f)
+    return path
+
+
+def stage_summary():
+    """
+    Per-stage totals sorted by self time (time not spent in nested spans):
+    [{stage, calls, total_ms, self_ms, mean_ms, max_ms}]. total_ms counts
+    only the outermost span of a stage so nesting is not double-counted;
+    mean_ms is the mean duration over every span, nested ones included.
+    """
+    stages = {}
+    for _, stage, _, duration, self_ns, outer, _, _ in list(_events):
+        row = stages.setdefault(stage, [0, 0, 0, 0, 0])
+        row[0] += 1
+        if outer:
+            row[1] += duration
+        row[2] += self_ns
+        row[3] = max(row[3], duration)
+        row[4] += duration
+
+    rows = [
+        {
+            "stage": stage,
+            "calls": calls,
+            "total_ms": round(total / 1e6, 2),
+            "self_ms": round(self_ns / 1e6, 2),
+            "mean_ms": round(inclusive / calls / 1e6, 3),
+            "max_ms": round(longest / 1e6, 2),
+        }
+        for stage, (calls, total, self_ns, longest, inclusive) in stages.items()
+    ]
+    rows.sort(key=lambda row: row["self_ms"], reverse=True)
+    return rows
+
+
+def format_stage_summary():
+    rows = stage_summary()
+    if not rows:
+        return "No spans recorded."
+
+    lines = [
+        "⏱️ STAGE TIMINGS (self = excluding nested stages)",
+        f"{'stage':<16}{'calls':>8}{'self ms':>12}{'total ms':>12}{'mean ms':>10}{'max ms':>10}",
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['stage']:<16}{row['calls']:>8}{row['self_ms']:>12.1f}"
+            f"{row['total_ms']:>12.1f}{row['mean_ms']:>10.2f}{row['max_ms']:>10.1f}"
+        )
+    return "\n".join(lines)
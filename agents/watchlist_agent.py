@@ -1,4 +1,5 @@
 from agents.data_loader import load_watchlist, save_watchlist
+from agents.tickers import canonical_ticker
 
 
 # ==============================
@@ -7,14 +8,11 @@ from agents.data_loader import load_watchlist, save_watchlist
 
 def normalize_ticker(ticker):
     """
-    Ensure ticker format consistency:
+    Ensure ticker format consistency (the same key storage uses):
     safe.to → SAFE.TO
-    xiU.to → XIU.TO
+    zag → ZAG.TO
     """
-    if not ticker:
-        return None
-
-    return ticker.upper().strip()
+    return canonical_ticker(ticker)
 
 
 # ==============================
@@ -29,9 +27,9 @@ def _safe_watchlist():
 
     watchlist = load_watchlist()
 
-    # Case 1: already list
-    if isinstance(watchlist, list):
-        return watchlist
+    # Case 1: list, or the loader's read-only tuple (copy so callers can edit)
+    if isinstance(watchlist, (list, tuple)):
+        return list(watchlist)
 
     # Case 2: saved as {"watchlist": [...]}
     if isinstance(watchlist, dict):
@@ -50,6 +48,7 @@ def add_to_watchlist(tickers):
     """
 
     watchlist = _safe_watchlist()
+    listed = {normalize_ticker(item) for item in watchlist}
 
     for ticker in tickers:
 
@@ -59,8 +58,9 @@ def add_to_watchlist(tickers):
         if not ticker:
             continue
 
-        if ticker not in watchlist:
+        if ticker not in listed:
             watchlist.append(ticker)
+            listed.add(ticker)
 
     save_watchlist(watchlist)
 
@@ -77,8 +77,8 @@ def remove_from_watchlist(ticker):
 
     ticker = normalize_ticker(ticker)
 
-    if ticker in watchlist:
-        watchlist.remove(ticker)
+    # Stored entries may predate canonical keys (ZAG vs ZAG.TO).
+    watchlist = [item for item in watchlist if normalize_ticker(item) != ticker]
 
     save_watchlist(watchlist)
 
@@ -1,31 +1,71 @@
+import hashlib
+import json
+
 import altair as alt
 import pandas as pd
 import streamlit as st
-import yfinance as yf
 from datetime import date
 
-from agents.data_loader import load_holdings, load_watchlist, save_holdings
+from agents.data_loader import (
+    load_holdings,
+    load_holdings_portfolio,
+    load_income,
+    load_portfolio,
+    load_positions,
+    load_transactions,
+    load_watchlist,
+    record_transaction,
+    remove_holding,
+    upsert_holding,
+)
+from agents.history_store import get_history
+from agents.holdings_io import export_holdings_bytes, import_holdings_csv
 from agents.portfolio_summary_agent import portfolio_summary
-from agents.allocation_agent import calculate_allocation, TARGET_ALLOCATION, classify_ticker
+from agents.allocation_agent import get_allocation_snapshot, invalidate_allocation, TARGET_ALLOCATION, classify_ticker
 from agents.rebalance_agent import analyze_rebalance
 from agents.recommendation_agent import recommend_portfolio
 from agents.guardrail_agent import apply_target_guardrails
-from agents.signal_agent import generate_signal
-from agents.decision_agent import generate_decision, generate_watch_decision
+from agents.analysis_agent import analysis_run, analyze_signal_item, prime_signal_items, run_parallel
 from agents.capital_agent import deploy_capital
-from agents.price_agent import get_price
+from agents.price_agent import get_prices
+from agents.sentiment_agent import parse_sentiment
+from agents.sentiment_cache import clear_sentiment_cache
 from agents.watchlist_agent import add_to_watchlist, remove_from_watchlist
-from config import assert_openai_api_key, ENV_FILE
+from agents.llm_client import get_client
+from agents.metrics import all_metrics, metric_total, reset_metrics, start_metrics_server
+from config import (
+    assert_openai_api_key,
+    llm_key_required,
+    ENV_FILE,
+    DASHBOARD_QUOTE_TTL_SECONDS,
+    DASHBOARD_HISTORY_TTL_SECONDS,
+    DASHBOARD_SIGNAL_TTL_SECONDS,
+    METRICS_HOST,
+    METRICS_PORT,
+)
 
 
 st.set_page_config(page_title="Portfolio Assistant", layout="wide")
 
+
+# LLM replay mode serves recorded responses and needs no key or client.
+if llm_key_required():
+    try:
+        assert_openai_api_key()
+    except RuntimeError as e:
+        st.error(str(e))
+        st.info(f"Set your key in `{ENV_FILE}`.")
+        st.stop()
+
+    # Creates the process-wide client once; later reruns reuse it.
+    get_client()
+
+
+# Starts once per process (no-op on reruns, or when PORTFOLIO_METRICS_PORT is unset).
 try:
-    assert_openai_api_key()
-except RuntimeError as e:
-    st.error(str(e))
-    st.info(f"Set your key in `{ENV_FILE}`.")
-    st.stop()
+    start_metrics_server()
+except OSError as e:
+    st.warning(f"Metrics endpoint not started: {e}")
 
 
 st.title("Portfolio Assistant")
@@ -43,73 +83,31 @@ def _normalize_ticker(item):
     return str(ticker).upper().strip()
 
 
-def _parse_sentiment(sentiment):
-    text = str(sentiment).strip()
-    if not text:
-        return "N/A", "N/A", ""
-
-    mood = "N/A"
-    confidence = "N/A"
-    reasoning = ""
-
-    for line in text.splitlines():
-        line = line.strip()
-        lower = line.lower()
-        if lower.startswith("sentiment:"):
-            mood = line.split(":", 1)[1].strip()
-        elif lower.startswith("confidence:"):
-            confidence = line.split(":", 1)[1].strip()
-        elif lower.startswith("reasoning:"):
-            reasoning = line.split(":", 1)[1].strip()
-
-    if mood == "N/A" and "\n" not in text:
-        mood = text
-
-    return mood, confidence, reasoning
-
-
 def _build_current_holdings_context(holdings):
     context = {}
-    for item in holdings:
-        if isinstance(item, dict):
-            ticker = _normalize_ticker(item)
-            if not ticker:
-                continue
-            context[ticker] = f"shares={item.get('shares', 0)}, avg_cost={item.get('buy_price', 0)}"
+    for holding in holdings:
+        if holding.legacy:
+            context[holding.ticker] = "existing position"
         else:
-            ticker = _normalize_ticker(item)
-            if ticker:
-                context[ticker] = "existing position"
+            context[holding.ticker] = f"shares={holding.shares:g}, avg_cost={holding.buy_price:g}"
     return context
 
 
-def _normalize_holdings_records(raw_holdings):
+def _normalize_holdings_records(portfolio):
     records = []
-    for item in raw_holdings:
-        if isinstance(item, dict):
-            ticker = _normalize_ticker(item)
-            if not ticker:
-                continue
-            records.append(
-                {
-                    "ticker": ticker,
-                    "shares": float(item.get("shares", 0) or 0),
-                    "buy_price": float(item.get("buy_price", 0) or 0),
-                    "buy_date": str(item.get("buy_date", str(date.today()))),
-                }
-            )
-        else:
-            ticker = _normalize_ticker(item)
-            if not ticker:
-                continue
-            records.append(
-                {
-                    "ticker": ticker,
-                    "shares": 1.0,
-                    "buy_price": float(get_price(ticker) or 0),
-                    "buy_date": str(date.today()),
-                }
-            )
+    legacy_tickers = [h.ticker for h in portfolio if h.legacy]
+    prices = get_prices(legacy_tickers, stale_ok=True) if legacy_tickers else {}
+
+    for holding in portfolio:
+        buy_price = float(prices.get(holding.ticker) or 0) if holding.legacy else holding.buy_price
+        records.append(
+            {
+                "ticker": holding.ticker,
+                "shares": holding.shares,
+                "buy_price": buy_price,
+                "buy_date": str(holding.buy_date or date.today()),
+            }
+        )
     return records
 
 
@@ -118,16 +116,17 @@ def _portfolio_snapshot(holdings):
     total_cost = 0.0
     total_value = 0.0
 
-    for item in holdings:
-        if not isinstance(item, dict):
-            continue
+    open_positions = [h for h in holdings if not h.legacy]
+    prices = get_prices([h.ticker for h in open_positions], stale_ok=True)
+    ledger = load_positions()
 
-        ticker = _normalize_ticker(item)
-        shares = float(item.get("shares", 0) or 0)
-        buy_price = float(item.get("buy_price", 0) or 0)
-        buy_date = item.get("buy_date", "N/A")
+    for holding in open_positions:
+        ticker = holding.ticker
+        shares = holding.shares
+        buy_price = holding.buy_price
+        buy_date = str(holding.buy_date) if holding.buy_date else "N/A"
 
-        current_price = get_price(ticker)
+        current_price = prices.get(ticker)
         position_cost = buy_price * shares
         position_value = (current_price or 0) * shares
 
@@ -143,9 +142,11 @@ def _portfolio_snapshot(holdings):
                 "Ticker": ticker,
                 "Asset Class": classify_ticker(ticker),
                 "Shares": shares,
-                "Buy Price": buy_price,
+                "Buy Price": round(buy_price, 4),
                 "Current Price": current_price,
                 "P/L %": round(pnl_pct, 2) if pnl_pct is not None else None,
+                "Realized P/L": round(ledger[ticker].realized_pnl, 2) if ticker in ledger else 0.0,
+                "Lots": len(ledger[ticker].lots) if ticker in ledger else 1,
                 "Buy Date": buy_date,
             }
         )
@@ -157,17 +158,13 @@ def _portfolio_snapshot(holdings):
 def _portfolio_value_history(holdings, period="6mo"):
     portfolio_values = {}
 
-    for item in holdings:
-        ticker = _normalize_ticker(item)
-        shares = item.get("shares", 1) if isinstance(item, dict) else 1
-        if not ticker:
-            continue
-
-        hist = yf.Ticker(ticker).history(period=period)
+    for holding in holdings:
+        ticker = holding.ticker
+        hist = get_history(ticker, period=period)
         if hist.empty:
             continue
 
-        portfolio_values[ticker] = hist["Close"] * shares
+        portfolio_values[ticker] = hist["Close"] * holding.shares
 
     if not portfolio_values:
         return pd.DataFrame()
@@ -179,12 +176,8 @@ def _portfolio_value_history(holdings, period="6mo"):
 
 def _ticker_performance_history(holdings, period="6mo"):
     frames = []
-    for item in holdings:
-        ticker = _normalize_ticker(item)
-        if not ticker:
-            continue
-
-        hist = yf.Ticker(ticker).history(period=period)
+    for ticker in holdings.tickers():
+        hist = get_history(ticker, period=period)
         if hist.empty:
             continue
 
@@ -207,18 +200,22 @@ def _ticker_performance_history(holdings, period="6mo"):
     return pd.concat(frames, ignore_index=True)
 
 
+@analysis_run()
 def _run_signal_pipeline(holdings, watchlist):
     holdings_rows = []
     holdings_decisions = {}
 
-    for item in holdings:
-        ticker = _normalize_ticker(item)
-        if not ticker:
-            continue
+    holding_tickers = holdings.tickers()
+    watch_tickers = [t for t in (_normalize_ticker(item) for item in watchlist) if t]
+
+    # Batch the run's sentiment calls; holdings and watchlist then share one
+    # bounded pool and keep input order.
+    work = [("holding", t) for t in holding_tickers] + [("watch", t) for t in watch_tickers]
+    prime_signal_items(work)
+    analyzed = run_parallel(analyze_signal_item, work)
 
-        result = generate_signal(ticker)
-        decision = generate_decision(ticker)
-        sentiment_value, sentiment_conf, sentiment_reason = _parse_sentiment(result.get("sentiment", ""))
+    for ticker, (result, decision) in zip(holding_tickers, analyzed[:len(holding_tickers)]):
+        sentiment_value, sentiment_conf, sentiment_reason = parse_sentiment(result.get("sentiment", ""))
 
         holdings_decisions[ticker] = decision.get("decision", "HOLD")
         holdings_rows.append(
@@ -240,14 +237,8 @@ def _run_signal_pipeline(holdings, watchlist):
     watch_rows = []
     watchlist_results = {}
 
-    for item in watchlist:
-        ticker = _normalize_ticker(item)
-        if not ticker:
-            continue
-
-        result = generate_signal(ticker)
-        watch_decision = generate_watch_decision(ticker, result)
-        sentiment_value, sentiment_conf, sentiment_reason = _parse_sentiment(result.get("sentiment", ""))
+    for ticker, (result, watch_decision) in zip(watch_tickers, analyzed[len(holding_tickers):]):
+        sentiment_value, sentiment_conf, sentiment_reason = parse_sentiment(result.get("sentiment", ""))
 
         watchlist_results[ticker] = {"result": result, "decision": watch_decision}
         watch_rows.append(
@@ -274,16 +265,16 @@ def _run_signal_pipeline(holdings, watchlist):
     }
 
 
+@analysis_run()
 def _watchlist_insights(watchlist):
     rows = []
-    for item in watchlist:
-        ticker = _normalize_ticker(item)
-        if not ticker:
-            continue
+    tickers = [t for t in (_normalize_ticker(item) for item in watchlist) if t]
+    work = [("watch", t) for t in tickers]
+    prime_signal_items(work)
+    analyzed = run_parallel(analyze_signal_item, work)
 
-        result = generate_signal(ticker)
-        watch_decision = generate_watch_decision(ticker, result)
-        sentiment_value, _, _ = _parse_sentiment(result.get("sentiment", ""))
+    for ticker, (result, watch_decision) in zip(tickers, analyzed):
+        sentiment_value, _, _ = parse_sentiment(result.get("sentiment", ""))
 
         rows.append(
             {
@@ -299,11 +290,112 @@ def _watchlist_insights(watchlist):
     return pd.DataFrame(rows)
 
 
+# ----------------------------
+# Cached views
+# Keys are content hashes of holdings/watchlist, so any edit misses the
+# cache; saves also clear it explicitly via _invalidate_data_caches().
+# ----------------------------
+
+def _content_key(value):
+    payload = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+@st.cache_data(ttl=DASHBOARD_QUOTE_TTL_SECONDS, show_spinner=False)
+def _cached_portfolio_snapshot(holdings_key, _holdings):
+    return _portfolio_snapshot(_holdings)
+
+
+@st.cache_data(ttl=DASHBOARD_QUOTE_TTL_SECONDS, show_spinner=False)
+def _cached_portfolio_summary(holdings_key):
+    return portfolio_summary()
+
+
+@st.cache_data(ttl=DASHBOARD_QUOTE_TTL_SECONDS, show_spinner=False)
+def _cached_rebalance(holdings_key):
+    return analyze_rebalance()
+
+
+@st.cache_data(ttl=DASHBOARD_QUOTE_TTL_SECONDS, show_spinner=False)
+def _cached_allocation(holdings_key, _holdings):
+    return get_allocation_snapshot(_holdings).get("weights", {}) if _holdings else {}
+
+
+@st.cache_data(ttl=DASHBOARD_HISTORY_TTL_SECONDS, show_spinner=False)
+def _cached_value_history(holdings_key, period, _holdings):
+    return _portfolio_value_history(_holdings, period=period)
+
+
+@st.cache_data(ttl=DASHBOARD_HISTORY_TTL_SECONDS, show_spinner=False)
+def _cached_performance_history(holdings_key, period, _holdings):
+    return _ticker_performance_history(_holdings, period=period)
+
+
+@st.cache_data(ttl=DASHBOARD_SIGNAL_TTL_SECONDS, show_spinner=False)
+def _cached_watchlist_insights(watchlist_key, _watchlist):
+    return _watchlist_insights(_watchlist)
+
+
+_DATA_CACHES = [
+    _cached_portfolio_snapshot,
+    _cached_portfolio_summary,
+    _cached_rebalance,
+    _cached_allocation,
+    _cached_value_history,
+    _cached_performance_history,
+    _cached_watchlist_insights,
+]
+
+
+def _invalidate_data_caches():
+    for cached in _DATA_CACHES:
+        cached.clear()
+    invalidate_allocation()
+
+
+def _hit_rate(name, **labels):
+    hits = metric_total(name, result="hit", **labels)
+    total = metric_total(name, **labels)
+    return f"{hits / total:.0%}" if total else "n/a"
+
+
+def _quantile_ms(name, q):
+    # Worst bucket bound across label sets (e.g. models or hosts).
+    metric = next((m for m in all_metrics() if m.name == name), None)
+    if metric is None:
+        return "n/a"
+    bounds = [metric.quantile(q, **labels) for labels, _ in metric.samples()]
+    bounds = [bound for bound in bounds if bound is not None]
+    if not bounds:
+        return "n/a"
+    if max(bounds) == float("inf"):
+        return f"> {metric.buckets[-1]:g} s"
+    return f"≤ {max(bounds) * 1000:.0f} ms"
+
+
+def _metrics_rows():
+    rows = []
+    for metric in all_metrics():
+        for labels, value in metric.samples():
+            if metric.kind == "histogram":
+                counts, total = value
+                value = f"{sum(counts)} obs, {round(total, 3)} s"
+            rows.append(
+                {
+                    "metric": metric.name,
+                    "type": metric.kind,
+                    "labels": ", ".join(f"{k}={v}" for k, v in labels.items()),
+                    "value": str(value),
+                }
+            )
+    return rows
+
+
 # ----------------------------
 # Sidebar controls
 # ----------------------------
 sidebar_watchlist = load_watchlist()
-sidebar_holdings_records = _normalize_holdings_records(load_holdings())
+sidebar_holdings_records = _normalize_holdings_records(load_holdings_portfolio())
 
 guardrail_mode = st.sidebar.selectbox(
     "Guardrail mode",
@@ -324,6 +416,7 @@ if st.sidebar.button("Add to Watchlist"):
         st.sidebar.warning("Enter a ticker first.")
     else:
         add_to_watchlist([ticker])
+        _invalidate_data_caches()
         st.sidebar.success(f"Added {ticker}")
         st.rerun()
 
@@ -334,6 +427,7 @@ if sidebar_watchlist:
     )
     if st.sidebar.button("Remove from Watchlist"):
         remove_from_watchlist(remove_watch_ticker)
+        _invalidate_data_caches()
         st.sidebar.success(f"Removed {remove_watch_ticker}")
         st.rerun()
 
@@ -349,10 +443,14 @@ if st.sidebar.button("Add Holding"):
     ticker = (add_h_ticker or "").upper().strip()
     if not ticker:
         st.sidebar.warning("Enter a holding ticker first.")
-    elif any(r["ticker"] == ticker for r in sidebar_holdings_records):
-        st.sidebar.warning(f"{ticker} already exists. Use edit below.")
+    elif ticker in load_portfolio():
+        # Adding to an existing position records a new lot in the ledger.
+        record_transaction(ticker, "buy", add_h_shares, add_h_price, add_h_date)
+        _invalidate_data_caches()
+        st.sidebar.success(f"Added {add_h_shares:g} shares of {ticker} as a new lot")
+        st.rerun()
     else:
-        sidebar_holdings_records.append(
+        upsert_holding(
             {
                 "ticker": ticker,
                 "shares": float(add_h_shares),
@@ -360,12 +458,13 @@ if st.sidebar.button("Add Holding"):
                 "buy_date": str(add_h_date),
             }
         )
-        save_holdings(sidebar_holdings_records)
+        _invalidate_data_caches()
         st.sidebar.success(f"Added holding {ticker}")
         st.rerun()
 
 if sidebar_holdings_records:
     st.sidebar.markdown("### Edit / Remove Holding")
+    st.sidebar.caption("Edits change the original lot; later buys and sales are kept in the ledger.")
     holding_options = [r["ticker"] for r in sidebar_holdings_records]
     selected_holding = st.sidebar.selectbox("Select holding", options=holding_options)
     selected_record = next((r for r in sidebar_holdings_records if r["ticker"] == selected_holding), None)
@@ -394,22 +493,80 @@ if sidebar_holdings_records:
         )
 
         if st.sidebar.button("Save Holding Edits"):
-            for record in sidebar_holdings_records:
-                if record["ticker"] == selected_holding:
-                    record["shares"] = float(edit_shares)
-                    record["buy_price"] = float(edit_price)
-                    record["buy_date"] = str(edit_date)
-                    break
-            save_holdings(sidebar_holdings_records)
+            upsert_holding(
+                {
+                    "ticker": selected_holding,
+                    "shares": float(edit_shares),
+                    "buy_price": float(edit_price),
+                    "buy_date": str(edit_date),
+                }
+            )
+            _invalidate_data_caches()
             st.sidebar.success(f"Updated {selected_holding}")
             st.rerun()
 
+        position = load_positions().get(selected_holding)
+        held_shares = float(position.shares) if position is not None else 0.0
+        sell_shares = st.sidebar.number_input(
+            "Sell shares",
+            min_value=0.0,
+            max_value=max(held_shares, 0.0),
+            value=0.0,
+            step=1.0,
+            key="sell_h_shares",
+        )
+        sell_price = st.sidebar.number_input(
+            "Sell price", min_value=0.0, value=0.0, step=0.01, format="%.2f", key="sell_h_price"
+        )
+        if st.sidebar.button("Record Sale"):
+            if sell_shares <= 0:
+                st.sidebar.warning("Enter the number of shares sold.")
+            else:
+                record_transaction(selected_holding, "sell", sell_shares, sell_price, date.today())
+                _invalidate_data_caches()
+                st.sidebar.success(f"Recorded sale of {sell_shares:g} {selected_holding} (FIFO)")
+                st.rerun()
+
         if st.sidebar.button("Remove Holding"):
-            updated = [r for r in sidebar_holdings_records if r["ticker"] != selected_holding]
-            save_holdings(updated)
+            remove_holding(selected_holding)
+            _invalidate_data_caches()
             st.sidebar.success(f"Removed {selected_holding}")
             st.rerun()
 
+st.sidebar.markdown("---")
+st.sidebar.subheader("Bulk Import / Export")
+
+import_file = st.sidebar.file_uploader("Broker CSV", type=["csv"])
+import_replace = st.sidebar.checkbox("Replace existing holdings", value=False)
+if import_file is not None and st.sidebar.button("Import Holdings"):
+    try:
+        result = import_holdings_csv(import_file, replace=import_replace)
+    except ValueError as exc:
+        st.sidebar.error(str(exc))
+    else:
+        _invalidate_data_caches()
+        st.sidebar.success(
+            f"Imported {result['imported']} lots ({len(result['tickers'])} tickers), "
+            f"skipped {result['rejected']} invalid rows"
+        )
+        st.rerun()
+
+if sidebar_holdings_records:
+    export_data, export_format = export_holdings_bytes()
+    st.sidebar.download_button(
+        "Export Holdings",
+        data=export_data,
+        file_name=f"holdings.{export_format}",
+        mime="application/octet-stream",
+    )
+
+st.sidebar.markdown("---")
+if st.sidebar.button("Clear Sentiment Cache", help="Force fresh AI sentiment on the next analysis run"):
+    clear_sentiment_cache()
+    # Watchlist insights embed sentiment; drop them so the next view re-runs it.
+    _cached_watchlist_insights.clear()
+    st.sidebar.success("Sentiment cache cleared")
+
 if "analysis_ctx" not in st.session_state:
     st.session_state.analysis_ctx = None
 if "recommendations" not in st.session_state:
@@ -420,12 +577,16 @@ if "recommendations" not in st.session_state:
 # Load base data
 # ----------------------------
 
-holdings = load_holdings()
+holdings = load_portfolio()
 watchlist = load_watchlist()
-rebalance = analyze_rebalance()
+# Positions depend on the ledger too, so it is part of the key.
+holdings_key = _content_key([load_holdings(), load_transactions(), load_income()])
+watchlist_key = _content_key(watchlist)
+
+rebalance = _cached_rebalance(holdings_key)
 
-holdings_df, total_cost, total_value, total_return = _portfolio_snapshot(holdings)
-allocation = calculate_allocation(holdings) if holdings else {}
+holdings_df, total_cost, total_value, total_return = _cached_portfolio_snapshot(holdings_key, holdings)
+allocation = _cached_allocation(holdings_key, holdings)
 
 
 # ----------------------------
@@ -443,8 +604,8 @@ k4.metric("Total Return %", f"{total_return}%")
 # Tabs
 # ----------------------------
 
-tab_overview, tab_signals, tab_recs, tab_capital = st.tabs(
-    ["Overview", "Signals", "Recommendations", "Capital Deployment"]
+tab_overview, tab_signals, tab_recs, tab_capital, tab_diagnostics = st.tabs(
+    ["Overview", "Signals", "Recommendations", "Capital Deployment", "Diagnostics"]
 )
 
 
@@ -459,14 +620,14 @@ with tab_overview:
             st.dataframe(holdings_df, use_container_width=True)
 
         st.subheader("Portfolio Summary (Text)")
-        st.code(portfolio_summary())
+        st.code(_cached_portfolio_summary(holdings_key))
 
     with c2:
         st.subheader("Watchlist")
         if not watchlist:
             st.info("Watchlist empty.")
         else:
-            watch_df = _watchlist_insights(watchlist)
+            watch_df = _cached_watchlist_insights(watchlist_key, watchlist)
             if watch_df.empty:
                 st.write(watchlist)
             else:
@@ -522,7 +683,7 @@ with tab_overview:
         st.altair_chart(alloc_chart, use_container_width=True)
 
     st.subheader("Portfolio Value Over Time")
-    history_df = _portfolio_value_history(holdings, period=period)
+    history_df = _cached_value_history(holdings_key, period, holdings)
     if history_df.empty:
         st.info("No price history available for chart.")
     else:
@@ -540,7 +701,7 @@ with tab_overview:
         st.altair_chart(line_chart, use_container_width=True)
 
     st.subheader("Holding Performance by Ticker")
-    perf_df = _ticker_performance_history(holdings, period=period)
+    perf_df = _cached_performance_history(holdings_key, period, holdings)
     if perf_df.empty:
         st.info("No ticker-level performance data available.")
     else:
@@ -699,3 +860,40 @@ with tab_capital:
         if decision.get("matrix_top"):
             st.markdown("### Matrix Top Candidates")
             st.dataframe(pd.DataFrame(decision.get("matrix_top", [])), use_container_width=True)
+
+
+with tab_diagnostics:
+    st.subheader("Diagnostics")
+    st.caption("Counters for this server process since start (or the last reset).")
+
+    d1, d2, d3, d4 = st.columns(4)
+    d1.metric("Quote cache hit rate", _hit_rate("portfolio_quote_cache_total"))
+    d2.metric("Sentiment cache hit rate", _hit_rate("portfolio_sentiment_cache_total"))
+    d3.metric("Storage cache hit rate", _hit_rate("portfolio_storage_reads_total"))
+    d4.metric("Allocation cache hit rate", _hit_rate("portfolio_allocation_cache_total"))
+
+    l1, l2, l3, l4 = st.columns(4)
+    l1.metric("LLM requests", int(metric_total("portfolio_llm_requests_total")))
+    l2.metric(
+        "LLM tokens (prompt / completion)",
+        f"{int(metric_total('portfolio_llm_tokens_total', type='prompt'))} / "
+        f"{int(metric_total('portfolio_llm_tokens_total', type='completion'))}",
+    )
+    l3.metric("LLM latency p50", _quantile_ms("portfolio_llm_seconds", 0.5))
+    l4.metric("LLM latency p95", _quantile_ms("portfolio_llm_seconds", 0.95))
+
+    f1, f2, f3, f4 = st.columns(4)
+    f1.metric("Market-data calls", int(metric_total("portfolio_fetch_calls_total")))
+    f2.metric("Unavailable", int(metric_total("portfolio_fetch_calls_total", status="unavailable")))
+    f3.metric("Retries", int(metric_total("portfolio_fetch_retries_total")))
+    f4.metric("Fetch latency p95", _quantile_ms("portfolio_fetch_seconds", 0.95))
+
+    if METRICS_PORT:
+        st.info(f"Prometheus endpoint: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+    with st.expander("All metrics"):
+        st.dataframe(pd.DataFrame(_metrics_rows()), use_container_width=True)
+
+    if st.button("Reset metrics"):
+        reset_metrics()
+        st.rerun()
@@ -0,0 +1,424 @@
+"""
+Portfolio Assistant — Benchmark Suite
+
+Times each pipeline stage on synthetic portfolios at several scales, with
+stand-in providers: seeded geometric-Brownian-motion price histories served
+by the replay market-data provider, and synthetic LLM answers from the
+replay transport. No network access or API key is needed.
+
+    python benchmark.py                                  # 10 .. 10,000 holdings
+    python benchmark.py --scales 10,100 --output bench.json
+
+Each scale runs in a fresh process with its own temporary data directory.
+Every stage is measured on a cold pass (empty caches) and on repeated warm
+passes; the JSON report gives calls, throughput, p50/p95 latency and peak
+traced memory per stage and phase, plus the worker's max RSS.
+
+Signals run like main.py: one analysis run, work items spread over
+SIGNAL_MAX_WORKERS threads by run_parallel. "signals" is that whole step
+(its throughput is what the CLI sees), "analyze_signal_item" the latency
+of one item inside it. "generate_decision" is timed in a separate run, so
+each call builds its own analysis bundle instead of hitting the memo.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SCALES = "10,100,1000,10000"
+HISTORY_DAYS = 260
+WATCHLIST_SHARE = 0.2
+CASH_TO_DEPLOY = 5000.0
+
+# Stages whose units are tickers; the rest count holdings.
+PER_TICKER_STAGES = ("prime_sentiment", "signals", "analyze_signal_item", "generate_decision")
+
+
+# ==============================
+# SYNTHETIC DATA
+# ==============================
+
+def synthetic_tickers(count, known=()):
+    """
+    count tickers: the known (classified) ones first, then SYN00000.TO, ...
+    """
+    tickers = list(known)[:count]
+    tickers += [f"SYN{i:05d}.TO" for i in range(count - len(tickers))]
+    return tickers
+
+
+def gbm_bars(count, days, rng):
+    """
+    Daily OHLCV arrays (count x days) from seeded geometric Brownian motion.
+    """
+    start = rng.uniform(10.0, 200.0, size=(count, 1))
+    drift = rng.normal(0.05, 0.10, size=(count, 1)) / 252
+    vol = rng.uniform(0.10, 0.40, size=(count, 1)) / np.sqrt(252)
+
+    log_returns = (drift - 0.5 * vol ** 2) + vol * rng.standard_normal((count, days))
+    close = start * np.exp(np.cumsum(log_returns, axis=1))
+
+    prev_close = np.concatenate([start, close[:, :-1]], axis=1)
+    open_ = prev_close * (1 + rng.normal(0.0, 0.002, size=(count, days)))
+    spread = np.abs(rng.normal(0.0, 0.01, size=(count, days)))
+
+    return {
+        "Open": open_,
+        "High": np.maximum(open_, close) * (1 + spread),
+        "Low": np.minimum(open_, close) * (1 - spread),
+        "Close": close,
+        "Volume": np.round(rng.lognormal(12.0, 1.0, size=(count, days))),
+    }
+
+
+def write_synthetic_data(data_dir, scale, seed, days=HISTORY_DAYS):
+    """
+    Write holdings.json, watchlist.json and one replay CSV per ticker.
+    Returns (holding tickers, watchlist tickers).
+    """
+    from agents.market_data import COLUMNS, replay_path
+    from agents.tickers import ASSET_CLASS_MAP
+    from config import HOLDINGS_FILE, REPLAY_DIR, WATCHLIST_FILE
+
+    rng = np.random.default_rng(seed)
+    watch_count = max(5, int(scale * WATCHLIST_SHARE))
+    tickers = synthetic_tickers(scale + watch_count, known=ASSET_CLASS_MAP)
+    holdings, watchlist = tickers[:scale], tickers[scale:]
+
+    bars = gbm_bars(len(tickers), days, rng)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    for i, ticker in enumerate(tickers):
+        frame = pd.DataFrame({col: bars[col][i] for col in COLUMNS}, index=dates)
+        frame.to_csv(replay_path(REPLAY_DIR, ticker), index_label="Date", float_format="%.4f")
+
+    # Each holding was bought on a random day of the synthetic history.
+    bought = rng.integers(0, days - 1, size=scale)
+    records = [
+        {
+            "ticker": ticker,
+            "shares": int(rng.integers(1, 500)),
+            "buy_price": round(float(bars["Close"][i, bought[i]]), 2),
+            "buy_date": dates[bought[i]].strftime("%Y-%m-%d"),
+        }
+        for i, ticker in enumerate(holdings)
+    ]
+
+    os.makedirs(os.path.dirname(HOLDINGS_FILE), exist_ok=True)
+    with open(HOLDINGS_FILE, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+    with open(WATCHLIST_FILE, "w", encoding="utf-8") as f:
+        json.dump({"watchlist": watchlist}, f)
+
+    return holdings, watchlist
+
+
+# ==============================
+# MEASUREMENT
+# ==============================
+
+class StageTimer:
+    """
+    Collects per-call latencies (and, when tracing, the largest traced
+    allocation of a single call) per stage. Safe to call from worker
+    threads; traced memory is only recorded for calls made with peak=True,
+    since tracemalloc peaks are process-wide.
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.units = {}
+        self.peaks = {}
+        self.tracing = False
+        self._lock = threading.Lock()
+
+    def time(self, stage, units, func, *args, peak=True):
+        peak = peak and self.tracing
+        if peak:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.latencies.setdefault(stage, []).append(elapsed)
+            self.units[stage] = self.units.get(stage, 0) + units
+            if peak:
+                used = tracemalloc.get_traced_memory()[1] - base
+                self.peaks[stage] = max(self.peaks.get(stage, 0), used)
+        return result
+
+    def report(self, phase):
+        rows = []
+        for stage, latencies in self.latencies.items():
+            seconds = np.asarray(latencies)
+            total = float(seconds.sum())
+            rows.append(
+                {
+                    "stage": stage,
+                    "phase": phase,
+                    "calls": len(latencies),
+                    "unit": "tickers" if stage in PER_TICKER_STAGES else "holdings",
+                    "throughput_per_s": round(self.units[stage] / total, 2) if total > 0 else None,
+                    "total_s": round(total, 4),
+                    "p50_ms": round(float(np.percentile(seconds, 50)) * 1000, 3),
+                    "p95_ms": round(float(np.percentile(seconds, 95)) * 1000, 3),
+                    "max_ms": round(float(seconds.max()) * 1000, 3),
+                    "peak_mem_mb": (
+                        round(self.peaks[stage] / 2 ** 20, 3) if stage in self.peaks else None
+                    ),
+                }
+            )
+        return rows
+
+
+def _max_rss_mb():
+    import resource
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return round(rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10, 1)
+
+
+def run_pipeline_pass(timer, holdings, watchlist, recommendations):
+    """
+    One daily run: the same stages, order, analysis scope and signal
+    concurrency as main.py.
+    """
+    from agents.analysis_agent import analysis_run, analyze_signal_item, prime_signal_items, run_parallel
+    from agents.capital_agent import deploy_capital
+    from agents.data_loader import load_portfolio, load_watchlist
+    from agents.decision_agent import generate_decision
+    from agents.guardrail_agent import apply_target_guardrails
+    from agents.portfolio_summary_agent import portfolio_summary
+    from agents.rebalance_agent import analyze_rebalance
+    from config import SIGNAL_MAX_WORKERS
+
+    size = len(holdings)
+    timer.time("portfolio_summary", size, portfolio_summary)
+
+    def timed_item(item):
+        return timer.time("analyze_signal_item", 1, analyze_signal_item, item, peak=False)
+
+    def timed_decision(ticker):
+        return timer.time("generate_decision", 1, generate_decision, ticker, peak=False)
+
+    with analysis_run():
+        work = [("holding", t) for t in holdings] + [("watch", t) for t in watchlist]
+        timer.time("prime_sentiment", len(work), prime_signal_items, work)
+        analyzed = timer.time(
+            "signals", len(work), run_parallel, timed_item, work, SIGNAL_MAX_WORKERS
+        )
+
+    decisions = {t: decision["decision"] for t, (_, decision) in zip(holdings, analyzed)}
+    watch_results = {
+        t: {"result": result, "decision": decision}
+        for t, (result, decision) in zip(watchlist, analyzed[size:])
+    }
+
+    # Standalone decision cost: a fresh run, so each call builds its bundle.
+    with analysis_run():
+        run_parallel(timed_decision, holdings, SIGNAL_MAX_WORKERS)
+
+    rebalance = timer.time("analyze_rebalance", size, analyze_rebalance)
+    timer.time(
+        "apply_target_guardrails", size, apply_target_guardrails, recommendations, load_portfolio(), "strict"
+    )
+    timer.time(
+        "deploy_capital",
+        size,
+        deploy_capital,
+        CASH_TO_DEPLOY,
+        rebalance,
+        recommendations,
+        list(load_watchlist()),
+        decisions,
+        watch_results,
+    )
+
+
+def run_scale(scale, repeats, seed, memory=True):
+    """
+    Benchmark one scale in this process (expects the stand-in environment).
+    """
+    from agents.recommendation_agent import recommend_portfolio
+
+    start = time.perf_counter()
+    holdings, watchlist = write_synthetic_data(os.environ["PORTFOLIO_DATA_DIR"], scale, seed)
+    recommendations = recommend_portfolio(
+        {t: "existing position" for t in holdings[:50]},
+        {"risk": "conservative to moderate"},
+        "small (<5k)",
+    )
+    setup_seconds = time.perf_counter() - start
+
+    stages = []
+    cold = StageTimer()
+    run_pipeline_pass(cold, holdings, watchlist, recommendations)
+    stages += cold.report("cold")
+
+    warm = StageTimer()
+    for _ in range(repeats):
+        run_pipeline_pass(warm, holdings, watchlist, recommendations)
+
+    if memory:
+        # One extra traced pass: tracemalloc slows calls, so it is not timed.
+        traced = StageTimer()
+        traced.tracing = True
+        tracemalloc.start()
+        try:
+            run_pipeline_pass(traced, holdings, watchlist, recommendations)
+        finally:
+            tracemalloc.stop()
+        warm.peaks = traced.peaks
+
+    stages += warm.report("warm")
+
+    return {
+        "holdings": scale,
+        "watchlist": len(watchlist),
+        "setup_s": round(setup_seconds, 3),
+        "max_rss_mb": _max_rss_mb(),
+        "stages": stages,
+    }
+
+
+# ==============================
+# DRIVER
+# ==============================
+
+def _git_revision():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def _worker_env(data_dir, args):
+    env = dict(os.environ)
+    env.update(
+        {
+            "PORTFOLIO_DATA_DIR": data_dir,
+            "PORTFOLIO_STORAGE": "sqlite",
+            "PORTFOLIO_MARKET_DATA": "replay",
+            "PORTFOLIO_FETCH_RATE": str(args.fetch_rate),
+            "PORTFOLIO_REPLAY_LATENCY_MS": str(args.fetch_latency_ms),
+            "PORTFOLIO_REPLAY_FAILURE_RATE": str(args.fetch_failure_rate),
+            "PORTFOLIO_REPLAY_SEED": str(args.seed),
+            "PORTFOLIO_LLM_MODE": "replay",
+            "PORTFOLIO_LLM_REPLAY_SYNTHETIC": "1",
+            "PORTFOLIO_LLM_REPLAY_LATENCY_MS": str(args.llm_latency_ms),
+        }
+    )
+    return env
+
+
+def run_benchmarks(args):
+    scales = [int(s) for s in str(args.scales).split(",") if s.strip()]
+    results = []
+
+    for scale in scales:
+        with tempfile.TemporaryDirectory(prefix=f"portfolio-bench-{scale}-") as data_dir:
+            result_file = os.path.join(data_dir, "result.json")
+            command = [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--worker",
+                str(scale),
+                "--result-file",
+                result_file,
+                "--repeats",
+                str(args.repeats),
+                "--seed",
+                str(args.seed),
+            ]
+            if args.no_memory:
+                command.append("--no-memory")
+
+            print(f"Benchmarking {scale} holdings...", file=sys.stderr)
+            proc = subprocess.run(
+                command, cwd=BASE_DIR, env=_worker_env(data_dir, args), stdout=subprocess.DEVNULL
+            )
+            if proc.returncode != 0:
+                raise SystemExit(f"Benchmark worker for {scale} holdings failed ({proc.returncode}).")
+
+            with open(result_file, "r", encoding="utf-8") as f:
+                results.append(json.load(f))
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "seed": args.seed,
+        "repeats": args.repeats,
+        "fetch_rate": args.fetch_rate,
+        "fetch_latency_ms": args.fetch_latency_ms,
+        "fetch_failure_rate": args.fetch_failure_rate,
+        "llm_latency_ms": args.llm_latency_ms,
+        "scales": results,
+    }
+
+
+def format_table(report):
+    lines = [f"{'holdings':>8}  {'stage':<24}{'phase':<6}{'p50 ms':>10}{'p95 ms':>10}{'per s':>12}{'peak MB':>9}"]
+    for scale in report["scales"]:
+        for row in scale["stages"]:
+            peak = "" if row["peak_mem_mb"] is None else f"{row['peak_mem_mb']:.2f}"
+            lines.append(
+                f"{scale['holdings']:>8}  {row['stage']:<24}{row['phase']:<6}"
+                f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['throughput_per_s'] or 0:>12.1f}{peak:>9}"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the portfolio pipeline on synthetic data")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma-separated holdings counts")
+    parser.add_argument("--repeats", type=int, default=3, help="warm passes per scale")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fetch-rate", type=float, default=0.0, help="market-data calls per second (0 = unlimited)")
+    parser.add_argument("--fetch-latency-ms", type=float, default=0.0, help="replayed market-data latency")
+    parser.add_argument("--fetch-failure-rate", type=float, default=0.0, help="share of failing market-data calls")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="replayed LLM latency")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced memory pass")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        result = run_scale(args.worker, args.repeats, args.seed, memory=not args.no_memory)
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    report = run_benchmarks(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(format_table(report))
+        print(f"\nReport written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,22 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ENV_FILE = os.path.join(BASE_DIR, ".env")
 
-DATA_DIR = os.path.join(BASE_DIR, "data")
+# PORTFOLIO_DATA_DIR relocates all data files and caches (e.g. for benchmarks).
+DATA_DIR = os.environ.get("PORTFOLIO_DATA_DIR") or os.path.join(BASE_DIR, "data")
 
 HOLDINGS_FILE = os.path.join(DATA_DIR, "holdings.json")
 WATCHLIST_FILE = os.path.join(DATA_DIR, "watchlist.json")
+INCOME_FILE = os.path.join(DATA_DIR, "income.json")
+TRANSACTIONS_FILE = os.path.join(DATA_DIR, "transactions.json")
+
+# SQLite storage backend (seeded once from the JSON files above).
+PORTFOLIO_DB_FILE = os.path.join(DATA_DIR, "portfolio.sqlite")
+
+# Local caches (safe to delete; rebuilt on demand).
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+HISTORY_DIR = os.path.join(CACHE_DIR, "history")
+SENTIMENT_CACHE_FILE = os.path.join(CACHE_DIR, "sentiment.sqlite")
+INDICATOR_STATE_FILE = os.path.join(CACHE_DIR, "indicators.sqlite")
 
 
 def load_env_file(path=ENV_FILE):
@@ -69,3 +81,108 @@ def assert_openai_api_key():
             f"Update {ENV_FILE} with a real key from platform.openai.com."
         )
     return key
+
+
+def llm_key_required():
+    """
+    False in LLM replay mode, which serves recorded responses without a key.
+    """
+    return LLM_MODE != "replay"
+
+
+def env_setting(name, default=None):
+    """
+    Read a tuning setting from the environment, then local .env fallback.
+    """
+    load_env_file()
+    return os.environ.get(name, default)
+
+
+# ==============================
+# TUNING
+# ==============================
+
+# Seconds before the latest stored daily bar is re-checked for new data.
+HISTORY_REFRESH_SECONDS = int(env_setting("PORTFOLIO_HISTORY_REFRESH_SECONDS", "900"))
+
+# Max tickers analyzed concurrently by the daily signal engine (1 = sequential).
+SIGNAL_MAX_WORKERS = int(env_setting("PORTFOLIO_SIGNAL_WORKERS", "8"))
+
+# Sentiment cache: entry lifetime, LRU size bound, and global on/off switch.
+SENTIMENT_CACHE_TTL_SECONDS = int(env_setting("PORTFOLIO_SENTIMENT_CACHE_TTL", "86400"))
+SENTIMENT_CACHE_MAX_ENTRIES = int(env_setting("PORTFOLIO_SENTIMENT_CACHE_MAX", "5000"))
+SENTIMENT_CACHE_ENABLED = env_setting("PORTFOLIO_SENTIMENT_CACHE", "1") != "0"
+
+# Tickers per batched sentiment request (1 = one request per ticker).
+SENTIMENT_BATCH_SIZE = int(env_setting("PORTFOLIO_SENTIMENT_BATCH_SIZE", "20"))
+
+# Shared LLM client: optional OpenAI-compatible endpoint, in-flight cap,
+# retries on transient errors and per-request timeout.
+LLM_BASE_URL = env_setting("OPENAI_BASE_URL") or None
+LLM_MAX_CONCURRENCY = int(env_setting("PORTFOLIO_LLM_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(env_setting("PORTFOLIO_LLM_MAX_RETRIES", "4"))
+LLM_TIMEOUT_SECONDS = float(env_setting("PORTFOLIO_LLM_TIMEOUT", "60"))
+
+# Dashboard cache lifetimes (seconds), aligned with how often the data moves.
+DASHBOARD_QUOTE_TTL_SECONDS = int(env_setting("PORTFOLIO_DASHBOARD_QUOTE_TTL", "300"))
+DASHBOARD_HISTORY_TTL_SECONDS = int(env_setting("PORTFOLIO_DASHBOARD_HISTORY_TTL", "3600"))
+DASHBOARD_SIGNAL_TTL_SECONDS = int(env_setting("PORTFOLIO_DASHBOARD_SIGNAL_TTL", "1800"))
+
+# Seconds a shared allocation snapshot (weights/drift) is reused for the same holdings.
+ALLOCATION_CACHE_TTL_SECONDS = int(env_setting("PORTFOLIO_ALLOCATION_TTL", "300"))
+
+# Storage backend for holdings, watchlist and income: "json" or "sqlite".
+# sqlite imports the JSON files once; later JSON edits are not read.
+STORAGE_BACKEND = (env_setting("PORTFOLIO_STORAGE", "json") or "json").lower().strip()
+
+# JSON backend: journal entries appended before they are compacted into the snapshot.
+JOURNAL_COMPACT_EVERY = int(env_setting("PORTFOLIO_JOURNAL_COMPACT", "200"))
+
+# Rows parsed per chunk when importing broker CSVs. Only the raw text of one
+# chunk is held at a time; the validated rows are still saved in one write.
+IMPORT_CHUNK_ROWS = int(env_setting("PORTFOLIO_IMPORT_CHUNK_ROWS", "50000"))
+
+# Seconds a quote is reused while TSX/NYSE are open (closed: until the next open).
+QUOTE_TTL_SECONDS = int(env_setting("PORTFOLIO_QUOTE_TTL", "60"))
+
+# Market-data fetch guard: per-host request rate, burst size and retries on
+# transient errors; the circuit breaker opens after this many consecutive
+# failures and lets one trial call through after the reset period.
+FETCH_RATE_PER_SECOND = float(env_setting("PORTFOLIO_FETCH_RATE", "5"))
+FETCH_BURST = int(env_setting("PORTFOLIO_FETCH_BURST", "10"))
+FETCH_MAX_RETRIES = int(env_setting("PORTFOLIO_FETCH_RETRIES", "3"))
+FETCH_BREAKER_FAILURES = int(env_setting("PORTFOLIO_FETCH_BREAKER_FAILURES", "5"))
+FETCH_BREAKER_RESET_SECONDS = float(env_setting("PORTFOLIO_FETCH_BREAKER_RESET", "60"))
+
+# Market-data provider: "yfinance" (live) or "replay" (bars recorded as CSV
+# files in REPLAY_DIR, for offline runs and reproducible benchmarks).
+MARKET_DATA_PROVIDER = (env_setting("PORTFOLIO_MARKET_DATA", "yfinance") or "yfinance").lower().strip()
+REPLAY_DIR = env_setting("PORTFOLIO_REPLAY_DIR", os.path.join(DATA_DIR, "replay"))
+
+# Replay fault injection: latency added to every call, share of calls that
+# fail (seeded for repeatable runs), and whether recorded bars are shifted
+# by whole weeks so the last one falls in the current week.
+REPLAY_LATENCY_MS = float(env_setting("PORTFOLIO_REPLAY_LATENCY_MS", "0"))
+REPLAY_FAILURE_RATE = float(env_setting("PORTFOLIO_REPLAY_FAILURE_RATE", "0"))
+REPLAY_SEED = env_setting("PORTFOLIO_REPLAY_SEED", "0")
+REPLAY_ALIGN = env_setting("PORTFOLIO_REPLAY_ALIGN", "1") != "0"
+
+# LLM transport: "live" calls the API, "record" also saves each response
+# keyed by a hash of the request, "replay" serves the saved responses
+# without network access or an API key.
+LLM_MODE = (env_setting("PORTFOLIO_LLM_MODE", "live") or "live").lower().strip()
+LLM_RECORDINGS_FILE = env_setting("PORTFOLIO_LLM_RECORDINGS", os.path.join(DATA_DIR, "llm_recordings.sqlite"))
+
+# Replay: simulated latency per response, and whether requests that were
+# never recorded get a synthetic stand-in answer instead of an error.
+LLM_REPLAY_LATENCY_MS = float(env_setting("PORTFOLIO_LLM_REPLAY_LATENCY_MS", "0"))
+LLM_REPLAY_SYNTHETIC = env_setting("PORTFOLIO_LLM_REPLAY_SYNTHETIC", "0") == "1"
+
+# Tracing: record per-stage spans and, at the end of a CLI run, print a
+# stage summary and write a Chrome trace to TRACE_FILE.
+TRACE_ENABLED = env_setting("PORTFOLIO_TRACE", "0") == "1"
+TRACE_FILE = env_setting("PORTFOLIO_TRACE_FILE", os.path.join(CACHE_DIR, "trace.json"))
+
+# Prometheus metrics endpoint for the dashboard (0 = disabled), e.g. 9464.
+METRICS_PORT = int(env_setting("PORTFOLIO_METRICS_PORT", "0"))
+METRICS_HOST = env_setting("PORTFOLIO_METRICS_HOST", "127.0.0.1")
@@ -10,21 +10,29 @@ Daily flow:
 """
 from datetime import date
 
-from agents.signal_agent import generate_signal
-from agents.data_loader import load_holdings, load_watchlist, save_holdings
+from agents.analysis_agent import analysis_run, analyze_signal_item, prime_signal_items, run_parallel
+from agents.data_loader import load_holdings_portfolio, load_portfolio, load_watchlist, save_holdings
+from agents.portfolio import Holding
 from agents.watchlist_agent import add_to_watchlist
 from agents.recommendation_agent import recommend_portfolio
 from agents.guardrail_agent import apply_target_guardrails
 from agents.allocation_agent import analyze_portfolio_allocation
-from agents.decision_agent import generate_decision
-from agents.decision_agent import generate_watch_decision
 from agents.rebalance_agent import analyze_rebalance
 from agents.capital_agent import deploy_capital
-from agents.price_agent import get_price
+from agents.price_agent import get_prices
 from agents.portfolio_summary_agent import portfolio_summary
-from config import assert_openai_api_key
+from agents.sentiment_agent import parse_sentiment
+from agents.tracing import export_chrome_trace, format_stage_summary, span, traced, tracing_enabled
+from config import assert_openai_api_key, llm_key_required, TRACE_FILE
 
 
+def _ask(prompt):
+    # Time spent waiting on the user is its own stage in traces.
+    with span("input", stage="input"):
+        return input(prompt)
+
+
+@traced("format")
 def _format_technical(technical):
     if not isinstance(technical, dict):
         return str(technical)
@@ -39,6 +47,7 @@ def _format_technical(technical):
     )
 
 
+@traced("format")
 def _format_fundamental(fundamental):
     if not isinstance(fundamental, dict):
         return str(fundamental)
@@ -50,37 +59,13 @@ def _format_fundamental(fundamental):
     )
 
 
-def _parse_sentiment(sentiment):
-    text = str(sentiment).strip()
-    if not text:
-        return "N/A", "N/A", ""
-
-    mood = "N/A"
-    confidence = "N/A"
-    reasoning = ""
-
-    for line in text.splitlines():
-        clean = line.strip()
-        lower = clean.lower()
-        if lower.startswith("sentiment:"):
-            mood = clean.split(":", 1)[1].strip()
-        elif lower.startswith("confidence:"):
-            confidence = clean.split(":", 1)[1].strip()
-        elif lower.startswith("reasoning:"):
-            reasoning = clean.split(":", 1)[1].strip()
-
-    if mood == "N/A" and "\n" not in text:
-        mood = text
-
-    return mood, confidence, reasoning
-
-
 def _pct(value):
     if value is None:
         return "N/A"
     return f"{round(value * 100, 1)}%"
 
 
+@traced("format")
 def _format_rebalance(rebalance):
     if not isinstance(rebalance, dict):
         return str(rebalance)
@@ -98,6 +83,13 @@ def _format_rebalance(rebalance):
     for asset, value in drift.items():
         lines.append(f"- {asset}: {_pct(value)}")
 
+    dollar_gaps = rebalance.get("dollar_gaps", {})
+    if dollar_gaps:
+        lines.append("")
+        lines.append(f"Dollar gap to target (portfolio value {rebalance.get('total_value', 0)}):")
+        for asset, value in dollar_gaps.items():
+            lines.append(f"- {asset}: {value:+.2f}")
+
     actions = rebalance.get("actions", [])
     lines.append("")
     lines.append("Actions:")
@@ -111,19 +103,12 @@ def _format_rebalance(rebalance):
 
 
 def _build_current_holdings_context():
-    holdings = load_holdings()
     context = {}
-    for item in holdings:
-        if isinstance(item, dict):
-            ticker = str(item.get("ticker", "")).upper().strip()
-            shares = item.get("shares", 0)
-            buy_price = item.get("buy_price", 0)
-            if ticker:
-                context[ticker] = f"shares={shares}, avg_cost={buy_price}"
+    for holding in load_portfolio():
+        if holding.legacy:
+            context[holding.ticker] = "existing position"
         else:
-            ticker = str(item).upper().strip()
-            if ticker:
-                context[ticker] = "existing position"
+            context[holding.ticker] = f"shares={holding.shares:g}, avg_cost={holding.buy_price:g}"
     return context
 
 
@@ -152,7 +137,7 @@ def _run_watchlist_detail_prompt(watchlist_results):
     if not normalized:
         return
 
-    answer = input(
+    answer = _ask(
         "\nDo you want detailed analysis for any watchlist stock/ETF? (y/n): "
     ).strip().lower()
 
@@ -160,7 +145,7 @@ def _run_watchlist_detail_prompt(watchlist_results):
         return
 
     print("Watchlist tickers:", ", ".join(normalized))
-    selected = input("Enter ticker (example: BCE.TO): ").strip().upper()
+    selected = _ask("Enter ticker (example: BCE.TO): ").strip().upper()
 
     resolved = _resolve_watchlist_key(selected, set(normalized))
     if not resolved:
@@ -169,7 +154,7 @@ def _run_watchlist_detail_prompt(watchlist_results):
 
     detail = watchlist_results[resolved]["result"]
     decision = watchlist_results[resolved]["decision"]
-    sentiment_value, sentiment_confidence, sentiment_reasoning = _parse_sentiment(
+    sentiment_value, sentiment_confidence, sentiment_reasoning = parse_sentiment(
         detail.get("sentiment", "N/A")
     )
 
@@ -185,7 +170,7 @@ def _run_watchlist_detail_prompt(watchlist_results):
 
 
 def _choose_guardrail_mode_cli():
-    raw = input(
+    raw = _ask(
         "\nSelect guardrail mode [strict/balanced/off] (default: strict): "
     ).strip().lower()
     if raw in {"strict", "balanced", "off"}:
@@ -197,27 +182,38 @@ def _choose_guardrail_mode_cli():
 # DAILY SIGNAL ENGINE
 # ==============================
 
-def run_daily_signals():
+@traced("main")
+@analysis_run()
+def run_daily_signals(max_workers=None):
 
     print("\n📊 Running daily portfolio signals...\n")
 
-    holdings = load_holdings()
+    holdings = load_portfolio()
     watchlist = load_watchlist()
     holdings_decisions = {}
 
+    holding_tickers = holdings.tickers()
+    watch_tickers = [
+        (item["ticker"] if isinstance(item, dict) else item).upper().strip()
+        for item in watchlist
+    ]
+
+    # Batch the run's sentiment calls, then analyze concurrently in input order.
+    work = [("holding", t) for t in holding_tickers] + [("watch", t) for t in watch_tickers]
+    prime_signal_items(work)
+    analyzed = run_parallel(analyze_signal_item, work, max_workers=max_workers)
+    holding_analyses = analyzed[:len(holding_tickers)]
+    watch_analyses = analyzed[len(holding_tickers):]
+
     # ---- HOLDINGS ----
     print("------ CURRENT HOLDINGS ------")
 
     if not holdings:
         print("No holdings found.\n")
     else:
-        for item in holdings:
+        for ticker, (result, decision) in zip(holding_tickers, holding_analyses):
 
-            # support both old + new formats
-            ticker = item["ticker"] if isinstance(item, dict) else item
-
-            result = generate_signal(ticker)
-            sentiment_value, sentiment_confidence, sentiment_reasoning = _parse_sentiment(
+            sentiment_value, sentiment_confidence, sentiment_reasoning = parse_sentiment(
                 result["sentiment"]
             )
 
@@ -229,8 +225,7 @@ def run_daily_signals():
             if sentiment_reasoning:
                 print("Sentiment reason:", sentiment_reasoning)
 
-            # 2️⃣ run decision engine
-            decision = generate_decision(ticker)
+            # 2️⃣ decision engine result
             holdings_decisions[ticker.upper().strip()] = decision["decision"]
 
             print("Position Decision (holding):", decision["decision"])
@@ -243,19 +238,13 @@ def run_daily_signals():
     if not watchlist:
         print("Watchlist empty.\n")
     else:
-        for item in watchlist:
-
-            ticker = item["ticker"] if isinstance(item, dict) else item
-
-            ticker = ticker.upper().strip()
-            result = generate_signal(ticker)
+        for ticker, (result, decision) in zip(watch_tickers, watch_analyses):
 
-            decision = generate_watch_decision(ticker, result)
             watchlist_results[ticker] = {
                 "result": result,
                 "decision": decision,
             }
-            sentiment_value, _, _ = _parse_sentiment(result.get("sentiment", "N/A"))
+            sentiment_value, _, _ = parse_sentiment(result.get("sentiment", "N/A"))
 
             print(f"\n{ticker}")
             print("Trend:", result.get("trend", "N/A"))
@@ -274,9 +263,10 @@ def run_daily_signals():
 # RECOMMENDATION MODE
 # ==============================
 
+@traced("main")
 def run_recommendation_if_requested():
 
-    choice = input("\n🧠 Do you want new ETF/stock recommendations today? (y/n): ").lower()
+    choice = _ask("\n🧠 Do you want new ETF/stock recommendations today? (y/n): ").lower()
 
     if choice != "y":
         print("Skipping recommendations today.\n")
@@ -302,7 +292,7 @@ def run_recommendation_if_requested():
     guardrail_mode = _choose_guardrail_mode_cli()
     recommendations = apply_target_guardrails(
         recommendations,
-        load_holdings(),
+        load_portfolio(),
         mode=guardrail_mode,
     )
 
@@ -339,14 +329,10 @@ def run_recommendation_if_requested():
     # --------------------------
 
     approved_watchlist = []
-    existing_holdings = load_holdings()
+    existing_holdings = load_portfolio()
     existing_watchlist = load_watchlist()
 
-    holdings_set = set()
-    for item in existing_holdings:
-        ticker = item.get("ticker") if isinstance(item, dict) else item
-        if ticker:
-            holdings_set.add(str(ticker).upper().strip())
+    holdings_set = set(existing_holdings.tickers())
 
     watchlist_set = set()
     for item in existing_watchlist:
@@ -371,7 +357,7 @@ def run_recommendation_if_requested():
             print(f"Skip {ticker}: already in watchlist.")
             continue
 
-        choice = input(f"Add {ticker} to watchlist? (y/n): ").lower()
+        choice = _ask(f"Add {ticker} to watchlist? (y/n): ").lower()
         if choice == "y":
             approved_watchlist.append(ticker)
 
@@ -384,7 +370,7 @@ def run_recommendation_if_requested():
     print("\n📈 Add recommendations to HOLDINGS")
 
     for ticker in approved_watchlist:
-        choice = input(f"Buy and add {ticker} to holdings now? (y/n): ").lower()
+        choice = _ask(f"Buy and add {ticker} to holdings now? (y/n): ").lower()
         if choice == "y":
             approved_holdings.append(ticker)
 
@@ -397,54 +383,41 @@ def run_recommendation_if_requested():
         print("\n✅ Watchlist updated:", updated_watchlist)
 
     if approved_holdings:
-        existing_holdings = load_holdings()
-        normalized_existing = []
-        existing_tickers = set()
-
-        for item in existing_holdings:
-            if isinstance(item, dict):
-                ticker = str(item.get("ticker", "")).upper().strip()
-                if ticker:
-                    existing_tickers.add(ticker)
-                normalized_existing.append(item)
-            else:
-                ticker = str(item).upper().strip()
-                if ticker:
-                    existing_tickers.add(ticker)
-                    normalized_existing.append({
-                        "ticker": ticker,
-                        "shares": 1,
-                        "buy_price": get_price(ticker) or 0,
-                        "buy_date": str(date.today()),
-                    })
+        # Re-save the holdings rows themselves, not ledger-derived positions.
+        existing_holdings = load_holdings_portfolio()
+        today = date.today()
+
+        # One bulk quote for legacy bare-ticker rows plus the new buys.
+        legacy_tickers = [h.ticker for h in existing_holdings if h.legacy]
+        prices = get_prices(legacy_tickers + approved_holdings)
+
+        normalized_existing = [
+            Holding(h.ticker, 1.0, prices.get(h.ticker) or 0.0, today) if h.legacy else h
+            for h in existing_holdings
+        ]
 
         new_positions = []
         for ticker in approved_holdings:
             ticker = str(ticker).upper().strip()
-            if ticker in existing_tickers:
+            if ticker in existing_holdings:
                 continue
-            new_positions.append({
-                "ticker": ticker,
-                "shares": 1,
-                "buy_price": get_price(ticker) or 0,
-                "buy_date": str(date.today()),
-            })
-
-        updated = normalized_existing + new_positions
-        save_holdings(updated)
-        print("📈 Holdings updated:", [p["ticker"] for p in new_positions] or "No new tickers added.")
+            new_positions.append(Holding(ticker, 1.0, prices.get(ticker) or 0.0, today))
+
+        save_holdings(normalized_existing + new_positions)
+        print("📈 Holdings updated:", [p.ticker for p in new_positions] or "No new tickers added.")
     return recommendations
 
 # ==============================
 # CAPITAL EXECUTION LAYER
 # ==============================
 
+@traced("main")
 def run_capital_deployment(rebalance, recommendations, signals_context=None):
 
     print("\n💰 CAPITAL DEPLOYMENT")
 
     try:
-        available_cash = float(input("Enter available cash to deploy: "))
+        available_cash = float(_ask("Enter available cash to deploy: "))
     except:
         print("Invalid input — skipping capital deployment.")
         return
@@ -488,29 +461,36 @@ from agents.rebalance_agent import analyze_rebalance
 
 def run_portfolio_assistant():
     try:
-        assert_openai_api_key()
+        if llm_key_required():
+            assert_openai_api_key()
     except RuntimeError as e:
         print(f"\n❌ Startup check failed: {e}\n")
         return
 
-    # 0️⃣ Portfolio snapshot FIRST
-    print(portfolio_summary())
+    try:
+        with span("run_portfolio_assistant", stage="main"):
+            # 0️⃣ Portfolio snapshot FIRST
+            print(portfolio_summary())
 
-    # 1️⃣ Daily signals
-    signals_context = run_daily_signals()
+            # 1️⃣ Daily signals
+            signals_context = run_daily_signals()
 
-    # 2️⃣ Portfolio structure health
-    print(analyze_portfolio_allocation())
+            # 2️⃣ Portfolio structure health
+            print(analyze_portfolio_allocation())
 
-    # 3️⃣ Rebalance intelligence
-    rebalance = analyze_rebalance()
-    print(_format_rebalance(rebalance))
+            # 3️⃣ Rebalance intelligence
+            rebalance = analyze_rebalance()
+            print(_format_rebalance(rebalance))
 
-    # 4️⃣ Generate recommendations
-    recommendations = run_recommendation_if_requested()
+            # 4️⃣ Generate recommendations
+            recommendations = run_recommendation_if_requested()
 
-    # 5️⃣ Capital deployment LAST
-    run_capital_deployment(rebalance, recommendations, signals_context)
+            # 5️⃣ Capital deployment LAST
+            run_capital_deployment(rebalance, recommendations, signals_context)
+    finally:
+        if tracing_enabled():
+            print("\n" + format_stage_summary())
+            print(f"\nTrace written to {export_chrome_trace(TRACE_FILE)} (open in chrome://tracing or Perfetto)")
 
 
 if __name__ == "__main__":
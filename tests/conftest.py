@@ -0,0 +1,13 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# Keep caches and state files written by the agents out of the real data
+# directory; config reads this once at import.
+if "PORTFOLIO_DATA_DIR" not in os.environ:
+    os.environ["PORTFOLIO_DATA_DIR"] = tempfile.mkdtemp(prefix="portfolio-tests-")
+    atexit.register(shutil.rmtree, os.environ["PORTFOLIO_DATA_DIR"], ignore_errors=True)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator
+from ta.trend import MACD
+
+from agents.indicator_engine import (
+    clear_indicator_state,
+    compute_state,
+    get_indicators,
+    MACD_FAST,
+    MACD_SIGNAL,
+    MACD_SLOW,
+    RSI_WINDOW,
+)
+
+# Same series as ta over the same bars: equal up to float rounding.
+EXACT = 1e-9
+
+# Rolling window vs. the engine's full history (ta restarts its averages
+# at the window start); the tolerance documented in the engine.
+RSI_WINDOW_TOLERANCE = 0.01
+MACD_WINDOW_TOLERANCE = 1e-3
+
+
+def _closes(n=400, seed=7):
+    rng = np.random.default_rng(seed)
+    prices = 50 * np.exp(np.cumsum(rng.normal(0.0004, 0.015, n)))
+    index = pd.bdate_range("2023-01-02", periods=n, name="Date")
+    return pd.Series(prices.round(2), index=index)
+
+
+def _ta(close):
+    rsi = RSIIndicator(close, window=RSI_WINDOW).rsi().iloc[-1]
+    macd = MACD(close, window_slow=MACD_SLOW, window_fast=MACD_FAST, window_sign=MACD_SIGNAL)
+    return {"rsi": rsi, "macd": macd.macd().iloc[-1], "macd_signal": macd.macd_signal().iloc[-1]}
+
+
+def _assert_close(values, expected, rsi_tol, macd_tol):
+    assert values["rsi"] == pytest.approx(expected["rsi"], abs=rsi_tol)
+    assert values["macd"] == pytest.approx(expected["macd"], abs=macd_tol)
+    assert values["macd_signal"] == pytest.approx(expected["macd_signal"], abs=macd_tol)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state():
+    clear_indicator_state()
+    yield
+    clear_indicator_state()
+
+
+@pytest.mark.parametrize("n", [60, 150, 400])
+def test_full_rebuild_matches_ta(n):
+    close = _closes()[:n]
+    state, _ = compute_state(close.to_numpy())
+    _assert_close(state.values(), _ta(close), EXACT, EXACT)
+
+
+def test_incremental_updates_match_ta():
+    close = _closes()
+    get_indicators("TEST", close[:200])
+
+    # One new bar per call, as on consecutive trading days.
+    for end in range(201, len(close) + 1):
+        values = get_indicators("TEST", close[:end])
+        if end % 25 == 0 or end == len(close):
+            _assert_close(values, _ta(close[:end]), EXACT, EXACT)
+
+
+def test_revised_last_bar_is_reapplied():
+    close = _closes()[:300]
+    get_indicators("TEST", close)
+
+    revised = close.copy()
+    revised.iloc[-1] = revised.iloc[-1] * 1.03
+    _assert_close(get_indicators("TEST", revised), _ta(revised), EXACT, EXACT)
+
+
+def test_rolling_window_within_documented_tolerance():
+    close = _closes()
+    window = 126  # ~6 months of daily bars
+    get_indicators("TEST", close[:window])
+
+    for end in range(window + 1, len(close) + 1):
+        values = get_indicators("TEST", close[end - window:end])
+        _assert_close(values, _ta(close[end - window:end]), RSI_WINDOW_TOLERANCE, MACD_WINDOW_TOLERANCE)
@@ -0,0 +1,117 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from agents.ledger import LedgerEngine
+from agents.portfolio import Portfolio
+
+HOLDINGS = Portfolio.from_records(
+    [
+        {"ticker": "AAA", "shares": 10, "buy_price": 10, "buy_date": "2024-01-01"},
+        {"ticker": "BBB", "shares": 4, "buy_price": 50, "buy_date": "2024-01-01"},
+    ]
+)
+
+
+def _state(positions):
+    return {
+        ticker: (
+            round(p.shares, 9),
+            round(p.cost, 6),
+            round(p.realized_pnl, 6),
+            round(p.income, 6),
+            [(round(lot[0], 9), lot[1], lot[2]) for lot in p.lots],
+        )
+        for ticker, p in positions.items()
+    }
+
+
+def _rebuilt(transactions, income):
+    # A fresh engine applies everything from _rebuild in one pass.
+    return _state(LedgerEngine().sync(HOLDINGS, transactions, income))
+
+
+def test_drip_before_later_sell_is_closed_fifo():
+    income = ({"ticker": "AAA", "type": "drip", "shares": 1, "price": 20, "amount": 20, "date": "2024-02-01"},)
+    buy = {"ticker": "AAA", "type": "buy", "shares": 5, "price": 30, "date": "2024-03-01"}
+    sell = {"ticker": "AAA", "type": "sell", "shares": 11, "price": 40, "date": "2024-04-01"}
+
+    engine = LedgerEngine()
+    engine.sync(HOLDINGS, (), income)
+    engine.sync(HOLDINGS, (buy,), income)
+    position = engine.sync(HOLDINGS, (buy, sell), income)["AAA"]
+
+    # Sell closes the 10@10 opening lot and the 1@20 DRIP lot.
+    assert position.realized_pnl == pytest.approx(320.0)
+    assert position.avg_cost == pytest.approx(30.0)
+    assert _state({"AAA": position}) == {"AAA": _rebuilt((buy, sell), income)["AAA"]}
+
+
+def _random_row(rng, start):
+    ticker = rng.choice(["AAA", "BBB"])
+    when = start + timedelta(days=rng.randrange(0, 120))
+    dated = None if rng.random() < 0.1 else when.isoformat()
+
+    if rng.random() < 0.4:
+        shares = rng.choice([1, 2, 0.5])
+        price = rng.choice([20, 25, 30])
+        kind = rng.choice(["drip", "dividend"])
+        row = {"ticker": ticker, "type": kind, "amount": shares * price, "date": dated}
+        if kind == "drip":
+            row.update(shares=shares, price=price)
+        return "income", row
+
+    kind = rng.choice(["buy", "buy", "sell", "drip"])
+    return "transactions", {
+        "ticker": ticker,
+        "type": kind,
+        "shares": rng.choice([1, 3, 5, 2.5]),
+        "price": rng.choice([15, 30, 45]),
+        "date": dated,
+    }
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_sync_matches_rebuild(seed):
+    rng = random.Random(seed)
+    start = date(2024, 1, 2)
+    engine = LedgerEngine()
+    streams = {"transactions": (), "income": ()}
+
+    for _ in range(40):
+        stream, row = _random_row(rng, start)
+        streams[stream] = streams[stream] + (row,)
+        if rng.random() < 0.6:
+            engine.sync(HOLDINGS, streams["transactions"], streams["income"])
+
+    positions = engine.sync(HOLDINGS, streams["transactions"], streams["income"])
+    assert _state(positions) == _rebuilt(streams["transactions"], streams["income"])
+
+
+def test_edited_row_triggers_rebuild():
+    buy = {"ticker": "AAA", "type": "buy", "shares": 5, "price": 30, "date": "2024-03-01"}
+    engine = LedgerEngine()
+    engine.sync(HOLDINGS, (buy,))
+
+    edited = dict(buy, price=35)
+    positions = engine.sync(HOLDINGS, (edited,))
+    assert _state(positions) == _rebuilt((edited,), ())
+
+
+def test_edited_middle_row_triggers_rebuild():
+    first = {"ticker": "AAA", "type": "buy", "shares": 5, "price": 30, "date": "2024-03-01"}
+    second = {"ticker": "AAA", "type": "buy", "shares": 1, "price": 40, "date": "2024-04-01"}
+    drip = {"ticker": "AAA", "type": "drip", "shares": 1, "price": 20, "amount": 20, "date": "2024-02-01"}
+    third = {"ticker": "AAA", "type": "sell", "shares": 2, "price": 45, "date": "2024-05-01"}
+    engine = LedgerEngine()
+    engine.sync(HOLDINGS, (first, second), (drip,))
+
+    edited = dict(first, shares=50)
+    positions = engine.sync(HOLDINGS, (edited, second, third), (drip,))
+    assert positions["AAA"].shares == pytest.approx(10 + 1 + 50 + 1 - 2)
+    assert _state(positions) == _rebuilt((edited, second, third), (drip,))
+
+    drip_edited = dict(drip, shares=3, amount=60)
+    positions = engine.sync(HOLDINGS, (edited, second, third), (drip_edited, drip))
+    assert _state(positions) == _rebuilt((edited, second, third), (drip_edited, drip))
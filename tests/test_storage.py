@@ -0,0 +1,31 @@
+import pytest
+
+from agents import storage
+from agents.storage import JsonStorage, SqliteStorage
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path):
+    seed = JsonStorage({kind: str(tmp_path / f"{kind}.json") for kind in storage.KINDS})
+    return SqliteStorage(str(tmp_path / "portfolio.sqlite"), seed=seed)
+
+
+def _holding(ticker, shares=1):
+    return {"ticker": ticker, "shares": shares, "buy_price": 10, "buy_date": "2024-01-01"}
+
+
+@pytest.mark.parametrize(
+    "order",
+    [
+        ["NEW", "AAA", "BBB", "CCC"],
+        ["AAA", "NEW", "BBB", "CCC"],
+        ["AAA", "BBB", "CCC", "NEW"],
+        ["CCC", "AAA", "BBB"],
+        ["AAA", "CCC"],
+    ],
+)
+def test_sqlite_write_keeps_list_order(sqlite_storage, order):
+    sqlite_storage.write("holdings", [_holding(t) for t in ["AAA", "BBB", "CCC"]])
+    sqlite_storage.write("holdings", [_holding(t) for t in order])
+
+    assert [row["ticker"] for row in sqlite_storage.read("holdings")] == order
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator
+from ta.trend import MACD
+
+from agents import technical_agent
+from agents.fetch import FetchResult, OK
+from agents.indicator_engine import clear_indicator_state, MACD_FAST, MACD_SIGNAL, MACD_SLOW, RSI_WINDOW
+from agents.technical_agent import _batch_indicators, analyze_technical, analyze_technical_matrix
+
+# Same recurrences as ta over the same bars: equal up to float rounding.
+EXACT = 1e-9
+
+# Both paths round RSI/MACD to 2 decimals; allow one step for ties.
+ROUNDED = 0.01 + 1e-9
+
+
+def _series(n, seed, drift):
+    rng = np.random.default_rng(seed)
+    prices = 50 * np.exp(np.cumsum(rng.normal(drift, 0.015, n)))
+    return prices.round(2)
+
+
+def _matrix():
+    index = pd.bdate_range("2024-01-01", periods=130, name="Date")
+    closes = pd.DataFrame(
+        {
+            "UPP": _series(130, 1, 0.004),
+            "DWN": _series(130, 2, -0.004),
+            "GAP": _series(130, 3, 0.0),
+            "NEW": np.nan,
+        },
+        index=index,
+    )
+    # Holidays / missing bars, plus a ticker listed too recently to score.
+    closes.iloc[[5, 40, 41, 90], closes.columns.get_loc("GAP")] = np.nan
+    closes.iloc[-(RSI_WINDOW - 4):, closes.columns.get_loc("NEW")] = _series(RSI_WINDOW - 4, 4, 0.0)
+    return closes
+
+
+def _ta(close):
+    macd = MACD(close, window_slow=MACD_SLOW, window_fast=MACD_FAST, window_sign=MACD_SIGNAL)
+    return (
+        RSIIndicator(close, window=RSI_WINDOW).rsi().iloc[-1],
+        macd.macd().iloc[-1],
+        macd.macd_signal().iloc[-1],
+    )
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state():
+    clear_indicator_state()
+    yield
+    clear_indicator_state()
+
+
+def test_batch_indicators_match_ta_per_ticker():
+    closes = _matrix()
+    last, rsi, macd, macd_signal = _batch_indicators(closes.to_numpy(dtype="float64").T)
+
+    for row, ticker in enumerate(["UPP", "DWN", "GAP"]):
+        close = closes[ticker].dropna()
+        expected_rsi, expected_macd, expected_signal = _ta(close)
+        assert last[row] == close.iloc[-1]
+        assert rsi[row] == pytest.approx(expected_rsi, abs=EXACT)
+        assert macd[row] == pytest.approx(expected_macd, abs=EXACT)
+        assert macd_signal[row] == pytest.approx(expected_signal, abs=EXACT)
+
+
+def test_matrix_matches_per_ticker_analysis(monkeypatch):
+    closes = _matrix()
+
+    def stored_history(ticker, period="6mo"):
+        return FetchResult(OK, value=closes[[ticker]].dropna().rename(columns={ticker: "Close"}))
+
+    monkeypatch.setattr(technical_agent, "get_history_result", stored_history)
+    batch = analyze_technical_matrix(closes)
+
+    for ticker in ["UPP", "DWN", "GAP"]:
+        single = analyze_technical(ticker)
+        row = batch.loc[ticker]
+        assert row["rsi"] == pytest.approx(single["rsi"], abs=ROUNDED)
+        assert row["macd"] == pytest.approx(single["macd"], abs=ROUNDED)
+        assert row["macd_signal"] == pytest.approx(single["macd_signal"], abs=ROUNDED)
+        for column in ["trend", "momentum", "entry_timing", "signal"]:
+            assert row[column] == single[column]
+
+
+def test_short_history_is_not_scored():
+    batch = analyze_technical_matrix(_matrix())
+    short = batch.loc["NEW"]
+
+    assert np.isnan(short["rsi"])
+    assert np.isnan(short["macd"])
+    assert np.isnan(short["macd_signal"])
+    assert short["momentum"] == "neutral"
+    assert short["signal"] == "neutral"
+
+
+def test_ticker_without_history_is_unknown():
+    closes = _matrix().assign(NONE=np.nan)
+    row = analyze_technical_matrix(closes).loc["NONE"]
+
+    assert np.isnan(row["close"])
+    assert row["trend"] == "unknown"
+    assert row["momentum"] == "unknown"
+    assert row["entry_timing"] == "no data"
+    assert row["signal"] == "neutral"
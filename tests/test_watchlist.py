@@ -0,0 +1,32 @@
+import pytest
+
+from agents import storage
+from agents.storage import JsonStorage, SqliteStorage
+from agents.watchlist_agent import add_to_watchlist, get_watchlist, remove_from_watchlist
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path):
+    previous = storage.get_storage()
+    seed = JsonStorage({kind: str(tmp_path / f"{kind}.json") for kind in storage.KINDS})
+    backend = SqliteStorage(str(tmp_path / "portfolio.sqlite"), seed=seed)
+    backend.write("watchlist", ["ZAG.TO", "XBB.TO"])
+    storage.set_storage(backend)
+    yield backend
+    storage.set_storage(previous)
+
+
+def test_bare_tsx_symbol_matches_listed_to_form(sqlite_storage):
+    add_to_watchlist(["ZAG", "xbb", "vti"])
+
+    assert get_watchlist() == ["ZAG.TO", "XBB.TO", "VTI"]
+
+    remove_from_watchlist("ZAG")
+
+    assert get_watchlist() == ["XBB.TO", "VTI"]
+
+
+def test_sqlite_write_keeps_first_row_per_watchlist_key(sqlite_storage):
+    sqlite_storage.write("watchlist", ["XBB.TO", "xbb", "VTI", "XBB"])
+
+    assert sqlite_storage.read("watchlist") == ["XBB.TO", "VTI"]